@@ -93,6 +93,8 @@ class Task(object):
         self.exception = response_body.get('exception')
         self.traceback = response_body.get('traceback')
         self.error = response_body.get('error')
+        # Only set on tasks returned by a wait call; passed back to the next wait
+        self.state_hash = response_body.get('state_hash')
         self.spawned_tasks = []
         spawned_tasks = response_body.get('spawned_tasks')
         if spawned_tasks:
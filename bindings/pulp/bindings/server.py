@@ -1,8 +1,12 @@
 from types import NoneType
 import base64
+import errno
+import httplib
 import locale
 import logging
 import os
+import socket
+import threading
 import urllib
 try:
     import oauth2 as oauth
@@ -19,6 +23,13 @@ from pulp.common.constants import DEFAULT_CA_PATH
 from pulp.common.util import ensure_utf_8, encode_unicode
 
 
+# HTTP methods that may be sent again after the server could have received them
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+# socket errors raised when writing to a connection the server has already closed
+CONNECTION_CLOSED_ERRNOS = frozenset([errno.EPIPE, errno.ECONNRESET, errno.ECONNABORTED])
+
+
 class PulpConnection(object):
     """
     Stub for invoking methods against the Pulp server. By default, the
@@ -27,6 +38,11 @@ class PulpConnection(object):
     parameter can be used to pass in another mechanism to make the actual
     call to the server. The likely use of this is a duck-typed mock object
     for unit testing purposes.
+
+    By default, a new SSL context and connection are created for every request. When
+    pool_size is greater than zero, the SSL context is created once and up to pool_size
+    idle keep-alive connections are kept for reuse by later requests, from any thread.
+    Call close() to close the idle connections once the connection is no longer needed.
     """
 
     def __init__(self,
@@ -44,7 +60,8 @@ class PulpConnection(object):
                  cert_filename=None,
                  server_wrapper=None,
                  verify_ssl=True,
-                 ca_path=DEFAULT_CA_PATH):
+                 ca_path=DEFAULT_CA_PATH,
+                 pool_size=0):
 
         self.host = host
         self.port = port
@@ -84,6 +101,17 @@ class PulpConnection(object):
         self.verify_ssl = verify_ssl
         self.ca_path = ca_path
 
+        # Maximum number of idle connections kept for reuse; 0 disables reuse
+        self.pool_size = pool_size
+
+    def close(self):
+        """
+        Close the idle connections kept for reuse, if any.
+        """
+        close = getattr(self.server_wrapper, 'close', None)
+        if close is not None:
+            close()
+
     def DELETE(self, path, body=None):
         return self._request('DELETE', path, body=body)
 
@@ -237,6 +265,10 @@ class HTTPSServerWrapper(object):
     This abstraction is used to simplify mocking. In this implementation, the
     intricacies (read: ugliness) of invoking and getting the response from
     the HTTPConnection class are hidden in favor of a simpler API to mock.
+
+    When the connection's pool_size is greater than zero, the SSL context is built once and
+    connections the server leaves open are returned to a pool of idle connections shared by
+    all threads. Each connection is only used by one request at a time.
     """
 
     def __init__(self, pulp_connection):
@@ -245,12 +277,15 @@ class HTTPSServerWrapper(object):
         :type pulp_connection: PulpConnection
         """
         self.pulp_connection = pulp_connection
+        self._ssl_context = None
+        self._idle = []
+        self._lock = threading.Lock()
 
     def request(self, method, url, body):
         """
         Make the request against the Pulp server, returning a tuple of (status_code, respose_body).
-        This method creates a new connection each time since HTTPSConnection has problems
-        reusing a connection for multiple calls (as claimed by a prior comment in this module).
+        Unless the connection's pool_size is greater than zero, this method creates a new
+        connection each time.
 
         :param method: The HTTP method to be used for the request (GET, POST, etc.)
         :type  method: str
@@ -266,34 +301,10 @@ class HTTPSServerWrapper(object):
         """
         headers = dict(self.pulp_connection.headers)  # copy so we don't affect the calling method
 
-        # Despite the confusing name, 'sslv23' configures m2crypto to use any available protocol in
-        # the underlying openssl implementation.
-        ssl_context = SSL.Context('sslv23')
-        # This restricts the protocols we are willing to do by configuring m2 not to do SSLv2.0 or
-        # SSLv3.0. EL 5 does not have support for TLS > v1.0, so we have to leave support for
-        # TLSv1.0 enabled.
-        ssl_context.set_options(m2.SSL_OP_NO_SSLv2 | m2.SSL_OP_NO_SSLv3)
-
-        if self.pulp_connection.verify_ssl:
-            ssl_context.set_verify(SSL.verify_peer, depth=100)
-            # We need to stat the ca_path to see if it exists (error if it doesn't), and if so
-            # whether it is a file or a directory. m2crypto has different directives depending on
-            # which type it is.
-            if os.path.isfile(self.pulp_connection.ca_path):
-                ssl_context.load_verify_locations(cafile=self.pulp_connection.ca_path)
-            elif os.path.isdir(self.pulp_connection.ca_path):
-                ssl_context.load_verify_locations(capath=self.pulp_connection.ca_path)
-            else:
-                # If it's not a file and it's not a directory, it's not a valid setting
-                raise exceptions.MissingCAPathException(self.pulp_connection.ca_path)
-        ssl_context.set_session_timeout(self.pulp_connection.timeout)
-
         if self.pulp_connection.username and self.pulp_connection.password:
             raw = ':'.join((self.pulp_connection.username, self.pulp_connection.password))
             encoded = base64.encodestring(raw)[:-1]
             headers['Authorization'] = 'Basic ' + encoded
-        elif self.pulp_connection.cert_filename:
-            ssl_context.load_cert(self.pulp_connection.cert_filename)
 
         # oauth configuration. This block is only True if oauth is not None, so it won't run on RHEL
         # 5.
@@ -314,28 +325,201 @@ class HTTPSServerWrapper(object):
             headers.update(oauth_header)
             headers['pulp-user'] = self.pulp_connection.oauth_user
 
+        if self.pulp_connection.pool_size > 0:
+            return self._pooled_request(method, url, body, headers)
+
         connection = httpslib.HTTPSConnection(
-            self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
+            self.pulp_connection.host, self.pulp_connection.port,
+            ssl_context=self._build_ssl_context())
 
         try:
             # Request against the server
             connection.request(method, url, body=body, headers=headers)
             response = connection.getresponse()
         except SSL.SSLError, err:
-            # Translate stale login certificate to an auth exception
-            if 'sslv3 alert certificate expired' == str(err):
-                raise exceptions.ClientCertificateExpiredException(
-                    self.pulp_connection.cert_filename)
-            elif 'certificate verify failed' in str(err):
-                raise exceptions.CertificateVerificationException()
-            else:
-                raise exceptions.ConnectionException(None, str(err), None)
+            self._handle_ssl_error(err)
 
         # Attempt to deserialize the body (should pass unless the server is busted)
         response_body = response.read()
 
+        return response.status, self._decode(response_body)
+
+    def close(self):
+        """
+        Close the idle connections in the pool.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _pooled_request(self, method, url, body, headers):
+        """
+        Make the request using a connection from the pool, or a new connection if none are idle.
+        A pooled connection may have been closed by the server while it was idle, so a request
+        that fails on one is retried once on a new connection when it is safe to send it again.
+
+        :return: A 2-tuple of the status_code and response_body, as returned by request()
+        :rtype:  tuple
+        """
+        connection, reused = self._checkout()
+        while True:
+            sent = False
+            try:
+                connection.request(method, url, body=body, headers=headers)
+                sent = True
+                response = connection.getresponse()
+                response_body = response.read()
+                break
+            except (httplib.HTTPException, socket.error, SSL.SSLError), err:
+                connection.close()
+                if reused and self._is_retriable(method, err, sent):
+                    connection, reused = self._connect(self._get_ssl_context()), False
+                    continue
+                if isinstance(err, SSL.SSLError):
+                    self._handle_ssl_error(err)
+                raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(connection)
+
+        return response.status, self._decode(response_body)
+
+    @staticmethod
+    def _is_retriable(method, err, sent):
+        """
+        Determine whether a request that failed on a reused connection may be sent again. Any
+        idempotent request may be. Other requests are only sent again when the failure shows that
+        the server closed the idle connection before the request reached it: writing the request
+        failed because the connection was closed, or the connection was closed without any
+        response being sent.
+
+        :param method: The HTTP method of the request
+        :type  method: str
+        :param err:    The error raised by the failed request
+        :type  err:    Exception
+        :param sent:   True if the request was completely written to the connection
+        :type  sent:   bool
+        :return:       True if the request may be sent again on a new connection
+        :rtype:        bool
+        """
+        if method.upper() in IDEMPOTENT_METHODS:
+            return True
+        if isinstance(err, socket.timeout):
+            # the server may still be processing the request
+            return False
+        if not sent:
+            if isinstance(err, SSL.SSLError):
+                return True
+            return isinstance(err, socket.error) and err.errno in CONNECTION_CLOSED_ERRNOS
+        return isinstance(err, httplib.BadStatusLine) and err.line == repr('')
+
+    def _checkout(self):
+        """
+        Take an idle connection from the pool, or create a new one if none are idle.
+
+        :return: A 2-tuple of the connection and whether it was taken from the pool
+        :rtype:  tuple
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(self._get_ssl_context()), False
+
+    def _checkin(self, connection):
+        """
+        Return a connection to the pool, closing it instead if the pool is full.
+
+        :param connection: A connection whose last response has been read completely
+        :type  connection: M2Crypto.httpslib.HTTPSConnection
+        """
+        with self._lock:
+            if len(self._idle) < self.pulp_connection.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def _connect(self, ssl_context):
+        """
+        :param ssl_context: The SSL context used by the connection
+        :type  ssl_context: M2Crypto.SSL.Context
+        :return: A new (not yet connected) connection to the server
+        :rtype:  M2Crypto.httpslib.HTTPSConnection
+        """
+        return httpslib.HTTPSConnection(
+            self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
+
+    def _get_ssl_context(self):
+        """
+        :return: The SSL context shared by the pooled connections, built on first use
+        :rtype:  M2Crypto.SSL.Context
+        """
+        with self._lock:
+            if self._ssl_context is None:
+                self._ssl_context = self._build_ssl_context()
+            return self._ssl_context
+
+    def _build_ssl_context(self):
+        """
+        Build an SSL context from the connection's SSL validation settings and credentials.
+
+        :return: A new SSL context
+        :rtype:  M2Crypto.SSL.Context
+        :raises exceptions.MissingCAPathException: if the ca_path is neither a file nor a
+                                                   directory
+        """
+        # Despite the confusing name, 'sslv23' configures m2crypto to use any available protocol in
+        # the underlying openssl implementation.
+        ssl_context = SSL.Context('sslv23')
+        # This restricts the protocols we are willing to do by configuring m2 not to do SSLv2.0 or
+        # SSLv3.0. EL 5 does not have support for TLS > v1.0, so we have to leave support for
+        # TLSv1.0 enabled.
+        ssl_context.set_options(m2.SSL_OP_NO_SSLv2 | m2.SSL_OP_NO_SSLv3)
+
+        if self.pulp_connection.verify_ssl:
+            ssl_context.set_verify(SSL.verify_peer, depth=100)
+            # We need to stat the ca_path to see if it exists (error if it doesn't), and if so
+            # whether it is a file or a directory. m2crypto has different directives depending on
+            # which type it is.
+            if os.path.isfile(self.pulp_connection.ca_path):
+                ssl_context.load_verify_locations(cafile=self.pulp_connection.ca_path)
+            elif os.path.isdir(self.pulp_connection.ca_path):
+                ssl_context.load_verify_locations(capath=self.pulp_connection.ca_path)
+            else:
+                # If it's not a file and it's not a directory, it's not a valid setting
+                raise exceptions.MissingCAPathException(self.pulp_connection.ca_path)
+        ssl_context.set_session_timeout(self.pulp_connection.timeout)
+
+        if not (self.pulp_connection.username and self.pulp_connection.password) and \
+                self.pulp_connection.cert_filename:
+            ssl_context.load_cert(self.pulp_connection.cert_filename)
+
+        return ssl_context
+
+    def _handle_ssl_error(self, err):
+        """
+        Translate an SSL error raised by a request into a bindings exception.
+
+        :param err: The error raised by the request
+        :type  err: M2Crypto.SSL.SSLError
+        """
+        # Translate stale login certificate to an auth exception
+        if 'sslv3 alert certificate expired' == str(err):
+            raise exceptions.ClientCertificateExpiredException(
+                self.pulp_connection.cert_filename)
+        elif 'certificate verify failed' in str(err):
+            raise exceptions.CertificateVerificationException()
+        else:
+            raise exceptions.ConnectionException(None, str(err), None)
+
+    @staticmethod
+    def _decode(response_body):
+        """
+        :return: The response body parsed as json, or unchanged if it is not valid json
+        """
         try:
-            response_body = json.loads(response_body)
+            return json.loads(response_body)
         except:
-            pass
-        return response.status, response_body
+            return response_body
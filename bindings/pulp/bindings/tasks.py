@@ -42,6 +42,61 @@ class TasksAPI(PulpAPI):
         response.response_body = Task(response.response_body)
         return response
 
+    def wait_task(self, task_id, state_hash=None, timeout=None):
+        """
+        Waits until the state or progress of the given task changes, or the timeout passes,
+        and retrieves its status.
+
+        :param task_id:    ID of the task to wait on
+        :type  task_id:    str
+        :param state_hash: state_hash of the task as last retrieved by a wait call;
+                           None to return without waiting
+        :type  state_hash: str
+        :param timeout:    maximum number of seconds the server waits; None for the server's
+                           default
+        :type  timeout:    float
+
+        :return: response with a Task object, including its state_hash, in the response_body
+        :rtype:  Response
+
+        :raise NotFoundException: if there is no task with the given ID
+        """
+        path = '/v2/tasks/%s/wait/' % task_id
+        queries = {}
+        if state_hash is not None:
+            queries['state_hash'] = state_hash
+        if timeout is not None:
+            queries['timeout'] = timeout
+        response = self.server.GET(path, queries=queries)
+        response.response_body = Task(response.response_body)
+        return response
+
+    def wait_tasks(self, state_hashes, timeout=None):
+        """
+        Waits until the state or progress of any of the given tasks changes, or the timeout
+        passes, and retrieves the status of all of them.
+
+        :param state_hashes: state_hash of each task as last retrieved by a wait call, keyed by
+                             task ID; None for a task not retrieved by a wait call yet
+        :type  state_hashes: dict
+        :param timeout:      maximum number of seconds the server waits; None for the server's
+                             default
+        :type  timeout:      float
+
+        :return: response with a list of Task objects, including their state_hash, in the
+                 response_body
+        :rtype:  Response
+
+        :raise NotFoundException: if there is no task with one of the given IDs
+        """
+        path = '/v2/tasks/wait/'
+        body = {'tasks': state_hashes}
+        if timeout is not None:
+            body['timeout'] = timeout
+        response = self.server.POST(path, body)
+        response.response_body = [Task(doc) for doc in response.response_body]
+        return response
+
     def get_all_tasks(self, tags=()):
         """
         Retrieves all tasks in the system. If tags are specified, only tasks
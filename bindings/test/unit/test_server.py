@@ -1,8 +1,11 @@
 """
 This module contains tests for the pulp.bindings.server module.
 """
+import errno
+import httplib
 import locale
 import logging
+import socket
 import unittest
 
 from M2Crypto import m2, SSL
@@ -172,6 +175,153 @@ class TestHTTPSServerWrapper(unittest.TestCase):
         load_verify_locations.assert_called_once_with(cafile=ca_path)
 
 
+class TestHTTPSServerWrapperPool(unittest.TestCase):
+    """
+    This class contains tests for the connection pooling in the HTTPSServerWrapper class.
+    """
+    @staticmethod
+    def response(will_close=False):
+        response = mock.MagicMock()
+        response.status = 200
+        response.read.return_value = '{"a": 1}'
+        response.will_close = will_close
+        return response
+
+    def setUp(self):
+        self.conn = server.PulpConnection('host', verify_ssl=False, pool_size=2)
+        self.wrapper = self.conn.server_wrapper
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    @mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+    def test_reuse(self, HTTPSConnection, Context):
+        """
+        Assert that a connection left open by the server and the SSL context are reused.
+        """
+        HTTPSConnection.return_value.getresponse.side_effect = \
+            lambda: self.response()
+
+        first = self.wrapper.request('GET', '/awesome/api/', '')
+        second = self.wrapper.request('GET', '/awesome/api/', '')
+
+        self.assertEqual(first, (200, {'a': 1}))
+        self.assertEqual(second, (200, {'a': 1}))
+        self.assertEqual(HTTPSConnection.call_count, 1)
+        self.assertEqual(Context.call_count, 1)
+        self.assertEqual(HTTPSConnection.return_value.request.call_count, 2)
+        self.assertEqual(self.wrapper._idle, [HTTPSConnection.return_value])
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    @mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+    def test_will_close(self, HTTPSConnection, Context):
+        """
+        Assert that a connection the server closes is not returned to the pool.
+        """
+        HTTPSConnection.return_value.getresponse.return_value = self.response(will_close=True)
+
+        self.wrapper.request('GET', '/awesome/api/', '')
+        self.wrapper.request('GET', '/awesome/api/', '')
+
+        self.assertEqual(HTTPSConnection.call_count, 2)
+        self.assertEqual(Context.call_count, 1)
+        self.assertEqual(self.wrapper._idle, [])
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    @mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+    def test_stale_connection_retried(self, HTTPSConnection, Context):
+        """
+        Assert that a request failing on a pooled connection is retried on a new connection.
+        """
+        stale = mock.MagicMock()
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+        fresh = mock.MagicMock()
+        fresh.getresponse.return_value = self.response()
+        HTTPSConnection.return_value = fresh
+        self.wrapper._idle.append(stale)
+
+        status, body = self.wrapper.request('POST', '/awesome/api/', '{}')
+
+        self.assertEqual(status, 200)
+        stale.close.assert_called_once_with()
+        fresh.request.assert_called_once_with('POST', '/awesome/api/', body='{}',
+                                              headers=self.conn.headers)
+        self.assertEqual(self.wrapper._idle, [fresh])
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    @mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+    def test_reset_while_sending_retried(self, HTTPSConnection, Context):
+        """
+        Assert that a request that could not be written to a pooled connection is retried.
+        """
+        stale = mock.MagicMock()
+        stale.request.side_effect = socket.error(errno.EPIPE, 'Broken pipe')
+        HTTPSConnection.return_value.getresponse.return_value = self.response()
+        self.wrapper._idle.append(stale)
+
+        status, body = self.wrapper.request('POST', '/awesome/api/', '{}')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(HTTPSConnection.return_value.request.call_count, 1)
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    @mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+    def test_sent_request_not_retried(self, HTTPSConnection, Context):
+        """
+        Assert that a non-idempotent request that may have reached the server is not retried.
+        """
+        stale = mock.MagicMock()
+        stale.getresponse.side_effect = socket.timeout('timed out')
+        self.wrapper._idle.append(stale)
+
+        self.assertRaises(socket.timeout, self.wrapper.request, 'POST', '/awesome/api/', '{}')
+        stale.close.assert_called_once_with()
+        self.assertFalse(HTTPSConnection.called)
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    @mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+    def test_idempotent_request_retried(self, HTTPSConnection, Context):
+        """
+        Assert that an idempotent request is retried whenever it fails on a pooled connection.
+        """
+        stale = mock.MagicMock()
+        stale.getresponse.return_value.read.side_effect = httplib.IncompleteRead('')
+        HTTPSConnection.return_value.getresponse.return_value = self.response()
+        self.wrapper._idle.append(stale)
+
+        status, body = self.wrapper.request('GET', '/awesome/api/', '')
+
+        self.assertEqual((status, body), (200, {'a': 1}))
+        self.assertEqual(HTTPSConnection.return_value.request.call_count, 1)
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    @mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+    def test_new_connection_not_retried(self, HTTPSConnection, Context):
+        """
+        Assert that a request failing on a new connection is not retried.
+        """
+        HTTPSConnection.return_value.request.side_effect = SSL.SSLError('certificate verify failed')
+
+        self.assertRaises(exceptions.CertificateVerificationException, self.wrapper.request,
+                          'GET', '/awesome/api/', '')
+        self.assertEqual(HTTPSConnection.return_value.request.call_count, 1)
+        self.assertEqual(self.wrapper._idle, [])
+
+    @mock.patch('pulp.bindings.server.SSL.Context')
+    def test_pool_bounded(self, Context):
+        """
+        Assert that at most pool_size idle connections are kept and that close() closes them.
+        """
+        connections = [mock.MagicMock() for i in range(3)]
+
+        for connection in connections:
+            self.wrapper._checkin(connection)
+        self.conn.close()
+
+        connections[2].close.assert_called_once_with()
+        connections[0].close.assert_called_once_with()
+        connections[1].close.assert_called_once_with()
+        self.assertEqual(self.wrapper._idle, [])
+
+
 class TestPulpConnection(unittest.TestCase):
     """
     This class contains tests for the PulpConnection object.
@@ -211,6 +361,7 @@ class TestPulpConnection(unittest.TestCase):
         self.assertEqual(connection.server_wrapper.pulp_connection, connection)
         self.assertEqual(connection.verify_ssl, True)
         self.assertEqual(connection.ca_path, server.DEFAULT_CA_PATH)
+        self.assertEqual(connection.pool_size, 0)
         # 1142376 - verify default path points to a known valid file
         self.assertEqual(server.DEFAULT_CA_PATH, '/etc/pki/tls/certs/ca-bundle.crt')
 
@@ -76,6 +76,44 @@ class TestGetAllTasks(unittest.TestCase):
             self.assertTrue(isinstance(task, responses.Task))
 
 
+class TestWaitTasks(unittest.TestCase):
+    def setUp(self):
+        self.server = mock.MagicMock()
+        self.api = tasks.TasksAPI(self.server)
+
+    def test_wait_task(self):
+        self.server.GET.return_value.response_body = dict(TASKS[0], state_hash='abc')
+
+        ret = self.api.wait_task(TASKS[0]['task_id'], 'xyz', 10).response_body
+
+        self.server.GET.assert_called_once_with(
+            '/v2/tasks/%s/wait/' % TASKS[0]['task_id'],
+            queries={'state_hash': 'xyz', 'timeout': 10})
+        self.assertTrue(isinstance(ret, responses.Task))
+        self.assertEqual(ret.task_id, TASKS[0]['task_id'])
+        self.assertEqual(ret.state_hash, 'abc')
+
+    def test_wait_task_defaults(self):
+        self.server.GET.return_value.response_body = copy.deepcopy(TASKS[0])
+
+        self.api.wait_task(TASKS[0]['task_id'])
+
+        self.server.GET.assert_called_once_with(
+            '/v2/tasks/%s/wait/' % TASKS[0]['task_id'], queries={})
+
+    def test_wait_tasks(self):
+        self.server.POST.return_value.response_body = copy.deepcopy(TASKS[:2])
+        state_hashes = {TASKS[0]['task_id']: 'abc', TASKS[1]['task_id']: None}
+
+        ret = self.api.wait_tasks(state_hashes, 10).response_body
+
+        self.server.POST.assert_called_once_with(
+            '/v2/tasks/wait/', {'tasks': state_hashes, 'timeout': 10})
+        self.assertEqual(len(ret), 2)
+        for task in ret:
+            self.assertTrue(isinstance(task, responses.Task))
+
+
 TASKS = [
     {
         'exception': None,
@@ -12,6 +12,7 @@ DEFAULT = {
         'verify_ssl': 'true',
         'ca_path': '/etc/pki/tls/certs/ca-bundle.crt',
         'upload_chunk_size': '1048576',
+        'upload_concurrency': '1',
     },
     'client': {
         'role': 'admin'
@@ -40,6 +41,7 @@ SCHEMA = (
             ('verify_ssl', REQUIRED, BOOL),
             ('ca_path', REQUIRED, ANY),
             ('upload_chunk_size', REQUIRED, NUMBER),
+            ('upload_concurrency', REQUIRED, NUMBER),
         )
      ),
     ('client', REQUIRED,
@@ -6,6 +6,7 @@ import time
 from gettext import gettext as _
 
 from pulp.client.extensions.extensions import PulpCliCommand, PulpCliFlag
+from pulp.bindings.exceptions import NotFoundException
 from pulp.bindings.responses import Task
 
 # Returned from the poll command if one or more of the tasks in the given list
@@ -22,6 +23,9 @@ DESC_BACKGROUND = _('if specified, the client process will end immediately (the
                     'continue to run on the server)')
 FLAG_BACKGROUND = PulpCliFlag('--bg', DESC_BACKGROUND)
 
+# Longest the server is asked to hold each request for a task that has not changed
+WAIT_TIMEOUT_IN_SECONDS = 10
+
 
 class PollingCommand(PulpCliCommand):
     """
@@ -32,11 +36,16 @@ class PollingCommand(PulpCliCommand):
     If the poll_frequency_in_seconds is not specified, it will be loaded from
     the configuration under output -> poll_frequency_in_seconds.
 
+    Each poll asks the server to wait until the task's state or progress changes, for up to
+    wait_timeout_in_seconds, so an idle task costs one request per timeout rather than one
+    per poll_frequency_in_seconds. Servers that cannot wait on tasks are polled instead.
+
     :ivar context: the client context
     :type context: pulp.client.extensions.core.ClientContext
     """
 
-    def __init__(self, name, description, method, context, poll_frequency_in_seconds=None):
+    def __init__(self, name, description, method, context, poll_frequency_in_seconds=None,
+                 wait_timeout_in_seconds=WAIT_TIMEOUT_IN_SECONDS):
         """
         :param name: command name
         :type  name: str
@@ -48,6 +57,9 @@ class PollingCommand(PulpCliCommand):
         :type  context: pulp.client.extensions.core.ClientContext
         :param poll_frequency_in_seconds: time between polling calls to the server
         :type  poll_frequency_in_seconds: float
+        :param wait_timeout_in_seconds: longest the server holds a polling call while the task
+                                        does not change
+        :type  wait_timeout_in_seconds: float
         """
         PulpCliCommand.__init__(self, name, description, method)
         self.context = context
@@ -59,6 +71,10 @@ class PollingCommand(PulpCliCommand):
                 self.context.config['output']['poll_frequency_in_seconds']
             )
 
+        self.wait_timeout_in_seconds = wait_timeout_in_seconds
+        # cleared if the server does not support waiting on tasks
+        self.wait_supported = True
+
         self.add_flag(FLAG_BACKGROUND)
 
         # list of tasks we already know about
@@ -212,8 +228,7 @@ class PollingCommand(PulpCliCommand):
 
             time.sleep(self.poll_frequency_in_seconds)
 
-            response = self.context.server.tasks.get_task(task.task_id)
-            task = response.response_body
+            task = self._wait_task(task)
 
         # One final call to update the progress with the end state. It's possible the run state
         # was never hit in the loop above, so we check for first_run again for the missing blank
@@ -225,6 +240,31 @@ class PollingCommand(PulpCliCommand):
 
         return task
 
+    def _wait_task(self, task):
+        """
+        Retrieves the task from the server once its state or progress has changed, or the wait
+        timeout has passed. If the server does not support waiting on tasks, the task is
+        retrieved immediately from then on.
+
+        :param task: the task as last retrieved
+        :type  task: pulp.bindings.responses.Task
+
+        :return: the updated task report
+        :rtype:  pulp.bindings.responses.Task
+        """
+        tasks_api = self.context.server.tasks
+        if self.wait_supported:
+            try:
+                response = tasks_api.wait_task(task.task_id, task.state_hash,
+                                               self.wait_timeout_in_seconds)
+                return response.response_body
+            except NotFoundException:
+                # either the server predates the wait call or the task is gone; the
+                # latter is reported by the regular call below
+                self.wait_supported = False
+        response = tasks_api.get_task(task.task_id)
+        return response.response_body
+
     def task_header(self, task):
         """
         Displays information to the user to indicate which task is about to be tracked.
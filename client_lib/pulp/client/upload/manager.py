@@ -7,13 +7,23 @@ client-side tracking of upload requests on the server.
 
 import copy
 import errno
+import itertools
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 import os
 import pickle
+import time
 
 from pulp.common.lock import LockFile
 
 
 DEFAULT_CHUNKSIZE = 1048576  # 1 MB per upload call
+DEFAULT_CONCURRENCY = 1  # upload segments in flight at once
+TRACKER_SAVE_INTERVAL = 5  # seconds between tracker file writes during an upload
+
+# Seconds to wait on an in flight segment before checking again, so a
+# KeyboardInterrupt is not held up by a blocking wait.
+RESULT_POLL_INTERVAL = 1
 
 
 class ManagerUninitializedException(Exception):
@@ -57,7 +67,9 @@ class UploadManager(object):
 
     This class' thread safety admittedly isn't the best. The intention, at least
     initially, is to be used in a CLI where there will only be a single thread
-    per process. As such, there are no in memory locks. The tracker files per
+    per process. As such, there are no in memory locks. When uploading with a
+    concurrency greater than one, segments are sent by a pool of threads but
+    the tracker is only ever updated by the calling thread. The tracker files per
     upload will carry some state information to prevent two processes from
     concurrently modifying the same tracker.
 
@@ -71,7 +83,8 @@ class UploadManager(object):
     on disk state files.
     """
 
-    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE):
+    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE,
+                 concurrency=DEFAULT_CONCURRENCY):
         """
         @param upload_working_dir: directory in which to store client-side files
                to track upload requests; if it doesn't exist it will be created
@@ -84,10 +97,14 @@ class UploadManager(object):
         @param chunk_size: size in bytes of data to upload on each call to the
                server
         @type  chunk_size: int
+
+        @param concurrency: number of segments to upload to the server at once
+        @type  concurrency: int
         """
         self.upload_working_dir = upload_working_dir
         self.bindings = bindings
         self.chunk_size = chunk_size
+        self.concurrency = concurrency
 
         # Internal state
         self.tracker_files = {}
@@ -111,7 +128,9 @@ class UploadManager(object):
         upload_working_dir = os.path.join(context.config['filesystem']['upload_working_dir'],
                                           'default')
         upload_working_dir = os.path.expanduser(upload_working_dir)
-        return cls(upload_working_dir, context.server)
+        concurrency = context.config.get('server', {}).get('upload_concurrency',
+                                                           DEFAULT_CONCURRENCY)
+        return cls(upload_working_dir, context.server, concurrency=int(concurrency))
 
     def initialize(self):
         """
@@ -164,6 +183,7 @@ class UploadManager(object):
         tracker_file.upload_id = upload_id
         tracker_file.location = location
         tracker_file.offset = 0
+        tracker_file.completed = []
         tracker_file.repo_id = repo_id
         tracker_file.unit_type_id = unit_type_id
         tracker_file.unit_key = unit_key
@@ -189,11 +209,19 @@ class UploadManager(object):
 
         The callback_func is used to get feedback on the upload process. After
         each successful upload segment call to the server, this function
-        will be invoked with the new offset in the file and the file size
-        (intended to be fed into a progress indicator). As this is called
+        will be invoked with the number of bytes uploaded so far and the file
+        size (intended to be fed into a progress indicator). As this is called
         after each upload segment call, the granularity at which it is called
         depends on the chunk_size value for this instance.
 
+        When the concurrency for this instance is greater than one, that many
+        segments are uploaded at once and may complete out of order. The
+        tracker records the completed segments past its offset so an
+        interrupted upload resumes without sending them again. The tracker file
+        is written at most every TRACKER_SAVE_INTERVAL seconds while the upload
+        runs, so a resumed upload may repeat the segments of the last few
+        seconds; the server accepts a segment being sent more than once.
+
         The callback_func should have a signature of (int, int).
 
         This call will raise an exception if an upload is already in progress
@@ -235,22 +263,32 @@ class UploadManager(object):
 
             source_file_size = os.path.getsize(tracker_file.source_filename)
 
-            f = open(tracker_file.source_filename, 'r')
-            while True:
-                # Load the chunk to upload
-                f.seek(tracker_file.offset)
-                data = f.read(self.chunk_size)
-                if not data:
-                    break
+            offsets = list(self._pending_offsets(tracker_file, source_file_size))
+            upload_segment = _SegmentUploader(self.bindings, upload_id,
+                                              tracker_file.source_filename, self.chunk_size)
 
-                # Server request
-                self.bindings.uploads.upload_segment(upload_id, tracker_file.offset, data)
-
-                # Status update and callback notification
-                tracker_file.offset = min(tracker_file.offset + self.chunk_size, source_file_size)
-                tracker_file.save()
-
-                callback_func(tracker_file.offset, source_file_size)
+            pool = None
+            if self.concurrency > 1:
+                pool = ThreadPool(self.concurrency)
+                results = _interruptible(pool.imap_unordered(upload_segment, offsets))
+            else:
+                results = itertools.imap(upload_segment, offsets)
+
+            try:
+                last_save = time.time()
+                for start, end in results:
+                    # Status update and callback notification
+                    tracker_file.segment_completed(start, end)
+                    if time.time() - last_save >= TRACKER_SAVE_INTERVAL:
+                        tracker_file.save()
+                        last_save = time.time()
+
+                    if callback_func:
+                        callback_func(tracker_file.bytes_completed(), source_file_size)
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
 
             tracker_file.is_finished_uploading = True
         finally:
@@ -369,6 +407,24 @@ class UploadManager(object):
         self._uncache_tracker_file(tracker)
         tracker.delete()
 
+    def _pending_offsets(self, tracker_file, file_size):
+        """
+        Generates the offsets of the segments that still need to be uploaded,
+        skipping the segments the tracker already records as completed.
+
+        @param tracker_file: tracker of the upload
+        @type  tracker_file: UploadTracker
+
+        @param file_size: size in bytes of the file being uploaded
+        @type  file_size: int
+
+        @return: generator of offsets in the file
+        """
+        for start in xrange(tracker_file.offset, file_size, self.chunk_size):
+            end = min(start + self.chunk_size, file_size)
+            if not tracker_file.is_completed(start, end):
+                yield start
+
     def _tracker_filename(self, upload_id):
         return os.path.join(self.upload_working_dir, upload_id)
 
@@ -385,6 +441,57 @@ class UploadManager(object):
         return self.tracker_files.values()
 
 
+class _SegmentUploader(object):
+    """
+    Callable that reads a single segment of the file being uploaded and sends
+    it to the server. Each call opens the file itself so that segments can be
+    uploaded from several threads at once.
+    """
+
+    def __init__(self, bindings, upload_id, filename, chunk_size):
+        self.bindings = bindings
+        self.upload_id = upload_id
+        self.filename = filename
+        self.chunk_size = chunk_size
+
+    def __call__(self, offset):
+        """
+        @param offset: offset in the file of the segment to upload
+        @type  offset: int
+
+        @return: tuple of the start and end offsets of the uploaded segment
+        @rtype:  tuple
+        """
+        f = open(self.filename, 'r')
+        try:
+            f.seek(offset)
+            data = f.read(self.chunk_size)
+        finally:
+            f.close()
+
+        self.bindings.uploads.upload_segment(self.upload_id, offset, data)
+        return offset, offset + len(data)
+
+
+def _interruptible(results):
+    """
+    Iterates the results of a thread pool, waiting on them in short intervals
+    so a KeyboardInterrupt is not held up by a blocking wait.
+
+    @param results: iterator returned by ThreadPool.imap_unordered
+    @type  results: multiprocessing.pool.IMapIterator
+
+    @return: generator of the results
+    """
+    while True:
+        try:
+            yield results.next(RESULT_POLL_INTERVAL)
+        except TimeoutError:
+            continue
+        except StopIteration:
+            return
+
+
 class UploadTracker(object):
     """
     Client-side file to carry all information related to a single upload
@@ -398,6 +505,7 @@ class UploadTracker(object):
         self.upload_id = None
         self.location = None  # URL to the upload request on the server
         self.offset = None  # start of next chunk to upload
+        self.completed = []  # (start, end) of segments completed past the offset
         self.source_filename = None  # path on disk to the file to upload
 
         # Import call information
@@ -410,6 +518,45 @@ class UploadTracker(object):
         self.is_running = False
         self.is_finished_uploading = False
 
+    def segment_completed(self, start, end):
+        """
+        Records that a segment of the file was uploaded. The offset is advanced
+        past every completed segment that directly follows it.
+
+        @param start: offset in the file of the first byte of the segment
+        @type  start: int
+
+        @param end: offset in the file following the last byte of the segment
+        @type  end: int
+        """
+        ranges = sorted(self.completed + [(start, end)])
+        merged = []
+        for range_start, range_end in ranges:
+            if merged and range_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+            else:
+                merged.append((range_start, range_end))
+
+        while merged and merged[0][0] <= self.offset:
+            self.offset = max(self.offset, merged.pop(0)[1])
+        self.completed = merged
+
+    def is_completed(self, start, end):
+        """
+        @return: True if the given segment of the file has already been uploaded
+        @rtype:  bool
+        """
+        if end <= self.offset:
+            return True
+        return any(s <= start and end <= e for s, e in self.completed)
+
+    def bytes_completed(self):
+        """
+        @return: number of bytes of the file uploaded so far
+        @rtype:  int
+        """
+        return self.offset + sum(e - s for s, e in self.completed)
+
     def save(self):
         """
         Saves the current state of the tracker file. This will lock on the file
@@ -449,4 +596,8 @@ class UploadTracker(object):
         status_file = pickle.load(f)
         f.close()
 
+        # Trackers written before segments could complete out of order
+        if not hasattr(status_file, 'completed'):
+            status_file.completed = []
+
         return status_file
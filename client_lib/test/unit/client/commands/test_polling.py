@@ -13,11 +13,12 @@
 import mock
 
 
+from pulp.bindings.exceptions import NotFoundException
 from pulp.bindings.responses import (
     Task, STATE_WAITING, STATE_CANCELED, STATE_ERROR, STATE_FINISHED,
     STATE_RUNNING, STATE_SKIPPED, STATE_ACCEPTED)
 from pulp.client.commands.polling import (
-    PollingCommand, RESULT_ABORTED, FLAG_BACKGROUND, RESULT_BACKGROUND)
+    PollingCommand, RESULT_ABORTED, FLAG_BACKGROUND, RESULT_BACKGROUND, WAIT_TIMEOUT_IN_SECONDS)
 from pulp.devel.unit import base
 from pulp.devel.unit.task_simulator import TaskSimulator
 
@@ -356,3 +357,36 @@ class PollingCommandTests(base.PulpClientTests):
         self.assertEqual(result, RESULT_ABORTED)
 
         self.assertEqual(['abort'], self.prompt.get_write_tags())
+
+    def test_wait_task(self):
+        # Setup
+        self.bindings.tasks = mock.MagicMock()
+        task = Task({'task_id': '1', 'state': STATE_RUNNING, 'state_hash': 'abc'})
+        updated = Task({'task_id': '1', 'state': STATE_FINISHED, 'state_hash': 'def'})
+        self.bindings.tasks.wait_task.return_value.response_body = updated
+
+        # Test
+        result = self.command._wait_task(task)
+
+        # Verify
+        self.assertTrue(result is updated)
+        self.bindings.tasks.wait_task.assert_called_once_with('1', 'abc', WAIT_TIMEOUT_IN_SECONDS)
+        self.assertFalse(self.bindings.tasks.get_task.called)
+
+    def test_wait_task_not_supported(self):
+        # Setup
+        self.bindings.tasks = mock.MagicMock()
+        self.bindings.tasks.wait_task.side_effect = NotFoundException({})
+        task = Task({'task_id': '1', 'state': STATE_RUNNING})
+        updated = Task({'task_id': '1', 'state': STATE_FINISHED})
+        self.bindings.tasks.get_task.return_value.response_body = updated
+
+        # Test
+        result = self.command._wait_task(task)
+        self.command._wait_task(task)
+
+        # Verify
+        self.assertTrue(result is updated)
+        self.assertFalse(self.command.wait_supported)
+        self.assertEqual(self.bindings.tasks.wait_task.call_count, 1)
+        self.assertEqual(self.bindings.tasks.get_task.call_count, 2)
@@ -71,6 +71,16 @@ class UploadManagerTests(unittest.TestCase):
 
         self.assertTrue(isinstance(manager, upload_util.UploadManager))
         self.assertEqual(manager.upload_working_dir, '/a/b/c/default')
+        self.assertEqual(manager.concurrency, upload_util.DEFAULT_CONCURRENCY)
+
+    def test_init_with_defaults_concurrency(self):
+        context = mock.MagicMock()
+        context.config = {'filesystem': {'upload_working_dir': '/a/b/c'},
+                          'server': {'upload_concurrency': '4'}}
+
+        manager = upload_util.UploadManager.init_with_defaults(context)
+
+        self.assertEqual(manager.concurrency, 4)
 
     def test_initialize_no_trackers(self):
         os.makedirs(self.upload_working_dir)
@@ -302,6 +312,85 @@ class UploadManagerTests(unittest.TestCase):
         tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
         self.assertEqual(rpm_size, tracker.offset)
 
+    def test_upload_parallel(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.concurrency = 4
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, 'm-1')
+
+        mock_callback = mock.Mock()
+
+        # Test
+        self.upload_manager.upload(upload_id, mock_callback.update_status)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        num_upload_calls = int(math.ceil(float(rpm_size) / float(self.upload_manager.chunk_size)))
+
+        # Every segment is sent once, in whatever order they completed
+        self.assertEqual(num_upload_calls, self.mock_upload_bindings.upload_segment.call_count)
+        f = open(TEST_RPM_FILENAME, 'r')
+        for single_call_args in self.mock_upload_bindings.upload_segment.call_args_list:
+            f.seek(single_call_args[0][1])
+            self.assertEqual(f.read(self.upload_manager.chunk_size), single_call_args[0][2])
+        f.close()
+        offsets = sorted(c[0][1] for c in self.mock_upload_bindings.upload_segment.call_args_list)
+        self.assertEqual(offsets, range(0, rpm_size, self.upload_manager.chunk_size))
+
+        # The callback reports the bytes uploaded so far
+        self.assertEqual(num_upload_calls, mock_callback.update_status.call_count)
+        progress = [c[0][0] for c in mock_callback.update_status.call_args_list]
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(rpm_size, progress[-1])
+
+        # Verify the state of the tracker file on disk
+        tf_filename = self.upload_manager._tracker_filename(upload_id)
+        tracker = upload_util.UploadTracker.load(tf_filename)
+        self.assertEqual(rpm_size, tracker.offset)
+        self.assertEqual([], tracker.completed)
+        self.assertEqual(True, tracker.is_finished_uploading)
+        self.assertEqual(False, tracker.is_running)
+
+    def test_upload_resume_skips_completed_segments(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, 'm-1')
+
+        # Simulate an interrupted parallel upload
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        tracker.offset = 200
+        tracker.completed = [(300, 500)]
+
+        # Test
+        self.upload_manager.upload(upload_id)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        offsets = [c[0][1] for c in self.mock_upload_bindings.upload_segment.call_args_list]
+        expected = [200] + range(500, rpm_size, self.upload_manager.chunk_size)
+        self.assertEqual(offsets, expected)
+        self.assertEqual(rpm_size, tracker.offset)
+
+    @mock.patch('pulp.client.upload.manager.TRACKER_SAVE_INTERVAL', 3600)
+    def test_upload_throttles_tracker_save(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1',
+                                                          {'k': 'v'}, 'm-1')
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+
+        # Test
+        with mock.patch.object(tracker, 'save') as mock_save:
+            self.upload_manager.upload(upload_id)
+
+        # Verify the tracker is only saved when the upload starts and ends
+        self.assertEqual(2, mock_save.call_count)
+
     def test_upload_concurrent_upload(self):
         # Setup
         self.upload_manager.initialize()
@@ -313,6 +402,23 @@ class UploadManagerTests(unittest.TestCase):
         # Test
         self.assertRaises(upload_util.ConcurrentUploadException, self.upload_manager.upload, upload_id)
 
+    def test_tracker_segment_completed(self):
+        tracker = upload_util.UploadTracker('t')
+        tracker.offset = 0
+
+        tracker.segment_completed(200, 300)
+        tracker.segment_completed(100, 200)
+        self.assertEqual(0, tracker.offset)
+        self.assertEqual([(100, 300)], tracker.completed)
+        self.assertEqual(200, tracker.bytes_completed())
+        self.assertTrue(tracker.is_completed(100, 200))
+        self.assertFalse(tracker.is_completed(0, 100))
+
+        tracker.segment_completed(0, 100)
+        self.assertEqual(300, tracker.offset)
+        self.assertEqual([], tracker.completed)
+        self.assertEqual(300, tracker.bytes_completed())
+
     def test_delete_upload(self):
         # Setup
         self.upload_manager.initialize()
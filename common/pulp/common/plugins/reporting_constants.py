@@ -13,6 +13,11 @@ PROGRESS_DETAILS_KEY = u'details'
 PROGRESS_STATE_KEY = u'state'
 PROGRESS_ERROR_DETAILS_KEY = u'error_details'
 PROGRESS_SUB_STEPS_KEY = u'sub_steps'
+PROGRESS_FILES_REUSED_KEY = u'files_reused'
+PROGRESS_FILES_COPIED_KEY = u'files_copied'
+PROGRESS_DOWNLOADS_IN_FLIGHT_KEY = u'downloads_in_flight'
+PROGRESS_BYTES_DOWNLOADED_KEY = u'bytes_downloaded'
+PROGRESS_BYTES_PER_SECOND_KEY = u'bytes_per_second'
 
 STATE_NOT_STARTED = u'NOT_STARTED'
 STATE_RUNNING = u'IN_PROGRESS'
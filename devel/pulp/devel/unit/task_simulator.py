@@ -135,6 +135,14 @@ class TaskSimulator(object):
 
         return response
 
+    def wait_task(self, task_id, state_hash=None, timeout=None):
+        """
+        Returns the next state for the given task without waiting; see get_task.
+
+        :return: response object as if the bindings had contacted the server
+        :rtype:  pulp.bindings.response.Response
+        """
+        return self.get_task(task_id)
 
     def get_all_tasks(self, tags=()):
         """
@@ -10,8 +10,10 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 
+from functools import partial
 from gettext import gettext as _
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
 from operator import itemgetter
 
 from pulp_node import constants
@@ -147,34 +149,58 @@ class HandlerStrategy(object):
         Add or update repositories based on bindings.
           - Merge repositories found in BOTH parent and child.
           - Add repositories found in the parent but NOT in the child.
+        Up to the number of repositories specified by the max_sync_concurrency
+        option are merged and synchronized concurrently.
         :param request: A synchronization request.
         :type request: SyncRequest
         """
-        for bind in request.bindings:
+        concurrency = request.options.get(constants.MAX_SYNC_CONCURRENCY_KEYWORD)
+        concurrency = int(concurrency or constants.DEFAULT_SYNC_CONCURRENCY)
+        merge = partial(self._merge_repository, request)
+        if concurrency > 1 and len(request.bindings) > 1:
+            pool = ThreadPool(min(concurrency, len(request.bindings)))
             try:
-                repo_id = bind['repo_id']
-                details = bind['details']
-                if request.cancelled():
-                    request.summary[repo_id].action = RepositoryReport.CANCELLED
-                    continue
-                parent = Repository(repo_id, details)
-                child = Repository.fetch(repo_id)
-                progress = request.progress.find_report(repo_id)
-                progress.begin_merging()
-                if child:
-                    request.summary[repo_id].action = RepositoryReport.MERGED
-                    child.merge(parent)
-                else:
-                    child = Repository(repo_id, parent.details)
-                    request.summary[repo_id].action = RepositoryReport.ADDED
-                    child.add()
-                self._synchronize_repository(request, repo_id)
-            except NodeError, ne:
-                request.summary.errors.append(ne)
-            except Exception, e:
-                log.exception(repo_id)
-                error = CaughtException(e, repo_id)
-                request.summary.errors.append(error)
+                pool.map(merge, request.bindings)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for bind in request.bindings:
+                merge(bind)
+
+    def _merge_repository(self, request, bind):
+        """
+        Add or update the repository and synchronize it based on a binding.
+        Errors are added to the summary report.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param bind: A consumer binding payload.
+        :type bind: dict
+        """
+        repo_id = bind['repo_id']
+        try:
+            details = bind['details']
+            if request.cancelled():
+                request.summary[repo_id].action = RepositoryReport.CANCELLED
+                return
+            parent = Repository(repo_id, details)
+            child = Repository.fetch(repo_id)
+            progress = request.progress.find_report(repo_id)
+            progress.begin_merging()
+            if child:
+                request.summary[repo_id].action = RepositoryReport.MERGED
+                child.merge(parent)
+            else:
+                child = Repository(repo_id, parent.details)
+                request.summary[repo_id].action = RepositoryReport.ADDED
+                child.add()
+            self._synchronize_repository(request, repo_id)
+        except NodeError, ne:
+            request.summary.errors.append(ne)
+        except Exception, e:
+            log.exception(repo_id)
+            error = CaughtException(e, repo_id)
+            request.summary.errors.append(error)
 
     def _synchronize_repository(self, request, repo_id):
         """
@@ -35,6 +35,7 @@ log = getLogger(__name__)
 
 PROPERTY_MISSING = _('Missing required configuration property: %(p)s')
 STRATEGY_UNSUPPORTED = _('Strategy %(s)s not supported')
+INVENTORY_UNSUPPORTED = _('Inventory %(i)s not supported')
 
 CONFIGURATION_PATH = '/etc/pulp/server/plugins.conf.d/nodes/importer/http.conf'
 
@@ -100,6 +101,11 @@ class NodesHttpImporter(Importer):
             msg = STRATEGY_UNSUPPORTED % dict(s=strategy)
             errors.append(msg)
 
+        inventory = config.get(constants.INVENTORY_KEYWORD, constants.DEFAULT_INVENTORY)
+        if inventory not in constants.INVENTORIES:
+            msg = INVENTORY_UNSUPPORTED % dict(i=inventory)
+            errors.append(msg)
+
         valid = not bool(errors)
         return valid, errors
 
@@ -9,7 +9,15 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import os
+import shutil
+
+from tempfile import mkdtemp
+
+from pulp.server.compat import json
+
 from pulp_node import constants
+from pulp_node.manifest import UnitRef, SORT_CHUNK_SIZE, sort_records, unit_id
 
 
 class UniqueKey(object):
@@ -109,4 +117,212 @@ class UnitInventory(object):
             child_last_updated = child_unit.get(constants.LAST_UPDATED, 0)
             if parent_last_updated > child_last_updated:
                 updated.append((unit, ref))
-        return updated
\ No newline at end of file
+        return updated
+
+    def close(self):
+        """
+        Release resources used by the inventory.
+        """
+        pass
+
+
+class SortedUnitInventory(object):
+    """
+    The unit inventory of both the parent and child content units associated with
+    a specific repository that is kept on disk rather than in memory.  Both inventories
+    are sorted by unique key using an external (merge) sort and compared in a single
+    merge pass.  The units added, removed and updated are written to files within
+    a temporary directory and read back as they are iterated.  As a result, the
+    memory used does not depend on the number of units in the repository.
+    :ivar base_URL: The base URL for downloading parent units.
+    :type base_URL: str
+    :ivar tmp_dir: The absolute path to the temporary directory containing the inventory.
+    :type tmp_dir: str
+    :ivar chunk_size: The maximum number of units sorted in memory at one time.
+    :type chunk_size: int
+    """
+
+    CHUNK_SIZE = SORT_CHUNK_SIZE
+
+    ADDED = 'added.json'
+    REMOVED = 'removed.json'
+    UPDATED = 'updated.json'
+
+    def __init__(self, base_URL, parent_units, child_units, working_dir, chunk_size=CHUNK_SIZE):
+        """
+        :param base_URL: The base URL for downloading parent units.
+        :param parent_units: The content units in the parent node.
+        :type parent_units: iterable
+        :param child_units: The content units in the child node.
+        :type child_units: iterable
+        :param working_dir: The absolute path to a directory used as temporary storage.
+        :type working_dir: str
+        :param chunk_size: The maximum number of units sorted in memory at one time.
+        :type chunk_size: int
+        """
+        self.base_URL = base_URL
+        self.tmp_dir = mkdtemp(dir=working_dir)
+        self.chunk_size = chunk_size
+        self.listings = {}
+        try:
+            parent_units = self._sort(self._parent_records(parent_units), 'parent')
+            child_units = self._sort(self._child_records(child_units), 'child')
+            self._merge(parent_units, child_units)
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def _parent_records(units):
+        for unit, ref in units:
+            unit.pop('metadata', None)
+            yield unit_id(unit), [unit, ref.path, ref.offset, ref.length]
+
+    @staticmethod
+    def _child_records(units):
+        for unit in units:
+            unit.pop('metadata', None)
+            yield unit_id(unit), unit
+
+    def _sort(self, records, name):
+        """
+        Sort (key, record) pairs by key using an external merge sort.
+        :param records: An iterable of (key, record).
+        :type records: iterable
+        :param name: The name used to prefix the runs.
+        :type name: str
+        :return: A generator of (key, json encoded record) sorted by key.
+        :rtype: generator
+        """
+        records = ((key, json.dumps(record)) for key, record in records)
+        return sort_records(records, self.tmp_dir, name, self.chunk_size)
+
+    def _merge(self, parent_units, child_units):
+        """
+        Compare the sorted parent and child inventories in a single pass and
+        write the units added, removed and updated on the parent to files.
+        :param parent_units: Parent (key, json encoded record) sorted by key.
+        :type parent_units: generator
+        :param child_units: Child (key, json encoded record) sorted by key.
+        :type child_units: generator
+        """
+        added = _Writer(os.path.join(self.tmp_dir, self.ADDED))
+        removed = _Writer(os.path.join(self.tmp_dir, self.REMOVED))
+        updated = _Writer(os.path.join(self.tmp_dir, self.UPDATED))
+        try:
+            parent = next(parent_units, None)
+            child = next(child_units, None)
+            while parent is not None or child is not None:
+                if child is None or (parent is not None and parent[0] < child[0]):
+                    added.write(parent[1])
+                    parent = next(parent_units, None)
+                    continue
+                if parent is None or child[0] < parent[0]:
+                    removed.write(child[1])
+                    child = next(child_units, None)
+                    continue
+                parent_record = json.loads(parent[1])
+                child_unit = json.loads(child[1])
+                parent_last_updated = parent_record[0].get(constants.LAST_UPDATED, 0)
+                child_last_updated = child_unit.get(constants.LAST_UPDATED, 0)
+                if parent_last_updated > child_last_updated:
+                    updated.write(parent[1])
+                parent = next(parent_units, None)
+                child = next(child_units, None)
+        finally:
+            added.close()
+            removed.close()
+            updated.close()
+        self.listings = {
+            self.ADDED: _Listing(added.path, added.total, self._parent_unit),
+            self.REMOVED: _Listing(removed.path, removed.total, self._child_unit),
+            self.UPDATED: _Listing(updated.path, updated.total, self._parent_unit),
+        }
+
+    @staticmethod
+    def _parent_unit(record):
+        unit, path, offset, length = record
+        return unit, UnitRef(path, offset, length)
+
+    @staticmethod
+    def _child_unit(record):
+        return record
+
+    def units_on_parent_only(self):
+        """
+        Listing of units contained in the parent inventory
+        but not contained in the child inventory.
+        :return: Iterable of (unit, ref).
+        :rtype: iterable
+        """
+        return self.listings[self.ADDED]
+
+    def units_on_child_only(self):
+        """
+        Listing of units contained in the child inventory
+        but not contained in the parent inventory.
+        :return: Iterable of units that need to be purged.
+        :rtype: iterable
+        """
+        return self.listings[self.REMOVED]
+
+    def updated_units(self):
+        """
+        Listing of units updated on the parent.
+        :return: Iterable of (unit, ref).
+        :rtype: iterable
+        """
+        return self.listings[self.UPDATED]
+
+    def close(self):
+        """
+        Delete the temporary directory containing the inventory.
+        """
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class _Writer(object):
+    """
+    Writes json encoded records to a file, one per line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fp = open(path, 'w')
+        self.total = 0
+
+    def write(self, json_record):
+        self.fp.write(json_record)
+        self.fp.write('\n')
+        self.total += 1
+
+    def close(self):
+        self.fp.close()
+
+
+class _Listing(object):
+    """
+    An iterable listing of records read from a file written by _Writer.
+    The total number of records is reported by __len__().
+    """
+
+    def __init__(self, path, total, decode):
+        """
+        :param path: The absolute path to the file.
+        :type path: str
+        :param total: The number of records in the file.
+        :type total: int
+        :param decode: Called to convert each json decoded record.
+        :type decode: callable
+        """
+        self.path = path
+        self.total = total
+        self.decode = decode
+
+    def __iter__(self):
+        with open(self.path) as fp:
+            for line in fp:
+                yield self.decode(json.loads(line))
+
+    def __len__(self):
+        return self.total
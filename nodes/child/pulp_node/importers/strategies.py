@@ -18,7 +18,7 @@ from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.conduit import NodesConduit
 from pulp_node.manifest import Manifest, RemoteManifest
-from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.inventory import UnitInventory, SortedUnitInventory
 from pulp_node.importers.download import ContentDownloadListener
 from pulp_node.error import (NodeError, GetChildUnitsError, GetParentUnitsError, AddUnitError,
                              DeleteUnitError, InvalidManifestError, CaughtException)
@@ -153,10 +153,13 @@ class ImporterStrategy(object):
     def _unit_inventory(self, request):
         """
         Build the unit inventory.
+        The inventory is either held in memory or sorted on disk as
+        specified by the 'inventory' option in the configuration.
+        The caller is responsible for closing the inventory.
         :param request: A synchronization request.
         :type request: SyncRequest
         :return: The built inventory.
-        :rtype: UnitInventory
+        :rtype: UnitInventory|SortedUnitInventory
         """
         # fetch child units
         try:
@@ -186,7 +189,8 @@ class ImporterStrategy(object):
             if manifest != fetched_manifest or \
                     not manifest.is_valid() or not manifest.has_valid_units():
                 fetched_manifest.write()
-                fetched_manifest.fetch_units()
+                if not fetched_manifest.fetch_delta(manifest):
+                    fetched_manifest.fetch_units()
                 manifest = fetched_manifest
             if not manifest.is_valid():
                 raise InvalidManifestError()
@@ -199,7 +203,12 @@ class ImporterStrategy(object):
         # build the inventory
         parent_units = manifest.get_units()
         base_URL = manifest.publishing_details[constants.BASE_URL]
-        inventory = UnitInventory(base_URL, parent_units, child_units)
+        mode = request.config.get(constants.INVENTORY_KEYWORD, constants.DEFAULT_INVENTORY)
+        if mode == constants.SORTED_INVENTORY:
+            inventory = SortedUnitInventory(
+                base_URL, parent_units, child_units, request.working_dir)
+        else:
+            inventory = UnitInventory(base_URL, parent_units, child_units)
         return inventory
 
     def _reset_storage_path(self, unit):
@@ -353,9 +362,12 @@ class Mirror(ImporterStrategy):
         :type request: SyncRequest
         """
         unit_inventory = self._unit_inventory(request)
-        self._add_units(request, unit_inventory)
-        self._update_units(request, unit_inventory)
-        self._delete_units(request, unit_inventory)
+        try:
+            self._add_units(request, unit_inventory)
+            self._update_units(request, unit_inventory)
+            self._delete_units(request, unit_inventory)
+        finally:
+            unit_inventory.close()
 
 
 class Additive(ImporterStrategy):
@@ -376,8 +388,11 @@ class Additive(ImporterStrategy):
         :type request: SyncRequest
         """
         unit_inventory = self._unit_inventory(request)
-        self._add_units(request, unit_inventory)
-        self._update_units(request, unit_inventory)
+        try:
+            self._add_units(request, unit_inventory)
+            self._update_units(request, unit_inventory)
+        finally:
+            unit_inventory.close()
 
 
 STRATEGIES = {
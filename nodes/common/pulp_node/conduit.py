@@ -22,21 +22,18 @@ class NodesConduit(object):
     def get_units(self, repo_id):
         """
         Get all units associated with a repository.
+        The associations are read from the database in batches so that
+        only the units of one batch are held in memory at a time.
         :param repo_id: The repository ID used to query the units.
         :type repo_id: str
         :return: unit iterator
         :rtype: UnitsIterator
         """
-        units = {}
-        types = {}
+        query = {'repo_id': repo_id}
         collection = RepoContentUnit.get_collection()
-        for unit in collection.find({'repo_id': repo_id}):
-            unit_id = unit['unit_id']
-            type_id = unit['unit_type_id']
-            units[unit_id] = unit
-            unit_list = types.setdefault(type_id, [])
-            unit_list.append(unit['unit_id'])
-        return UnitsIterator(units, types)
+        total = collection.find(query).count()
+        associations = collection.find(query)
+        return UnitsIterator(associations, total)
 
 
 # --- typedef -----------------------------------------------------------------
@@ -60,6 +57,8 @@ class Typedef(object):
 
 class UnitsIterator:
 
+    BATCH_SIZE = 1000
+
     @staticmethod
     def associated_unit(typedef, unit, metadata):
         unit_key = {}
@@ -93,19 +92,45 @@ class UnitsIterator:
             yield cursor
 
     @staticmethod
-    def get_units(units, types):
+    def batches(associations, batch_size):
+        units = {}
+        types = {}
+        for unit in associations:
+            unit_id = unit['unit_id']
+            type_id = unit['unit_type_id']
+            units[unit_id] = unit
+            unit_list = types.setdefault(type_id, [])
+            unit_list.append(unit['unit_id'])
+            if len(units) >= batch_size:
+                yield units, types
+                units = {}
+                types = {}
+        if units:
+            yield units, types
+
+    @staticmethod
+    def get_units(associations, batch_size):
         typedefs = Typedef()
-        for cursor in UnitsIterator.open_cursors(types):
-            for metadata in cursor:
-                unit_id = metadata['_id']
-                unit = units[unit_id]
-                type_id = unit['unit_type_id']
-                typedef = typedefs.get(type_id)
-                yield UnitsIterator.associated_unit(typedef, unit, metadata)
-
-    def __init__(self, units, types):
-        self.length = len(units)
-        self.unit_generator = UnitsIterator.get_units(units, types)
+        for units, types in UnitsIterator.batches(associations, batch_size):
+            for cursor in UnitsIterator.open_cursors(types):
+                for metadata in cursor:
+                    unit_id = metadata['_id']
+                    unit = units[unit_id]
+                    type_id = unit['unit_type_id']
+                    typedef = typedefs.get(type_id)
+                    yield UnitsIterator.associated_unit(typedef, unit, metadata)
+
+    def __init__(self, associations, total, batch_size=BATCH_SIZE):
+        """
+        :param associations: The repository-unit associations.
+        :type associations: iterable
+        :param total: The number of associations.
+        :type total: int
+        :param batch_size: The maximum number of units fetched from the database at once.
+        :type batch_size: int
+        """
+        self.length = total
+        self.unit_generator = UnitsIterator.get_units(associations, batch_size)
 
     def next(self):
         return self.unit_generator.next()
@@ -32,15 +32,25 @@ REPOSITORY_SCOPE = 'repository'
 SCOPES = [NODE_SCOPE, REPOSITORY_SCOPE]
 
 
+# --- inventories ------------------------------------------------------------
+
+MEMORY_INVENTORY = 'memory'
+SORTED_INVENTORY = 'sorted'
+INVENTORIES = [MEMORY_INVENTORY, SORTED_INVENTORY]
+DEFAULT_INVENTORY = MEMORY_INVENTORY
+
+
 # --- keywords ---------------------------------------------------------------
 
 STRATEGY_KEYWORD = 'strategy'
 PROTOCOL_KEYWORD = 'protocol'
 MANIFEST_URL_KEYWORD = 'manifest_url'
 PURGE_ORPHANS_KEYWORD = 'purge_orphans'
+INVENTORY_KEYWORD = 'inventory'
 
 MAX_DOWNLOAD_BANDWIDTH_KEYWORD = 'max_download_bandwidth'
 MAX_DOWNLOAD_CONCURRENCY_KEYWORD = 'max_download_concurrency'
+MAX_SYNC_CONCURRENCY_KEYWORD = 'max_sync_concurrency'
 
 SKIP_CONTENT_UPDATE_KEYWORD = 'skip_content_update'
 
@@ -66,6 +76,7 @@ STRATEGY_NOTE_KEY = '_node-update-strategy'
 # --- settings ---------------------------------------------------------------
 
 DEFAULT_DOWNLOAD_CONCURRENCY = 20
+DEFAULT_SYNC_CONCURRENCY = 1
 
 
 # --- profiling --------------------------------------------------------------
@@ -14,13 +14,22 @@ Provides classes for managing the content unit manifest.
 The manifest is a json encoded file that defines content units
 associated with repository.  The units themselves are stored in a separate
 json encoded file.  For performance reasons, the unit files are compressed.
+A manifest may also reference a delta file containing the units added, updated
+and removed since the previously published manifest.  The delta is used to
+update a copy of the units file of the previous manifest rather than downloading
+all of the units again.  Both the units file and the delta file are sorted by
+unit ID so that a delta is computed and applied by merging the files in a single
+pass, without holding the units in memory.
 """
 
 import os
 import gzip
+import heapq
 import errno
 
+from itertools import groupby
 from logging import getLogger
+from operator import itemgetter
 
 from nectar.request import DownloadRequest
 from nectar.listener import AggregatingEventListener
@@ -39,6 +48,7 @@ log = getLogger(__name__)
 MANIFEST_VERSION = 2
 MANIFEST_FILE_NAME = 'manifest.json'
 UNITS_FILE_NAME = 'units.json.gz'
+DELTA_FILE_NAME = 'delta.json.gz'
 
 ID = 'id'
 VERSION = 'version'
@@ -48,6 +58,14 @@ UNITS = 'units'
 UNITS_PATH = 'path'
 UNITS_TOTAL = 'total'
 UNITS_SIZE = 'size'
+DELTA = 'delta'
+DELTA_BASE_ID = 'base_id'
+DELTA_ACTION = 'action'
+DELTA_UNIT = 'unit'
+DELTA_ADD = 'add'
+DELTA_REMOVE = 'remove'
+
+SORT_CHUNK_SIZE = 10000
 
 
 # --- utils -----------------------------------------------------------------------------
@@ -76,6 +94,183 @@ def unzip(path, destination, bfrlen=65535):
         fp_in.close()
 
 
+def unit_id(unit):
+    """
+    Get a string that uniquely identifies a content unit by type_id and unit_key.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The unit ID.
+    :rtype: str
+    """
+    return json.dumps([unit['type_id'], unit['unit_key']], sort_keys=True)
+
+
+def open_units(path):
+    """
+    Open a units file that may or may not be compressed.
+    :param path: The path to a units file.
+    :type path: str
+    :return: An open file.
+    :raise IOError: on I/O errors.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path)
+    else:
+        return open(path)
+
+
+def read_sorted(path, get_unit=None):
+    """
+    Read a file of json encoded lines sorted by the unit ID of the unit each line contains.
+    :param path: The path to a (compressed) units or delta file.
+    :type path: str
+    :param get_unit: Called with each json decoded line to get the unit it contains.
+        When None, each line is a unit.
+    :type get_unit: callable
+    :return: A generator of: (unit ID, json decoded line, json encoded line).
+    :rtype: generator
+    :raise IOError: on I/O errors.
+    :raise ValueError: on json decoding errors or when the file is not sorted by unit ID.
+    """
+    fp = open_units(path)
+    try:
+        last_key = None
+        for json_line in fp:
+            json_line = json_line.rstrip('\n')
+            line = json.loads(json_line)
+            key = unit_id(get_unit(line) if get_unit else line)
+            if last_key is not None and key <= last_key:
+                raise ValueError('%s: not sorted by unit ID' % path)
+            last_key = key
+            yield key, line, json_line
+    finally:
+        fp.close()
+
+
+def sort_records(records, tmp_dir, name, chunk_size=SORT_CHUNK_SIZE):
+    """
+    Sort (key, json encoded record) pairs by key using an external merge sort.
+    The records are sorted in chunks of chunk_size that are each written to
+    a file (run) within the temporary directory.  The runs are then merged.
+    When more than one record has the same key, only the last is kept.
+    :param records: An iterable of (key, json encoded record).
+    :type records: iterable
+    :param tmp_dir: The absolute path to the directory the runs are written to.
+    :type tmp_dir: str
+    :param name: The name used to prefix the runs.
+    :type name: str
+    :param chunk_size: The maximum number of records sorted in memory at one time.
+    :type chunk_size: int
+    :return: A generator of (key, json encoded record) sorted by key.
+    :rtype: generator
+    """
+    runs = []
+    chunk = []
+    for n, (key, json_record) in enumerate(records):
+        chunk.append((key, n, json_record))
+        if len(chunk) >= chunk_size:
+            runs.append(_write_run(chunk, os.path.join(tmp_dir, '%s.%d' % (name, len(runs)))))
+            chunk = []
+    if chunk:
+        runs.append(_write_run(chunk, os.path.join(tmp_dir, '%s.%d' % (name, len(runs)))))
+    merged = heapq.merge(*[_read_run(path) for path in runs])
+    for key, group in groupby(merged, itemgetter(0)):
+        for key, n, json_record in group:
+            pass
+        yield key, json_record
+
+
+def _write_run(chunk, path):
+    """
+    Sort a chunk of records and write it to a file.
+    :param chunk: A list of: (key, sequence, json encoded record).
+    :type chunk: list
+    :param path: The absolute path to the file.
+    :type path: str
+    :return: The absolute path to the file.
+    :rtype: str
+    """
+    chunk.sort()
+    with open(path, 'w') as fp:
+        for item in chunk:
+            fp.write(json.dumps(item))
+            fp.write('\n')
+    return path
+
+
+def _read_run(path):
+    with open(path) as fp:
+        for line in fp:
+            yield tuple(json.loads(line))
+
+
+def diff_units(previous_path, units_path):
+    """
+    Compare two units files sorted by unit ID in a single pass.
+    :param previous_path: The path to the units file of the previous manifest.
+    :type previous_path: str
+    :param units_path: The path to the units file of the new manifest.
+    :type units_path: str
+    :return: A generator of (action, unit) sorted by unit ID: DELTA_ADD for
+        each unit added or updated and DELTA_REMOVE for each unit removed.
+    :rtype: generator
+    :raise IOError: on I/O errors.
+    :raise ValueError: on json decoding errors or when a file is not sorted by unit ID.
+    """
+    previous_units = read_sorted(previous_path)
+    units = read_sorted(units_path)
+    previous = next(previous_units, None)
+    unit = next(units, None)
+    while previous is not None or unit is not None:
+        if unit is None or (previous is not None and previous[0] < unit[0]):
+            yield DELTA_REMOVE, previous[1]
+            previous = next(previous_units, None)
+            continue
+        if previous is None or unit[0] < previous[0]:
+            yield DELTA_ADD, unit[1]
+            unit = next(units, None)
+            continue
+        if unit[2] != previous[2]:
+            yield DELTA_ADD, unit[1]
+        previous = next(previous_units, None)
+        unit = next(units, None)
+
+
+def apply_delta(units_path, delta_path, destination):
+    """
+    Write the units contained in a units file updated using a delta file.
+    Both files are sorted by unit ID and merged in a single pass, so the
+    units written are sorted by unit ID as well.
+    :param units_path: The path to the units file of the previous manifest.
+    :type units_path: str
+    :param delta_path: The path to the delta file.
+    :type delta_path: str
+    :param destination: The path to the (compressed) units file written.
+    :type destination: str
+    :return: The writer used to write the units.
+    :rtype: UnitWriter
+    :raise IOError: on I/O errors.
+    :raise ValueError: json decoding errors or a file not sorted by unit ID.
+    """
+    units = read_sorted(units_path)
+    changes = read_sorted(delta_path, itemgetter(DELTA_UNIT))
+    with UnitWriter(destination) as writer:
+        unit = next(units, None)
+        change = next(changes, None)
+        while unit is not None or change is not None:
+            if change is None or (unit is not None and unit[0] < change[0]):
+                writer.add_encoded(unit[2])
+                unit = next(units, None)
+                continue
+            if unit is not None and unit[0] == change[0]:
+                # replaced or removed by the change
+                unit = next(units, None)
+            if change[1][DELTA_ACTION] != DELTA_REMOVE:
+                writer.add(change[1][DELTA_UNIT])
+            change = next(changes, None)
+    return writer
+
+
 # --- manifest --------------------------------------------------------------------------
 
 
@@ -90,6 +285,9 @@ class Manifest(object):
     :type total_units: int
     :param publishing_details: Details of how units have been published.
     :type publishing_details: dict
+    :ivar delta: Describes the delta file: the ID of the manifest it is based on
+        and the number of changes it contains.  None when not published.
+    :type delta: dict
     """
 
     def __init__(self, path, manifest_id=None):
@@ -104,6 +302,7 @@ class Manifest(object):
         self.version = MANIFEST_VERSION
         self.units = {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0}
         self.publishing_details = {}
+        self.delta = None
         if os.path.isdir(path):
             path = pathlib.join(path, MANIFEST_FILE_NAME)
         self.path = path
@@ -118,7 +317,8 @@ class Manifest(object):
             ID: self.id,
             VERSION: self.version,
             UNITS: self.units,
-            PUBLISHING_DETAILS: self.publishing_details
+            PUBLISHING_DETAILS: self.publishing_details,
+            DELTA: self.delta
         }
         with open(self.path, 'w+') as fp:
             json.dump(state, fp, indent=2)
@@ -138,6 +338,7 @@ class Manifest(object):
         self.version = d.get(VERSION, 0)
         self.units = d.get(UNITS, {UNITS_PATH: None, UNITS_TOTAL: 0, UNITS_SIZE: 0})
         self.publishing_details = d.get(PUBLISHING_DETAILS, {})
+        self.delta = d.get(DELTA)
 
     def get_units(self):
         """
@@ -164,6 +365,20 @@ class Manifest(object):
         self.units[UNITS_TOTAL] = unit_writer.total_units
         self.units[UNITS_SIZE] = unit_writer.bytes_written
 
+    def delta_published(self, delta_writer, base_id):
+        """
+        Update the manifest delta information.
+        :param delta_writer: A writer used to publish the delta.
+        :type delta_writer: DeltaWriter
+        :param base_id: The ID of the manifest the delta is based on.
+        :type base_id: str
+        """
+        self.delta = {
+            DELTA_BASE_ID: base_id,
+            UNITS_TOTAL: delta_writer.total_units,
+            UNITS_SIZE: delta_writer.bytes_written
+        }
+
     def published(self, details):
         """
         Update the publishing details.
@@ -292,6 +507,57 @@ class RemoteManifest(Manifest):
             report = listener.failed_reports[0]
             raise ManifestDownloadError(self.url, report.error_msg)
 
+    def fetch_delta(self, previous):
+        """
+        Fetch the delta file referenced in the manifest and use it to update
+        the units file of the previous manifest.  The delta is used only when
+        it is based on the previous manifest and the previous units file is valid.
+        :param previous: The previous manifest.
+        :type previous: Manifest
+        :return: True if the units file has been updated using the delta.  When
+            False, the units file must be fetched using fetch_units().
+        :rtype: bool
+        """
+        if not self.delta or self.delta.get(DELTA_BASE_ID) != previous.id:
+            return False
+        if not previous.is_valid() or not previous.has_valid_units():
+            return False
+        base_url = self.url.rsplit('/', 1)[0]
+        url = pathlib.join(base_url, DELTA_FILE_NAME)
+        dir_path = os.path.dirname(self.path)
+        delta_path = pathlib.join(dir_path, DELTA_FILE_NAME)
+        units_path = pathlib.join(dir_path, '.' + UNITS_FILE_NAME)
+        request = DownloadRequest(str(url), delta_path)
+        listener = AggregatingEventListener()
+        self.downloader.event_listener = listener
+        self.downloader.download([request])
+        if listener.failed_reports:
+            report = listener.failed_reports[0]
+            log.info('delta %s not downloaded: %s', url, report.error_msg)
+            return False
+        try:
+            writer = apply_delta(previous.units_path(), delta_path, units_path)
+        except (IOError, ValueError, KeyError):
+            log.exception(url)
+            return False
+        finally:
+            if os.path.exists(delta_path):
+                os.unlink(delta_path)
+        if writer.total_units != self.units[UNITS_TOTAL]:
+            log.info('delta %s not applied: expected %d units, found %d',
+                     url, self.units[UNITS_TOTAL], writer.total_units)
+            os.unlink(units_path)
+            return False
+        previous_path = previous.units_path()
+        destination = pathlib.join(dir_path, UNITS_FILE_NAME)
+        os.rename(units_path, destination)
+        if previous_path != destination and os.path.exists(previous_path):
+            os.unlink(previous_path)
+        self.units[UNITS_PATH] = destination
+        self.units[UNITS_SIZE] = writer.bytes_written
+        self.write()
+        return True
+
 
 class UnitWriter(object):
     """
@@ -342,11 +608,23 @@ class UnitWriter(object):
         Add (write) the specified unit to the file as a json encoded string.
         :param unit: A content unit.
         :type unit: dict
+        :return: The json encoded unit.
+        :rtype: str
         :raise IOError: on I/O errors.
         :raise ValueError: json encoding errors
         """
-        self.total_units += 1
         json_unit = json.dumps(unit)
+        self.add_encoded(json_unit)
+        return json_unit
+
+    def add_encoded(self, json_unit):
+        """
+        Add (write) the specified json encoded unit to the file.
+        :param json_unit: A json encoded content unit.
+        :type json_unit: str
+        :raise IOError: on I/O errors.
+        """
+        self.total_units += 1
         self.fp.write(json_unit)
         self.fp.write('\n')
 
@@ -369,6 +647,41 @@ class UnitWriter(object):
         return False
 
 
+class DeltaWriter(UnitWriter):
+    """
+    Writes the units added, updated and removed since the previously
+    published manifest to a delta file.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to a file or directory.
+            When a directory is specified, the standard file name is appended.
+        :type path: str
+        :raise IOError: on I/O errors
+        """
+        if os.path.isdir(path):
+            path = pathlib.join(path, DELTA_FILE_NAME)
+        UnitWriter.__init__(self, path)
+
+    def unit_added(self, unit):
+        """
+        Add (write) a unit that has been added or updated.
+        :param unit: A content unit.
+        :type unit: dict
+        """
+        self.add({DELTA_ACTION: DELTA_ADD, DELTA_UNIT: unit})
+
+    def unit_removed(self, unit):
+        """
+        Add (write) a unit that has been removed.
+        :param unit: A content unit.
+        :type unit: dict
+        """
+        unit = dict(type_id=unit['type_id'], unit_key=unit['unit_key'])
+        self.add({DELTA_ACTION: DELTA_REMOVE, DELTA_UNIT: unit})
+
+
 class UnitIterator:
     """
     Used to iterate content units inventory file associated with a manifest.
@@ -38,23 +38,32 @@ class PollingFailed(Exception):
 class TaskPoller(object):
     """
     The task poller is used to poll a running task by ID.
+    Each poll waits on the server until the state or progress of the task
+    has changed or the timeout has passed.
     :ivar binding: A pulp API binding.
     :type binding: pulp_node.handlers.model.PulpBinding
     :ivar delay: The delay in seconds between each poll.
     :type delay: int
+    :ivar timeout: The maximum number of seconds the server waits on each poll.
+    :type timeout: int
     """
 
     DELAY = 1
+    TIMEOUT = 10
 
-    def __init__(self, binding, delay=DELAY):
+    def __init__(self, binding, delay=DELAY, timeout=TIMEOUT):
         """
         :param binding: A pulp API binding.
         :type binding: pulp_node.handlers.model.PulpBinding
         :param delay: The delay in seconds between each poll.
         :type delay: int
+        :param timeout: The maximum number of seconds the server waits on each poll.
+            This also bounds how long cancellation may take to be noticed.
+        :type timeout: int
         """
         self.binding = binding
         self.delay = delay
+        self.timeout = timeout
 
     def join(self, task_id, progress, cancelled):
         """
@@ -73,6 +82,7 @@ class TaskPoller(object):
         poll = True
         task_result = None
         last_hash = 0
+        state_hash = None
 
         while poll:
             if cancelled():
@@ -81,12 +91,13 @@ class TaskPoller(object):
 
             sleep(self.delay)
 
-            http = self.binding.tasks.get_task(task_id)
+            http = self.binding.tasks.wait_task(task_id, state_hash, self.timeout)
             if http.response_code != httplib.OK:
                 msg = FETCH_TASK_FAILED % {'t': task_id, 'c': http.response_code}
                 raise PollingFailed(msg)
 
             task = http.response_body
+            state_hash = task.state_hash
 
             if task.state == CALL_ERROR_STATE:
                 msg = TASK_FAILED % {'t': task_id, 's': task.state}
@@ -10,15 +10,20 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import os
+import errno
+import shutil
 import tarfile
 
 from uuid import uuid4
 from tempfile import mkdtemp
 from logging import getLogger
 
+from pulp.server.compat import json
+
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.manifest import Manifest, UnitWriter
+from pulp_node.manifest import Manifest, UnitWriter, DeltaWriter, MANIFEST_FILE_NAME
+from pulp_node.manifest import DELTA_REMOVE, diff_units, sort_records, unit_id
 
 
 log = getLogger(__name__)
@@ -110,7 +115,10 @@ class FilePublisher(Publisher):
         Publish the specified units.
         Writes the units.json file and symlinks each of the files associated
         to the unit.storage_path.  Publishing is staged in a temporary directory and
-        must use commit() to make the publishing permanent.
+        must use commit() to make the publishing permanent.  The units are written
+        sorted by unit ID.  When a valid manifest has been previously published,
+        a delta file containing the units added, updated and removed since is also
+        written.  The delta is computed by merging the sorted units files.
         :param units: A list of units to publish.
         :type units: iterable
         :return: The absolute path to the manifest.
@@ -121,17 +129,81 @@ class FilePublisher(Publisher):
         pathlib.mkdir(parent_path)
         self.tmp_dir = mkdtemp(dir=parent_path)
 
-        with UnitWriter(self.tmp_dir) as writer:
-            for unit in units:
-                self.publish_unit(unit)
-                writer.add(unit)
+        sort_dir = mkdtemp(dir=parent_path)
+        try:
+            with UnitWriter(self.tmp_dir) as writer:
+                for key, json_unit in sort_records(self._unit_records(units), sort_dir, 'units'):
+                    writer.add_encoded(json_unit)
+        finally:
+            shutil.rmtree(sort_dir, ignore_errors=True)
         manifest_id = str(uuid4())
         manifest = Manifest(self.tmp_dir, manifest_id)
         manifest.units_published(writer)
+        previous = self.previous_manifest()
+        if previous:
+            self.publish_delta(manifest, previous, writer)
         manifest.write()
         self.staged = True
         return manifest.path
 
+    def _unit_records(self, units):
+        for unit in units:
+            self.publish_unit(unit)
+            yield unit_id(unit), json.dumps(unit)
+
+    def publish_delta(self, manifest, previous, writer):
+        """
+        Write the delta file containing the units added, updated and removed
+        since the previously published manifest.  The delta is discarded when
+        it contains as many units as the units file.
+        :param manifest: The manifest being published.
+        :type manifest: Manifest
+        :param previous: The previously published manifest.
+        :type previous: Manifest
+        :param writer: The writer used to write the units file.
+        :type writer: UnitWriter
+        """
+        published = False
+        delta = DeltaWriter(self.tmp_dir)
+        try:
+            for action, unit in diff_units(previous.units_path(), writer.path):
+                if delta.total_units >= writer.total_units:
+                    # not worth it
+                    break
+                if action == DELTA_REMOVE:
+                    delta.unit_removed(unit)
+                else:
+                    delta.unit_added(unit)
+            published = delta.total_units < writer.total_units
+        except (IOError, ValueError):
+            log.exception(previous.units_path())
+        finally:
+            delta.close()
+        if published:
+            manifest.delta_published(delta, previous.id)
+        else:
+            os.unlink(delta.path)
+
+    def previous_manifest(self):
+        """
+        Read the previously published manifest.
+        :return: The manifest or None when no valid manifest has been published.
+        :rtype: Manifest
+        """
+        manifest = Manifest(pathlib.join(self.publish_dir, MANIFEST_FILE_NAME))
+        try:
+            manifest.read()
+        except IOError, e:
+            if e.errno != errno.ENOENT:
+                log.exception(manifest.path)
+            return None
+        except ValueError:
+            log.exception(manifest.path)
+            return None
+        if not manifest.id or not manifest.is_valid() or not manifest.has_valid_units():
+            return None
+        return manifest
+
     def publish_unit(self, unit):
         """
         Publish the file associated with the unit into the publish directory.
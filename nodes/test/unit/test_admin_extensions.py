@@ -34,6 +34,7 @@ NODE_ID = 'test.redhat.com'
 REPOSITORY_ID = 'test_repository'
 MAX_BANDWIDTH = 12345
 MAX_CONCURRENCY = 54321
+MAX_SYNC_CONCURRENCY = 4
 
 
 # --- binding mocks ----------------------------------------------------------
@@ -411,7 +412,8 @@ class TestUpdateCommands(ClientTests):
         keywords = {
             NODE_ID_OPTION.keyword: NODE_ID,
             MAX_BANDWIDTH_OPTION.keyword: MAX_BANDWIDTH,
-            MAX_CONCURRENCY_OPTION.keyword: MAX_CONCURRENCY
+            MAX_CONCURRENCY_OPTION.keyword: MAX_CONCURRENCY,
+            MAX_SYNC_CONCURRENCY_OPTION.keyword: MAX_SYNC_CONCURRENCY
         }
         command.run(**keywords)
         # Verify
@@ -419,10 +421,12 @@ class TestUpdateCommands(ClientTests):
         options = {
             constants.MAX_DOWNLOAD_BANDWIDTH_KEYWORD: MAX_BANDWIDTH,
             constants.MAX_DOWNLOAD_CONCURRENCY_KEYWORD: MAX_CONCURRENCY,
+            constants.MAX_SYNC_CONCURRENCY_KEYWORD: MAX_SYNC_CONCURRENCY,
         }
         self.assertTrue(NODE_ID_OPTION in command.options)
         self.assertTrue(MAX_BANDWIDTH_OPTION in command.options)
         self.assertTrue(MAX_CONCURRENCY_OPTION in command.options)
+        self.assertTrue(MAX_SYNC_CONCURRENCY_OPTION in command.options)
         mock_update.assert_called_with(NODE_ID, units=units, options=options)
         mock_activated.assert_called_with(self.context, NODE_ID)
 
@@ -145,6 +145,58 @@ class TestBase(TestCase):
         self.assertEqual(request.summary.errors[0].error_id, RepoSyncRestError.ERROR_ID)
         self.assertEqual(request.summary.errors[0].details['http_code'], 401)
 
+    @patch('pulp_node.handlers.strategies.ThreadPool')
+    @patch('pulp_node.handlers.strategies.HandlerStrategy._merge_repository')
+    def test_merge_repositories_concurrent(self, mock_merge, mock_pool):
+        # Setup
+        mock_pool.return_value.map.side_effect = lambda fn, items: [fn(i) for i in items]
+        request = self.request()
+        request.bindings = [dict(repo_id='r-%d' % n, details={}) for n in range(5)]
+        request.options[constants.MAX_SYNC_CONCURRENCY_KEYWORD] = 3
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        mock_pool.assert_called_once_with(3)
+        mock_pool.return_value.close.assert_called_once_with()
+        mock_pool.return_value.join.assert_called_once_with()
+        self.assertEqual(mock_merge.call_count, len(request.bindings))
+        for bind in request.bindings:
+            mock_merge.assert_any_call(request, bind)
+
+    @patch('pulp_node.handlers.strategies.ThreadPool')
+    @patch('pulp_node.handlers.strategies.HandlerStrategy._merge_repository')
+    def test_merge_repositories_serial(self, mock_merge, mock_pool):
+        # Setup
+        request = self.request()
+        request.bindings = [dict(repo_id='r-%d' % n, details={}) for n in range(5)]
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertFalse(mock_pool.called)
+        calls = [c[0][1] for c in mock_merge.call_args_list]
+        self.assertEqual(calls, request.bindings)
+
+    @patch('pulp_node.handlers.model.Repository.fetch')
+    @patch('pulp_node.handlers.strategies.HandlerStrategy._synchronize_repository')
+    def test_merge_repositories_concurrent_cancelled(self, mock_sync, mock_fetch):
+        # Setup
+        request = self.request(1)
+        bindings = [dict(repo_id='r-%d' % n, details={}) for n in range(3)]
+        request.bindings = bindings
+        request.summary.setup(bindings)
+        request.options[constants.MAX_SYNC_CONCURRENCY_KEYWORD] = 2
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertFalse(mock_fetch.called)
+        self.assertFalse(mock_sync.called)
+        for bind in bindings:
+            repository = request.summary.repository[bind['repo_id']]
+            self.assertEqual(repository.action, RepositoryReport.CANCELLED)
+
     @patch('pulp_node.handlers.model.Repository.fetch_all', return_value=[TestRepo('123')])
     @patch('pulp_node.handlers.model.Repository.delete', side_effect=ValueError())
     def test_delete_repositories_exception(self, *unused):
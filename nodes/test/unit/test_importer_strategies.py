@@ -21,7 +21,8 @@ from pulp.plugins.model import Unit
 from pulp.server.config import config as pulp_conf
 
 from pulp_node.importers.strategies import *
-from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.inventory import UnitInventory, SortedUnitInventory
+from pulp_node.manifest import UnitRef
 from pulp_node.importers.reports import SummaryReport, ProgressListener
 from pulp_node.reports import RepositoryProgress
 from pulp_node.error import *
@@ -272,3 +273,80 @@ class TestBase(TestCase):
         for name, strategy in STRATEGIES.items():
             self.assertEqual(find_strategy(name), strategy)
         self.assertRaises(StrategyUnsupported, find_strategy, '---')
+
+
+class TestSortedInventory(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def parent_units():
+        units = []
+        for n in (7, 3, 5, 1, 9, 3):
+            unit = dict(type_id='T', unit_key={'n': n}, metadata={}, last_updated=n)
+            units.append((unit, UnitRef('units.json', n, 1)))
+        return units
+
+    @staticmethod
+    def child_units():
+        units = []
+        for n in (8, 5, 1, 7, 2):
+            last_updated = 0 if n == 7 else n
+            unit = dict(unit_id='u%d' % n, type_id='T', unit_key={'n': n}, metadata={},
+                        last_updated=last_updated)
+            units.append(unit)
+        return units
+
+    def test_inventory(self):
+        # Test
+        inventory = SortedUnitInventory(
+            BASE_URL, self.parent_units(), self.child_units(), self.tmp_dir, chunk_size=2)
+        # Verify
+        added = list(inventory.units_on_parent_only())
+        self.assertEqual(len(inventory.units_on_parent_only()), 2)
+        self.assertEqual([u['unit_key']['n'] for u, r in added], [3, 9])
+        self.assertEqual([r.offset for u, r in added], [3, 9])
+        self.assertEqual(added[0][1].path, 'units.json')
+        self.assertTrue('metadata' not in added[0][0])
+        removed = list(inventory.units_on_child_only())
+        self.assertEqual(len(inventory.units_on_child_only()), 2)
+        self.assertEqual([u['unit_id'] for u in removed], ['u2', 'u8'])
+        updated = list(inventory.updated_units())
+        self.assertEqual(len(inventory.updated_units()), 1)
+        self.assertEqual(updated[0][0]['unit_key'], {'n': 7})
+        # Verify same as memory inventory
+        memory = UnitInventory(BASE_URL, self.parent_units(), self.child_units())
+        self.assertEqual(
+            sorted(u['unit_key']['n'] for u, r in memory.units_on_parent_only()),
+            [u['unit_key']['n'] for u, r in added])
+        self.assertEqual(
+            sorted(u['unit_id'] for u in memory.units_on_child_only()),
+            [u['unit_id'] for u in removed])
+        self.assertEqual(len(memory.updated_units()), len(updated))
+
+    def test_close(self):
+        # Test
+        inventory = SortedUnitInventory(BASE_URL, [], [], self.tmp_dir)
+        inventory.close()
+        # Verify
+        self.assertEqual(len(inventory.units_on_parent_only()), 0)
+        self.assertFalse(os.path.exists(inventory.tmp_dir))
+
+    @patch('pulp_node.importers.strategies.SortedUnitInventory')
+    @patch('pulp_node.importers.strategies.RemoteManifest')
+    @patch('pulp_node.conduit.NodesConduit.get_units', return_value=[])
+    def test_selected(self, mock_get_units, mock_manifest, mock_inventory):
+        mock_manifest.return_value.publishing_details = {constants.BASE_URL: BASE_URL}
+        request = Mock(working_dir=self.tmp_dir)
+        request.config = {constants.INVENTORY_KEYWORD: constants.SORTED_INVENTORY}
+        # Test
+        strategy = ImporterStrategy()
+        inventory = strategy._unit_inventory(request)
+        # Verify
+        self.assertEqual(inventory, mock_inventory.return_value)
+        mock_inventory.assert_called_once_with(
+            BASE_URL, mock_manifest.return_value.get_units.return_value, [], self.tmp_dir)
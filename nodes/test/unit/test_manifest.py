@@ -131,4 +131,144 @@ class TestManifest(TestCase):
             units_in.append(unit)
             _unit = ref.fetch()
             self.assertEqual(unit, _unit)
-        self.verify(units, units_in)
\ No newline at end of file
+        self.verify(units, units_in)
+
+    def publish(self, units, manifest_id, base_id=None, changes=()):
+        """
+        Publish a manifest, units file and (optional) delta file in the tmp_dir.
+        Both files are sorted by unit ID.
+        """
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        writer = UnitWriter(os.path.join(self.tmp_dir, UNITS_FILE_NAME))
+        for u in sorted(units, key=unit_id):
+            writer.add(u)
+        writer.close()
+        manifest = Manifest(manifest_path, manifest_id)
+        manifest.units_published(writer)
+        if base_id:
+            delta = DeltaWriter(self.tmp_dir)
+            for action, unit in sorted(changes, key=lambda c: unit_id(c[1])):
+                if action == DELTA_ADD:
+                    delta.unit_added(unit)
+                else:
+                    delta.unit_removed(unit)
+            delta.close()
+            manifest.delta_published(delta, base_id)
+        manifest.write()
+        return manifest_path
+
+    def test_delta(self):
+        # Setup
+        units = [dict(unit_id=i, type_id='T', unit_key={'n': i}) for i in range(self.NUM_UNITS)]
+        cfg = DownloaderConfig()
+        downloader = LocalFileDownloader(cfg)
+        working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(working_dir)
+        path = self.publish(units, 'base')
+        url = 'file://%s' % path
+        manifest = RemoteManifest(url, downloader, working_dir)
+        manifest.fetch()
+        manifest.write()
+        manifest.fetch_units()
+        previous = Manifest(working_dir)
+        previous.read()
+        # Test
+        updated = dict(units[1], name='updated')
+        added = dict(unit_id=100, type_id='T', unit_key={'n': 100})
+        units_out = sorted([units[0], updated] + units[3:] + [added], key=unit_id)
+        changes = [(DELTA_ADD, updated), (DELTA_REMOVE, units[2]), (DELTA_ADD, added)]
+        self.publish(units_out, 'next', 'base', changes)
+        manifest = RemoteManifest(url, downloader, working_dir)
+        manifest.fetch()
+        manifest.write()
+        applied = manifest.fetch_delta(previous)
+        # Verify
+        self.assertTrue(applied)
+        self.assertEqual(manifest.delta[DELTA_BASE_ID], 'base')
+        self.assertEqual(manifest.delta[UNITS_TOTAL], len(changes))
+        self.assertTrue(manifest.has_valid_units())
+        self.assertFalse(os.path.exists(os.path.join(working_dir, DELTA_FILE_NAME)))
+        units_in = [unit for unit, ref in manifest.get_units()]
+        self.verify(units_out, units_in)
+        manifest = Manifest(working_dir)
+        manifest.read()
+        self.assertEqual(manifest.id, 'next')
+        self.assertTrue(manifest.has_valid_units())
+
+    def test_delta_not_matched(self):
+        # Setup
+        units = [dict(unit_id=i, type_id='T', unit_key={'n': i}) for i in range(self.NUM_UNITS)]
+        cfg = DownloaderConfig()
+        downloader = LocalFileDownloader(cfg)
+        working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(working_dir)
+        path = self.publish(units, 'next', 'base', [(DELTA_REMOVE, units[0])])
+        previous = Manifest(working_dir, 'other')
+        # Test
+        manifest = RemoteManifest('file://%s' % path, downloader, working_dir)
+        manifest.fetch()
+        # Verify
+        self.assertFalse(manifest.fetch_delta(previous))
+        manifest.delta = None
+        self.assertFalse(manifest.fetch_delta(previous))
+
+    def test_apply_delta(self):
+        # Setup
+        units = [dict(type_id='T', unit_key={'n': i}) for i in range(3)]
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        with UnitWriter(units_path) as writer:
+            for u in units:
+                writer.add(u)
+        delta_path = os.path.join(self.tmp_dir, DELTA_FILE_NAME)
+        with DeltaWriter(delta_path) as delta:
+            delta.unit_removed(dict(units[0], name='ignored'))
+            delta.unit_added(dict(units[2], name='updated'))
+        # Test
+        destination = os.path.join(self.tmp_dir, 'applied.json.gz')
+        writer = apply_delta(units_path, delta_path, destination)
+        # Verify
+        self.assertEqual(writer.total_units, 2)
+        fp = gzip.open(destination)
+        units_in = [json.loads(line) for line in fp]
+        fp.close()
+        self.assertEqual(units_in, [units[1], dict(units[2], name='updated')])
+
+    def test_apply_delta_not_sorted(self):
+        # Setup
+        units = [dict(type_id='T', unit_key={'n': i}) for i in (1, 0)]
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        with UnitWriter(units_path) as writer:
+            for u in units:
+                writer.add(u)
+        delta_path = os.path.join(self.tmp_dir, DELTA_FILE_NAME)
+        with DeltaWriter(delta_path) as delta:
+            delta.unit_removed(units[0])
+        # Test
+        destination = os.path.join(self.tmp_dir, 'applied.json.gz')
+        self.assertRaises(ValueError, apply_delta, units_path, delta_path, destination)
+
+    def test_diff_units(self):
+        # Setup
+        units = [dict(type_id='T', unit_key={'n': i}) for i in range(4)]
+        previous_path = os.path.join(self.tmp_dir, 'previous.json.gz')
+        with UnitWriter(previous_path) as writer:
+            for u in units[:3]:
+                writer.add(u)
+        updated = dict(units[1], name='updated')
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        with UnitWriter(units_path) as writer:
+            for u in (updated, units[2], units[3]):
+                writer.add(u)
+        # Test
+        changes = list(diff_units(previous_path, units_path))
+        # Verify
+        self.assertEqual(
+            changes, [(DELTA_REMOVE, units[0]), (DELTA_ADD, updated), (DELTA_ADD, units[3])])
+
+    def test_sort_records(self):
+        # Setup
+        records = [(3, '"c"'), (1, '"a"'), (2, '"b"'), (1, '"A"'), (0, '"z"')]
+        # Test
+        sorted_records = list(sort_records(records, self.tmp_dir, 'test', chunk_size=2))
+        # Verify
+        self.assertEqual(sorted_records, [(0, '"z"'), (1, '"A"'), (2, '"b"'), (3, '"c"')])
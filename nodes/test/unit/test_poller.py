@@ -0,0 +1,79 @@
+# Copyright (c) 2015 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import httplib
+
+from unittest import TestCase
+
+from mock import patch, Mock, call
+
+from pulp.bindings.responses import Task
+from pulp.common.constants import CALL_RUNNING_STATE, CALL_FINISHED_STATE, CALL_ERROR_STATE
+
+from pulp_node.poller import TaskPoller, TaskFailed, PollingFailed
+
+
+TASK_ID = 'task_1'
+
+
+def response(state, state_hash, result=None, code=httplib.OK):
+    task = Task(dict(task_id=TASK_ID, state=state, state_hash=state_hash, result=result))
+    return Mock(response_code=code, response_body=task)
+
+
+class TestPoller(TestCase):
+
+    @patch('pulp_node.poller.sleep')
+    def test_join(self, mock_sleep):
+        binding = Mock()
+        binding.tasks.wait_task.side_effect = [
+            response(CALL_RUNNING_STATE, 'h1'),
+            response(CALL_RUNNING_STATE, 'h2'),
+            response(CALL_FINISHED_STATE, 'h3', result=123),
+        ]
+        poller = TaskPoller(binding)
+        # test
+        result = poller.join(TASK_ID, Mock(), lambda: False)
+        # validation
+        self.assertEqual(result, 123)
+        self.assertEqual(
+            binding.tasks.wait_task.call_args_list,
+            [call(TASK_ID, None, TaskPoller.TIMEOUT),
+             call(TASK_ID, 'h1', TaskPoller.TIMEOUT),
+             call(TASK_ID, 'h2', TaskPoller.TIMEOUT)])
+        self.assertEqual(mock_sleep.call_count, 3)
+        self.assertFalse(binding.tasks.get_task.called)
+
+    @patch('pulp_node.poller.sleep')
+    def test_join_cancelled(self, mock_sleep):
+        binding = Mock()
+        poller = TaskPoller(binding)
+        # test
+        result = poller.join(TASK_ID, Mock(), lambda: True)
+        # validation
+        self.assertEqual(result, None)
+        self.assertFalse(binding.tasks.wait_task.called)
+
+    @patch('pulp_node.poller.sleep')
+    def test_join_failed(self, mock_sleep):
+        binding = Mock()
+        binding.tasks.wait_task.return_value = response(CALL_ERROR_STATE, 'h1')
+        poller = TaskPoller(binding)
+        # test
+        self.assertRaises(TaskFailed, poller.join, TASK_ID, Mock(), lambda: False)
+
+    @patch('pulp_node.poller.sleep')
+    def test_join_polling_failed(self, mock_sleep):
+        binding = Mock()
+        binding.tasks.wait_task.return_value = response(None, None, code=httplib.NOT_FOUND)
+        poller = TaskPoller(binding)
+        # test
+        self.assertRaises(PollingFailed, poller.join, TASK_ID, Mock(), lambda: False)
@@ -21,7 +21,8 @@ from nectar.config import DownloaderConfig
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.distributors.http.publisher import HttpPublisher
-from pulp_node.manifest import RemoteManifest
+from pulp_node.manifest import Manifest, RemoteManifest, UnitWriter, DELTA_BASE_ID, UNITS_TOTAL
+from pulp_node.manifest import MANIFEST_FILE_NAME, DELTA_FILE_NAME
 
 
 class TestHttp(TestCase):
@@ -157,3 +158,71 @@ class TestHttp(TestCase):
             p.publish(units)
         # verify
         self.assertFalse(os.path.exists(p.tmp_dir))
+
+    def test_publish_delta(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        conf = DownloaderConfig()
+        downloader = LocalFileDownloader(conf)
+        working_dir = os.path.join(self.tmpdir, 'working_dir')
+        os.makedirs(working_dir)
+        url = pathlib.url_join(base_url, p.manifest_path())
+        manifest = RemoteManifest(url, downloader, working_dir)
+        manifest.fetch()
+        manifest.write()
+        manifest.fetch_units()
+        self.assertEqual(manifest.delta, None)
+        base_id = manifest.id
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units[:2])
+            p.commit()
+        previous = Manifest(working_dir)
+        previous.read()
+        manifest = RemoteManifest(url, downloader, working_dir)
+        manifest.fetch()
+        manifest.write()
+        applied = manifest.fetch_delta(previous)
+        # verify
+        self.assertTrue(applied)
+        self.assertEqual(manifest.delta[DELTA_BASE_ID], base_id)
+        self.assertEqual(manifest.delta[UNITS_TOTAL], 1)
+        units_in = [unit for unit, ref in manifest.get_units()]
+        self.assertEqual([u['unit_key']['n'] for u in units_in], [0, 1])
+
+    def test_publish_delta_previous_not_sorted(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        repo_publish_dir = os.path.join(publish_dir, repo_id)
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units)
+            p.commit()
+        previous = Manifest(os.path.join(repo_publish_dir, MANIFEST_FILE_NAME))
+        previous.read()
+        with UnitWriter(previous.units_path()) as writer:
+            for unit in reversed(units):
+                writer.add(unit)
+        previous.units_published(writer)
+        previous.write()
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, repo_publish_dir) as p:
+            p.publish(units[:2])
+            p.commit()
+        # verify
+        manifest = Manifest(os.path.join(repo_publish_dir, MANIFEST_FILE_NAME))
+        manifest.read()
+        self.assertEqual(manifest.delta, None)
+        self.assertEqual(manifest.units[UNITS_TOTAL], 2)
+        self.assertFalse(os.path.exists(os.path.join(repo_publish_dir, DELTA_FILE_NAME)))
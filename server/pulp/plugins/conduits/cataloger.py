@@ -1,9 +1,20 @@
+from pulp.server.compat import ObjectId
 from pulp.server.managers import factory as managers
 
 
+# The number of buffered entries added to the catalog with a single insert.
+BUFFER_SIZE = 1000
+
+
 class CatalogerConduit(object):
     """
     Provides access to pulp platform API.
+
+    While a generation is open, added entries are buffered and inserted in
+    bulk, and belong to that generation.  Committing the generation replaces
+    the entries previously contributed by the content source.
+    :ivar generation: The open generation, or None.
+    :type generation: ObjectId
     """
 
     def __init__(self, source_id, expires):
@@ -18,6 +29,8 @@ class CatalogerConduit(object):
         self.expires = expires
         self.added_count = 0
         self.deleted_count = 0
+        self.generation = None
+        self._buffer = []
 
     def add_entry(self, type_id, unit_key, url):
         """
@@ -29,8 +42,13 @@ class CatalogerConduit(object):
         :param url: The URL used to download content associated with the unit.
         :type url: str
         """
-        manager = managers.content_catalog_manager()
-        manager.add_entry(self.source_id, self.expires, type_id, unit_key, url)
+        if self.generation is None:
+            manager = managers.content_catalog_manager()
+            manager.add_entry(self.source_id, self.expires, type_id, unit_key, url)
+        else:
+            self._buffer.append((type_id, unit_key, url))
+            if len(self._buffer) >= BUFFER_SIZE:
+                self.flush()
         self.added_count += 1
 
     def delete_entry(self, type_id, unit_key):
@@ -41,10 +59,53 @@ class CatalogerConduit(object):
         :param unit_key: The content unit key.
         :type unit_key: dict
         """
+        self.flush()
         manager = managers.content_catalog_manager()
         manager.delete_entry(self.source_id, type_id, unit_key)
         self.deleted_count += 1
 
+    def flush(self):
+        """
+        Add the buffered entries to the content catalog.
+        """
+        if not self._buffer:
+            return
+        manager = managers.content_catalog_manager()
+        manager.add_entries(self.source_id, self.expires, self._buffer, self.generation)
+        self._buffer = []
+
+    def open_generation(self, generation=None):
+        """
+        Open a new generation, or join a generation opened by another conduit.
+        Entries added until the generation is closed are buffered and belong to it.
+        :param generation: An optional generation opened by another conduit.
+        :type generation: ObjectId
+        """
+        self.flush()
+        self.generation = generation or ObjectId()
+
+    def commit_generation(self):
+        """
+        Close the open generation, replacing the entries previously contributed
+        by the content source with the entries of this generation.
+        :return: The number of replaced entries deleted from the catalog.
+        :rtype: int
+        """
+        self.flush()
+        manager = managers.content_catalog_manager()
+        purged = manager.purge_generations(self.source_id, self.generation)
+        self.generation = None
+        return purged
+
+    def close_generation(self):
+        """
+        Close the open generation without replacing the entries previously
+        contributed by the content source.  Both sets of entries remain in
+        the catalog until they expire.
+        """
+        self.flush()
+        self.generation = None
+
     def reset(self):
         """
         Reset statistics.
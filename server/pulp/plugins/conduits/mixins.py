@@ -1,4 +1,5 @@
 from gettext import gettext as _
+import copy
 import logging
 import sys
 
@@ -6,6 +7,7 @@ from pymongo.errors import DuplicateKeyError
 
 from pulp.plugins.model import Unit, PublishReport
 from pulp.plugins.types import database as types_db
+from pulp.plugins.util.misc import paginate
 from pulp.server.async.tasks import get_current_task_id
 from pulp.server.db.model.dispatch import TaskStatus
 from pulp.server.exceptions import MissingResource
@@ -15,6 +17,9 @@ import pulp.server.managers.factory as manager_factory
 
 _logger = logging.getLogger(__name__)
 
+# default number of units written together by AddUnitMixin.save_units
+DEFAULT_SAVE_BATCH_SIZE = 1000
+
 
 class ImporterConduitException(Exception):
     """
@@ -507,6 +512,94 @@ class AddUnitMixin(object):
             _logger.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def save_units(self, units, batch_size=DEFAULT_SAVE_BATCH_SIZE):
+        """
+        Batched equivalent of save_unit for importers that save many units at once.
+
+        The units are processed in batches of batch_size. For each unit type in
+        a batch, the existing units are looked up by unit key with a few
+        queries, the new units are added with a single batch insert, and all of
+        the units are associated to the repository with a batch insert of the
+        associations. The repository's unit counts are updated once per unit
+        type after all of the units have been saved.
+
+        The id field of each unit is populated with the UUID for the unit, as
+        with save_unit, and the added and updated counters are maintained.
+
+        :param units:      unit objects returned from the init_unit call
+        :type  units:      iterable of pulp.plugins.model.Unit
+        :param batch_size: number of units to save together
+        :type  batch_size: int
+        """
+        try:
+            association_manager = manager_factory.repo_unit_association_manager()
+            repo_manager = manager_factory.repo_manager()
+            new_association_counts = {}
+
+            for page in paginate(units, batch_size):
+                units_by_type = {}
+                for unit in page:
+                    units_by_type.setdefault(unit.type_id, []).append(unit)
+
+                for type_id, type_units in units_by_type.items():
+                    self._save_unit_batch(type_id, type_units)
+                    count = association_manager.associate_all_by_ids(
+                        self.repo_id, type_id, [unit.id for unit in type_units],
+                        self.association_owner_type, self.association_owner_id,
+                        update_repo_metadata=False)
+                    new_association_counts[type_id] = \
+                        new_association_counts.get(type_id, 0) + count
+
+            for type_id, count in new_association_counts.items():
+                if count:
+                    repo_manager.update_unit_count(self.repo_id, type_id, count)
+            if any(new_association_counts.values()):
+                repo_manager.update_last_unit_added(self.repo_id)
+        except Exception, e:
+            _logger.exception(_('Content unit batch save failed for repository [%(r)s]') %
+                              {'r': self.repo_id})
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
+    def _save_unit_batch(self, type_id, units):
+        """
+        Create or update a batch of units of a single type and populate their id fields.
+
+        :param type_id: type of all of the units
+        :type  type_id: str
+        :param units:   the units to be saved
+        :type  units:   list of pulp.plugins.model.Unit
+        """
+        content_query_manager = manager_factory.content_query_manager()
+        content_manager = manager_factory.content_manager()
+
+        key_fields = types_db.type_units_unit_key(type_id)
+        existing_units = content_query_manager.get_multiple_units_by_keys_dicts(
+            type_id, [unit.unit_key for unit in units], model_fields=['_id'] + key_fields)
+        existing_ids = dict((tuple(existing[f] for f in key_fields), existing['_id'])
+                            for existing in existing_units)
+
+        new_units = []
+        new_pulp_units = []
+        for unit in units:
+            pulp_unit = common_utils.to_pulp_unit(unit)
+            unit_id = existing_ids.get(tuple(unit.unit_key[f] for f in key_fields))
+            if unit_id is None:
+                new_units.append(unit)
+                new_pulp_units.append(pulp_unit)
+            else:
+                content_manager.update_content_unit(type_id, unit_id, pulp_unit)
+                self._updated_count += 1
+                unit.id = unit_id
+
+        unit_ids = content_manager.add_content_units(type_id, new_pulp_units)
+        for unit, pulp_unit, unit_id in zip(new_units, new_pulp_units, unit_ids):
+            if unit_id is None:
+                # added since the lookup above, or listed twice in this batch
+                unit.id = self._update_unit(unit, pulp_unit)
+            else:
+                self._added_count += 1
+                unit.id = unit_id
+
     def _update_unit(self, unit, pulp_unit):
         """
         Update a unit. If it is not found, add it.
@@ -601,12 +694,19 @@ class StatusMixin(object):
         self.progress_report = {}
         self.task_id = get_current_task_id()
 
+        # copy of the status last written to the task, used to find what changed
+        self._written_status = None
+
     def set_progress(self, status):
         """
         Informs the server of the current state of the publish operation. The
         contents of the status is dependent on how the distributor
         implementation chooses to divide up the publish process.
 
+        The first call writes the whole progress report of the task. Later
+        calls only write the parts of the status that changed since the
+        previous call, and nothing at all if it did not change.
+
         @param status: contains arbitrary data to describe the state of the
                publish; the contents may contain whatever information is relevant
                to the distributor implementation so long as it is serializable
@@ -618,8 +718,16 @@ class StatusMixin(object):
 
         try:
             self.progress_report[self.report_id] = status
-            TaskStatus.objects(task_id=self.task_id).update_one(
-                set__progress_report=self.progress_report)
+            if self._written_status is None or not _is_field_name(self.report_id):
+                TaskStatus.objects(task_id=self.task_id).update_one(
+                    set__progress_report=self.progress_report)
+            else:
+                changes = _changed_fields('progress_report.%s' % self.report_id,
+                                          self._written_status, status)
+                if changes:
+                    TaskStatus._get_collection().update({'task_id': self.task_id},
+                                                        {'$set': changes})
+            self._written_status = copy.deepcopy(status)
         except Exception, e:
             _logger.exception(
                 'Exception from server setting progress for report [%s]' % self.report_id)
@@ -632,6 +740,49 @@ class StatusMixin(object):
             raise self.exception_class(e), None, sys.exc_info()[2]
 
 
+def _is_field_name(key):
+    """
+    :return: True if the key can be used as part of a dotted field path in a database update
+    :rtype:  bool
+    """
+    return isinstance(key, basestring) and key and '.' not in key and not key.startswith('$')
+
+
+def _changed_fields(path, old, new):
+    """
+    Compare two versions of a progress report and return the database fields that
+    need to be set to turn the old version into the new one. Dictionaries and lists
+    of the same length are compared item by item; anything else is replaced whole.
+
+    :param path: dotted path of the report in the task status document
+    :type  path: str
+    :param old:  version of the report that was last written
+    :param new:  version of the report to write
+
+    :return: new values keyed by their dotted path
+    :rtype:  dict
+    """
+    if old == new:
+        return {}
+    if isinstance(old, dict) and isinstance(new, dict):
+        if set(old) - set(new) or not all(_is_field_name(k) for k in new):
+            return {path: new}
+        changes = {}
+        for key, value in new.items():
+            field = '%s.%s' % (path, key)
+            if key in old:
+                changes.update(_changed_fields(field, old[key], value))
+            else:
+                changes[field] = value
+        return changes
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = {}
+        for i, value in enumerate(new):
+            changes.update(_changed_fields('%s.%d' % (path, i), old[i], value))
+        return changes
+    return {path: new}
+
+
 class PublishReportMixin(object):
 
     def build_success_report(self, summary, details):
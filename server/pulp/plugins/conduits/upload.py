@@ -6,8 +6,22 @@ from pulp.plugins.conduits.mixins import (
 class UploadConduit(AddUnitMixin, SingleRepoUnitsMixin, SearchUnitsMixin):
 
     def __init__(self, repo_id, importer_id, association_owner_type,
-                 association_owner_id):
+                 association_owner_id, upload_checksums=None):
         AddUnitMixin.__init__(self, repo_id, importer_id,
                               association_owner_type, association_owner_id)
         SingleRepoUnitsMixin.__init__(self, repo_id, ImporterConduitException)
         SearchUnitsMixin.__init__(self, ImporterConduitException)
+        self.upload_checksums = upload_checksums or {}
+
+    def get_upload_checksums(self):
+        """
+        Returns the checksums of the uploaded file that the server calculated
+        while receiving it. Importers may use these instead of reading the file
+        again to calculate them. Only the checksum types the server calculated
+        are present, and the dict is empty if none are available, in which case
+        the importer must calculate them itself.
+
+        :return: hex digests keyed by checksum type (for example "sha256")
+        :rtype:  dict
+        """
+        return dict(self.upload_checksums)
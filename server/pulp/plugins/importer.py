@@ -35,6 +35,16 @@ class Importer(object):
         * types - List of all content type IDs that may be imported using this
                importer.
 
+        The following keys are optional:
+
+        * streaming_import_units - If True, the units passed to import_units
+               may be a generator that can only be iterated once, which keeps
+               large copies from loading every unit into memory at once.
+        * bulk_copy - If True, importing units only associates them with the
+               destination repository. When all units of a repository are
+               copied without a config override, Pulp then copies the
+               associations itself and import_units is not called.
+
         This method call may be made multiple times during the course of a
         running Pulp server and thus should not be used for initialization
         purposes.
@@ -217,8 +227,9 @@ class Importer(object):
         :param config: plugin configuration
         :type  config: pulp.plugins.config.PluginCallConfiguration
 
-        :param units: optional list of pre-filtered units to import
-        :type  units: list of pulp.plugins.model.Unit
+        :param units: optional list of pre-filtered units to import; a generator
+                      if the importer's metadata sets streaming_import_units
+        :type  units: list or generator of pulp.plugins.model.Unit
 
         :return: list of Unit instances that were saved to the destination repository
         :rtype:  list
@@ -1,10 +1,15 @@
 from gettext import gettext as _
+from collections import deque
+from multiprocessing.pool import ThreadPool
 import glob
 import gzip
 import logging
 import os
 import shutil
+import struct
+import time
 import traceback
+import zlib
 
 
 from xml.sax.saxutils import XMLGenerator
@@ -16,13 +21,16 @@ from verification import CHECKSUM_FUNCTIONS
 _LOG = logging.getLogger(__name__)
 BUFFER_SIZE = 1024
 
+# size of the blocks of uncompressed data that are compressed in parallel
+GZIP_BLOCK_SIZE = 1024 * 1024
+
 
 class MetadataFileContext(object):
     """
     Context manager class for metadata file generation.
     """
 
-    def __init__(self, metadata_file_path, checksum_type=None):
+    def __init__(self, metadata_file_path, checksum_type=None, gzip_threads=None):
         """
         :param metadata_file_path: full path to metadata file to be generated
         :type  metadata_file_path: str
@@ -30,12 +38,18 @@ class MetadataFileContext(object):
                               to the file names of files. If checksum_type is None,
                               no checksum is added to the filename
         :type checksum_type: str or None
+        :param gzip_threads: number of threads used to compress the file when its path ends
+                             with .gz; if None or 1 the file is compressed by the writing thread
+        :type  gzip_threads: int or None
         """
 
         self.metadata_file_path = metadata_file_path
         self.metadata_file_handle = None
         self.checksum_type = checksum_type
         self.checksum = None
+        self.gzip_threads = gzip_threads
+        # handle of the file on disk when metadata_file_handle compresses into it
+        self.raw_file_handle = None
         if self.checksum_type is not None:
             checksum_function = CHECKSUM_FUNCTIONS.get(checksum_type)
             if not checksum_function:
@@ -96,9 +110,16 @@ class MetadataFileContext(object):
         # Add calculated checksum to the filename
         file_name = os.path.basename(self.metadata_file_path)
         if self.checksum_type is not None:
-            with open(self.metadata_file_path, 'rb') as file_handle:
-                content = file_handle.read()
-                checksum = self.checksum_constructor(content).hexdigest()
+            checksum_handle = self.raw_file_handle or self.metadata_file_handle
+            if isinstance(checksum_handle, ChecksumFile):
+                checksum = checksum_handle.hexdigest()
+            else:
+                # the handle was not opened by this class, so read the checksum back
+                hasher = self.checksum_constructor()
+                with open(self.metadata_file_path, 'rb') as file_handle:
+                    for content in iter(lambda: file_handle.read(GZIP_BLOCK_SIZE), ''):
+                        hasher.update(content)
+                checksum = hasher.hexdigest()
 
             self.checksum = checksum
             file_name_with_checksum = checksum + '-' + file_name
@@ -109,6 +130,7 @@ class MetadataFileContext(object):
 
         # Set the metadata_file_handle to None so we don't double call finalize
         self.metadata_file_handle = None
+        self.raw_file_handle = None
 
     def _open_metadata_file_handle(self):
         """
@@ -142,11 +164,23 @@ class MetadataFileContext(object):
         msg = _('Opening metadata file handle for [%(p)s]')
         _LOG.debug(msg % {'p': self.metadata_file_path})
 
+        # The checksum is computed from the bytes on their way to the disk, so the
+        # finished file does not need to be read again.
+        file_handle = open(self.metadata_file_path, 'w')
+        if self.checksum_type is not None:
+            file_handle = ChecksumFile(file_handle, self.checksum_constructor())
+
         if self.metadata_file_path.endswith('.gz'):
-            self.metadata_file_handle = gzip.open(self.metadata_file_path, 'w')
+            self.raw_file_handle = file_handle
+            if self.gzip_threads and self.gzip_threads > 1:
+                self.metadata_file_handle = ParallelGzipFile(self.metadata_file_path, file_handle,
+                                                             self.gzip_threads)
+            else:
+                self.metadata_file_handle = gzip.GzipFile(self.metadata_file_path, 'w',
+                                                          fileobj=file_handle)
 
         else:
-            self.metadata_file_handle = open(self.metadata_file_path, 'w')
+            self.metadata_file_handle = file_handle
 
     def _write_file_header(self):
         """
@@ -168,6 +202,9 @@ class MetadataFileContext(object):
         if not self._is_closed(self.metadata_file_handle):
             self.metadata_file_handle.flush()
             self.metadata_file_handle.close()
+        # a GzipFile given a file object leaves it open
+        if not self._is_closed(self.raw_file_handle):
+            self.raw_file_handle.close()
 
     @staticmethod
     def _is_closed(file_object):
@@ -195,6 +232,132 @@ class MetadataFileContext(object):
                 raise
 
 
+class ChecksumFile(object):
+    """
+    Write-only file wrapper that computes the checksum of everything written to it.
+    """
+
+    def __init__(self, file_handle, hasher):
+        """
+        :param file_handle: file the data is written to
+        :type  file_handle: file
+        :param hasher: checksum object, as returned by one of the hashlib constructors
+        :type  hasher: object
+        """
+        self.file_handle = file_handle
+        self.hasher = hasher
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.file_handle.write(data)
+
+    def hexdigest(self):
+        """
+        :return: checksum of the data written so far
+        :rtype:  str
+        """
+        return self.hasher.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self.file_handle, name)
+
+
+class ParallelGzipFile(object):
+    """
+    Write-only gzip file whose data is compressed by a pool of threads.
+
+    Written data is split into blocks of GZIP_BLOCK_SIZE bytes, each compressed on its
+    own and ended with a sync flush so the compressed blocks can be joined into a single
+    deflate stream. The result is an ordinary single member gzip file. At most twice as
+    many blocks as there are threads are held in memory at once.
+    """
+
+    def __init__(self, filename, file_handle, threads, compresslevel=9):
+        """
+        :param filename: name of the file, recorded in the gzip header
+        :type  filename: str
+        :param file_handle: file the compressed data is written to; it is not closed
+        :type  file_handle: file
+        :param threads: number of threads compressing blocks
+        :type  threads: int
+        :param compresslevel: zlib compression level
+        :type  compresslevel: int
+        """
+        self.file_handle = file_handle
+        self.compresslevel = compresslevel
+        self.closed = False
+        self._buffer = []
+        self._buffered = 0
+        self._crc = zlib.crc32('') & 0xffffffff
+        self._size = 0
+        self._max_pending = threads * 2
+        self._pending = deque()
+        self._pool = ThreadPool(threads)
+        self._write_header(filename)
+
+    def _write_header(self, filename):
+        name = os.path.basename(filename)
+        if name.endswith('.gz'):
+            name = name[:-3]
+        if not isinstance(name, str):
+            name = name.encode('latin-1')
+        extra_flags = '\002' if self.compresslevel == 9 else '\000'
+        self.file_handle.write('\037\213\010\010' + struct.pack('<I', long(time.time())) +
+                               extra_flags + '\377' + name + '\000')
+
+    def write(self, data):
+        self._crc = zlib.crc32(data, self._crc) & 0xffffffff
+        self._size += len(data)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= GZIP_BLOCK_SIZE:
+            self._compress_buffer(zlib.Z_SYNC_FLUSH)
+
+    def flush(self):
+        """
+        Write the blocks compressed so far. Data that has not filled a block yet stays
+        buffered until more is written or the file is closed.
+        """
+        self._write_pending(0)
+        self.file_handle.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._compress_buffer(zlib.Z_FINISH)
+            self._write_pending(0)
+            self.file_handle.write(struct.pack('<II', self._crc, self._size & 0xffffffff))
+            self.file_handle.flush()
+        finally:
+            self._pool.terminate()
+            self._pool.join()
+            self.closed = True
+
+    def _compress_buffer(self, flush_mode):
+        data = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._pending.append(self._pool.apply_async(
+            _compress_block, (data, self.compresslevel, flush_mode)))
+        self._write_pending(self._max_pending)
+
+    def _write_pending(self, max_pending):
+        while len(self._pending) > max_pending:
+            self.file_handle.write(self._pending.popleft().get())
+
+
+def _compress_block(data, compresslevel, flush_mode):
+    """
+    Compress a block of data as raw deflate data.
+
+    :return: the compressed data, ended with the given flush mode
+    :rtype:  str
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(flush_mode)
+
+
 class JSONArrayFileContext(MetadataFileContext):
     """
     Context manager for writing out units as a json array.
@@ -1,11 +1,15 @@
 from gettext import gettext as _
-from itertools import chain, imap
+from multiprocessing.pool import ThreadPool
 import copy
+import errno
+import filecmp
 import logging
 import os
+import Queue
 import shutil
 import sys
 import tarfile
+import threading
 import time
 import traceback
 import uuid
@@ -26,24 +30,22 @@ import pulp.server.managers.factory as manager_factory
 
 _logger = logging.getLogger(__name__)
 
+# default minimum number of seconds between progress report writes of a step tree
+PROGRESS_REPORT_INTERVAL = 1.0
 
-def _post_order(step):
-    """
-    Create a generator to perform a pre-order traversal of a step tree
-
-    :param step: a Publish step step to traverse
-    :type step: PublishStep
-    :returns: generator
-    """
-    for v in chain(*imap(_post_order, step.children)):
-        yield v
-    yield step
+# default number of download requests read ahead of the downloader by a DownloadStep
+DOWNLOAD_QUEUE_SIZE = 100
 
 
 class Step(object):
     """
     Base class for step processing. The only tie to the platform is an assumption of
     the use of a conduit that extends StatusMixin for reporting status along the way.
+
+    Children are processed one after another in the order they were added. Setting
+    concurrency to more than one lets that many children (each with its own children)
+    be processed at once by a pool of threads. A child added with depends_on is not
+    started until the steps it depends on have been processed.
     """
 
     def __init__(self, step_type, status_conduit=None, non_halting_exceptions=None):
@@ -68,18 +70,33 @@ class Step(object):
         self.children = []
         self.last_report_time = 0
         self.last_reported_state = self.state
+        self.progress_interval = PROGRESS_REPORT_INTERVAL
+        self.progress_flushes = 0
         self.timestamp = str(time.time())
         self.non_halting_exceptions = non_halting_exceptions
         self.exceptions = []
+        self.concurrency = 1
+        self.dependencies = []
+        self._lock = threading.RLock()
 
-    def add_child(self, step):
+    def add_child(self, step, depends_on=None):
         """
         Add a child step to the end of the child steps list
 
         :param step: The step to add
         :type step: Step
-        """
+        :param depends_on: children of this step that must be processed before the
+                           added step is started
+        :type depends_on: list of Step
+        :raises ValueError: if a step in depends_on is not a child of this step
+        """
+        depends_on = list(depends_on or [])
+        for dependency in depends_on:
+            if dependency not in self.children:
+                raise ValueError(_('Step %(s)s can only depend on children of %(p)s') %
+                                 {'s': step.step_id, 'p': self.step_id})
         step.parent = self
+        step.dependencies = depends_on
         self.children.append(step)
 
     def insert_child(self, index, step):
@@ -121,10 +138,62 @@ class Step(object):
         """
         try:
             # Process the steps in post order
-            for step in _post_order(self):
-                step.process()
+            self._process_tree()
         finally:
             self.report_progress(force=True)
+            _logger.debug('Progress of step %(s)s was written %(n)d times' %
+                          {'s': self.step_id, 'n': self.progress_flushes})
+
+    def _process_tree(self):
+        """
+        Process the children of this step and then the step itself.
+        """
+        if self.concurrency > 1 and len(self.children) > 1:
+            self._process_children_concurrently()
+        else:
+            for step in self.children:
+                step._process_tree()
+        self.process()
+
+    def _process_children_concurrently(self):
+        """
+        Process the children of this step on a pool of concurrency threads, starting each
+        child once the children it depends on are done. After a child fails or the step is
+        canceled no more children are started; the ones already running are waited for and
+        the first exception raised by a child is raised again.
+        """
+        pending = list(self.children)
+        running = set()
+        done = set()
+        finished = Queue.Queue()
+        error = None
+
+        def run(step):
+            try:
+                step._process_tree()
+                finished.put((step, None))
+            except Exception:
+                finished.put((step, sys.exc_info()))
+
+        pool = ThreadPool(min(self.concurrency, len(self.children)))
+        try:
+            while running or (pending and error is None and not self.canceled):
+                if error is None and not self.canceled:
+                    for step in [s for s in pending if done.issuperset(s.dependencies)]:
+                        pending.remove(step)
+                        running.add(step)
+                        pool.apply_async(run, (step,))
+                step, exc_info = finished.get()
+                running.remove(step)
+                done.add(step)
+                if exc_info and error is None:
+                    error = exc_info
+        finally:
+            pool.close()
+            pool.join()
+
+        if error:
+            raise error[0], error[1], error[2]
 
     def is_skipped(self):
         """
@@ -258,6 +327,11 @@ class Step(object):
         """
         Bubble up that something has changed where progress should be reported.
         It is up to the parent to determine what actions should be taken.
+
+        The root of the tree writes the progress report when forced to, when the
+        state of a step has changed, or when progress_interval seconds have passed
+        since the last write. Other changes are picked up by the next write.
+
         :param force: Whether or not a write to the database should be forced
         :type force: bool
         """
@@ -268,14 +342,12 @@ class Step(object):
         if self.parent:
             self.parent.report_progress(force)
         else:
-            if force:
-                self.get_status_conduit().set_progress(self.get_progress_report())
-            else:
+            with self._lock:
                 current_time = time.time()
-                if current_time != self.last_report_time:
-                    # Update at most once a second
+                if force or current_time - self.last_report_time >= self.progress_interval:
                     self.get_status_conduit().set_progress(self.get_progress_report())
                     self.last_report_time = current_time
+                    self.progress_flushes += 1
 
     def get_progress_report(self):
         """
@@ -320,8 +392,6 @@ class Step(object):
         :param tb: traceback instance (if any)
         :type  tb: Traceback or None
         """
-        self.progress_failures += 1
-
         error_details = {'error': None,
                          'traceback': None}
 
@@ -331,8 +401,11 @@ class Step(object):
         if e is not None:
             error_details['error'] = str(e)
 
-        if error_details.values() != (None, None):
-            self.error_details.append(error_details)
+        # children processed concurrently may record failures on their parent at once
+        with self._lock:
+            self.progress_failures += 1
+            if error_details.values() != (None, None):
+                self.error_details.append(error_details)
 
         if self.parent:
             self.parent._record_failure()
@@ -720,9 +793,12 @@ class AtomicDirectoryPublishStep(PublishStep):
             link each file in the source directory to a file with the same name in the target
             directory
     :type only_publish_directory_contents: bool
+    :param incremental: If true, files that are unchanged since the previous master directory
+            are hard linked from it instead of being copied
+    :type incremental: bool
     """
     def __init__(self, source_dir, publish_locations, master_publish_dir, step_type=None,
-                 only_publish_directory_contents=False):
+                 only_publish_directory_contents=False, incremental=False):
         step_type = step_type if step_type else reporting_constants.PUBLISH_STEP_DIRECTORY
         super(AtomicDirectoryPublishStep, self).__init__(step_type)
         self.context = None
@@ -730,6 +806,9 @@ class AtomicDirectoryPublishStep(PublishStep):
         self.publish_locations = publish_locations
         self.master_publish_dir = master_publish_dir
         self.only_publish_directory_contents = only_publish_directory_contents
+        self.incremental = incremental
+        self.files_reused = 0
+        self.files_copied = 0
 
     def process_main(self):
         """
@@ -745,8 +824,15 @@ class AtomicDirectoryPublishStep(PublishStep):
         # Given that it is timestamped for this publish/repo we could skip the copytree
         # for items where http & https are published to a separate directory
 
-        _logger.debug('Copying tree from %s to %s' % (self.source_dir, timestamp_master_dir))
-        shutil.copytree(self.source_dir, timestamp_master_dir, symlinks=True)
+        if self.incremental:
+            previous_master_dir = self._previous_master_dir()
+            _logger.debug('Copying tree from %s to %s, reusing files from %s' %
+                          (self.source_dir, timestamp_master_dir, previous_master_dir))
+            self._copy_tree_incremental(self.source_dir, timestamp_master_dir,
+                                        previous_master_dir)
+        else:
+            _logger.debug('Copying tree from %s to %s' % (self.source_dir, timestamp_master_dir))
+            shutil.copytree(self.source_dir, timestamp_master_dir, symlinks=True)
 
         for source_relative_location, publish_location in self.publish_locations:
             if source_relative_location.startswith('/'):
@@ -787,6 +873,109 @@ class AtomicDirectoryPublishStep(PublishStep):
         # Clear out any previously published masters
         self._clear_directory(self.master_publish_dir, skip_list=[self.parent.timestamp])
 
+    def _previous_master_dir(self):
+        """
+        Find the master directory of the most recent previous publish.
+
+        :return: path to the directory, or None if there is none
+        :rtype:  str
+        """
+        if not os.path.isdir(self.master_publish_dir):
+            return None
+        candidates = []
+        for name in os.listdir(self.master_publish_dir):
+            path = os.path.join(self.master_publish_dir, name)
+            if name != self.parent.timestamp and os.path.isdir(path) and \
+                    not os.path.islink(path):
+                candidates.append((os.path.getmtime(path), path))
+        if not candidates:
+            return None
+        return max(candidates)[1]
+
+    def _copy_tree_incremental(self, source_dir, target_dir, previous_dir):
+        """
+        Copy a directory tree the way shutil.copytree does with symlinks=True, except that
+        regular files with the same size and either the same modification time or the same
+        contents as the file at the same place in previous_dir are hard linked from there.
+
+        :param source_dir: directory to copy
+        :type  source_dir: str
+        :param target_dir: directory to create
+        :type  target_dir: str
+        :param previous_dir: directory of the previous copy of source_dir, if there is one
+        :type  previous_dir: str or None
+        """
+        for dir_path, dir_names, file_names in os.walk(source_dir):
+            relative_dir = os.path.relpath(dir_path, source_dir)
+            target_path = os.path.normpath(os.path.join(target_dir, relative_dir))
+            os.makedirs(target_path)
+
+            for name in list(dir_names) + file_names:
+                source = os.path.join(dir_path, name)
+                target = os.path.join(target_path, name)
+                if os.path.islink(source):
+                    # os.walk does not descend into links to directories, same as copytree
+                    os.symlink(os.readlink(source), target)
+                    if name in dir_names:
+                        dir_names.remove(name)
+                elif name in file_names:
+                    previous = previous_dir and os.path.join(previous_dir, relative_dir, name)
+                    if previous and self._is_unchanged(source, previous) and \
+                            self._link(previous, target):
+                        self.files_reused += 1
+                    else:
+                        shutil.copy2(source, target)
+                        self.files_copied += 1
+
+            shutil.copystat(dir_path, target_path)
+
+    @staticmethod
+    def _is_unchanged(source, previous):
+        """
+        :return: True if previous is a regular file with the same contents as source
+        :rtype:  bool
+        """
+        if os.path.islink(previous) or not os.path.isfile(previous):
+            return False
+        source_stat = os.stat(source)
+        previous_stat = os.stat(previous)
+        if source_stat.st_size != previous_stat.st_size:
+            return False
+        # shutil.copy2 preserves the modification time of the files it copies
+        if source_stat.st_mtime == previous_stat.st_mtime:
+            return True
+        return filecmp.cmp(source, previous, shallow=False)
+
+    @staticmethod
+    def _link(previous, target):
+        """
+        Hard link a file from the previous master directory.
+
+        :return: False if the file could not be linked because it is on another device
+        :rtype:  bool
+        """
+        try:
+            os.link(previous, target)
+        except OSError, e:
+            if e.errno in (errno.EXDEV, errno.EMLINK, errno.EPERM):
+                return False
+            raise
+        return True
+
+    def get_progress_report(self):
+        """
+        Add the number of files reused from the previous master directory and the number
+        of files copied to the progress report of the step.
+
+        :returns: The machine readable progress report for this task
+        :rtype: list
+        """
+        report = super(AtomicDirectoryPublishStep, self).get_progress_report()
+        if self.incremental:
+            report[0][reporting_constants.PROGRESS_FILES_REUSED_KEY] = self.files_reused
+            report[0][reporting_constants.PROGRESS_FILES_COPIED_KEY] = self.files_copied
+        return report
+
 
 class SaveTarFilePublishStep(PublishStep):
     """
@@ -895,14 +1084,21 @@ class PluginStepIterativeProcessingMixin(object):
 class DownloadStep(PluginStep, listener.DownloadEventListener):
 
     def __init__(self, step_type, downloads=None, repo=None, conduit=None, config=None,
-                 working_dir=None, plugin_type=None, description=''):
+                 working_dir=None, plugin_type=None, description='', total=None,
+                 queue_size=DOWNLOAD_QUEUE_SIZE):
         """
         Set the default parent and step_type for the Download step
 
+        When downloads is not a list, the requests are read from it by a separate thread
+        into a queue of at most queue_size requests that the downloader consumes, so they
+        are never all held in memory. In that case the number of requests is only known
+        if total is given; otherwise the total reported is the number of requests read so
+        far.
+
         :param step_type: The id of the step this processes
         :type  step_type: str
-        :param downloads: A list of DownloadRequests
-        :type  downloads: list of nectar.request.DownloadRequest
+        :param downloads: A list or other iterable of DownloadRequests
+        :type  downloads: iterable of nectar.request.DownloadRequest
         :param repo: The repo to be published
         :type  repo: pulp.plugins.model.Repository
         :param conduit: The conduit for the repo
@@ -915,6 +1111,10 @@ class DownloadStep(PluginStep, listener.DownloadEventListener):
         :type  plugin_type: str
         :param description: The text description that will be displayed to users
         :type  description: basestring
+        :param total: The number of DownloadRequests in downloads, used for progress reporting
+        :type  total: int or None
+        :param queue_size: The maximum number of requests read ahead of the downloader
+        :type  queue_size: int
         """
 
         super(DownloadStep, self).__init__(step_type, repo=repo, conduit=conduit,
@@ -931,6 +1131,12 @@ class DownloadStep(PluginStep, listener.DownloadEventListener):
         self.working_dir = working_dir
         self.plugin_type = plugin_type
         self.description = description
+        self.total = total
+        self.queue_size = queue_size
+        self.downloads_in_flight = 0
+        self.bytes_downloaded = 0
+        self.download_start_time = None
+        self.download_end_time = None
 
     def initialize(self):
         """
@@ -963,6 +1169,9 @@ class DownloadStep(PluginStep, listener.DownloadEventListener):
         instantiation, it is probably not known what downloads will be
         required.
 
+        Reading this property loads all of the requests into memory, so the step itself
+        only reads it when a subclass overrides it to supply the requests.
+
         :return:    list of download requests (nectar.request.DownloadRequest)
         :rtype:     list
         """
@@ -970,21 +1179,73 @@ class DownloadStep(PluginStep, listener.DownloadEventListener):
             self._downloads = list(self._downloads)
         return self._downloads
 
+    def _iter_downloads(self):
+        """
+        Get the download requests without loading them all into memory. These are the
+        requests the step was instantiated with, unless a subclass overrides the downloads
+        property to supply them.
+
+        :return:    list or other iterable of download requests
+        :rtype:     iterable of nectar.request.DownloadRequest
+        """
+        if type(self).downloads is not DownloadStep.downloads:
+            return self.downloads
+        return self._downloads
+
     def _get_total(self):
         """
         Get total number of items to download
 
-        :returns: number of DownloadRequests
+        :returns: number of DownloadRequests, or 0 if it is not known before downloading
         :rtype: int
         """
-        return len(self.downloads)
+        if self.total is not None:
+            return self.total
+        downloads = self._iter_downloads()
+        if isinstance(downloads, list):
+            return len(downloads)
+        return 0
 
     def _process_block(self):
         """
         the main "do stuff" method. In this case, just kick off all the
         downloads.
         """
-        self.downloader.download(self.downloads)
+        self.download_start_time = time.time()
+        downloads = self._iter_downloads()
+        if isinstance(downloads, list):
+            self.downloader.download(downloads)
+        else:
+            feeder = _RequestFeeder(downloads, self.queue_size, self._request_fed)
+            try:
+                self.downloader.download(feeder)
+            finally:
+                feeder.close()
+            # an error raised by the generator of requests ended the downloads early
+            feeder.raise_error()
+        self.download_end_time = time.time()
+
+    def _request_fed(self, count):
+        """
+        Called when the downloader takes a request from the queue.
+
+        :param count: number of requests taken by the downloader so far
+        :type  count: int
+        """
+        if self.total is None and count > self.total_units:
+            self.total_units = count
+
+    # from listener.DownloadEventListener
+    def download_started(self, report):
+        """
+        This is the callback that we will get from the downloader library when any individual
+        download starts. Bump the count of downloads in flight.
+
+        :param report: report (passed in from nectar but currently not used)
+        :type  report: nectar.report.DownloadReport
+        """
+        with self._lock:
+            self.downloads_in_flight += 1
 
     # from listener.DownloadEventListener
     def download_succeeded(self, report):
@@ -992,10 +1253,12 @@ class DownloadStep(PluginStep, listener.DownloadEventListener):
         This is the callback that we will get from the downloader library when any individual
         download succeeds. Bump the successes counter and report progress.
 
-        :param report: report (passed in from nectar but currently not used)
-        :type  report: pulp.plugins.model.PublishReport
+        :param report: report of the download
+        :type  report: nectar.report.DownloadReport
         """
-        self.progress_successes += 1
+        with self._lock:
+            self.progress_successes += 1
+            self._download_finished(report)
         self.report_progress()
 
     # from listener.DownloadEventListener
@@ -1004,12 +1267,44 @@ class DownloadStep(PluginStep, listener.DownloadEventListener):
         This is the callback that we will get from the downloader library when any individual
         download fails. Bump the failure counter and report progress.
 
-        :param report: report (passed in from nectar but currently not used)
-        :type  report: pulp.plugins.model.PublishReport
+        :param report: report of the download
+        :type  report: nectar.report.DownloadReport
         """
-        self.progress_failures += 1
+        with self._lock:
+            self.progress_failures += 1
+            self._download_finished(report)
         self.report_progress()
 
+    def _download_finished(self, report):
+        """
+        Account for a download that is no longer in flight.
+
+        :param report: report of the download
+        :type  report: nectar.report.DownloadReport
+        """
+        # the local file downloader does not report downloads starting
+        self.downloads_in_flight = max(self.downloads_in_flight - 1, 0)
+        self.bytes_downloaded += report.bytes_downloaded or 0
+
+    def get_progress_report(self):
+        """
+        Add the number of downloads in flight, the number of bytes downloaded and the
+        average download throughput to the progress report of the step.
+
+        :returns: The machine readable progress report for this task
+        :rtype: list
+        """
+        report = super(DownloadStep, self).get_progress_report()
+        bytes_per_second = 0
+        if self.download_start_time is not None:
+            elapsed = (self.download_end_time or time.time()) - self.download_start_time
+            if elapsed > 0:
+                bytes_per_second = int(self.bytes_downloaded / elapsed)
+        report[0][reporting_constants.PROGRESS_DOWNLOADS_IN_FLIGHT_KEY] = self.downloads_in_flight
+        report[0][reporting_constants.PROGRESS_BYTES_DOWNLOADED_KEY] = self.bytes_downloaded
+        report[0][reporting_constants.PROGRESS_BYTES_PER_SECOND_KEY] = bytes_per_second
+        return report
+
     def cancel(self):
         """
         Cancel the current step
@@ -1018,6 +1313,94 @@ class DownloadStep(PluginStep, listener.DownloadEventListener):
         self.downloader.cancel()
 
 
+class _RequestFeeder(object):
+    """
+    Iterator over download requests that are read from an iterable by a separate thread
+    into a bounded queue. The reading thread stops when the iterator is closed.
+
+    An exception raised while reading the requests ends the iteration; it is raised again
+    by raise_error().
+    """
+
+    # seconds to wait for room in the queue before checking whether the feeder was closed
+    PUT_TIMEOUT = 1
+
+    _END = object()
+
+    def __init__(self, requests, queue_size, callback=None):
+        """
+        :param requests: download requests to feed
+        :type  requests: iterable of nectar.request.DownloadRequest
+        :param queue_size: maximum number of requests held in the queue
+        :type  queue_size: int
+        :param callback: called with the number of requests taken so far each time one is
+                         taken from the queue
+        :type  callback: callable
+        """
+        self._queue = Queue.Queue(queue_size)
+        self._callback = callback
+        self._closed = False
+        self._finished = False
+        self._error = None
+        self._count = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(requests,),
+                                        name='download-request-feeder')
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def _run(self, requests):
+        try:
+            for request in requests:
+                if not self._put(request):
+                    return
+        except Exception:
+            self._error = sys.exc_info()
+        self._put(self._END)
+
+    def _put(self, item):
+        """
+        :return: False if the feeder was closed before there was room for the item
+        :rtype:  bool
+        """
+        while not self._closed:
+            try:
+                self._queue.put(item, timeout=self.PUT_TIMEOUT)
+                return True
+            except Queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        with self._lock:
+            if self._finished:
+                raise StopIteration()
+            item = self._queue.get()
+            if item is self._END:
+                self._finished = True
+                raise StopIteration()
+            self._count += 1
+            if self._callback:
+                self._callback(self._count)
+            return item
+
+    def close(self):
+        """
+        Stop reading requests.
+        """
+        self._closed = True
+
+    def raise_error(self):
+        """
+        Raise the exception raised while reading the requests, if there was one.
+        """
+        if self._error:
+            raise self._error[0], self._error[1], self._error[2]
+
+
 class GetLocalUnitsStep(PluginStep):
     """
     Given a list of unit keys, this will determine which ones are already in
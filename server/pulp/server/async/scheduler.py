@@ -271,6 +271,9 @@ class Scheduler(beat.Scheduler):
         self._schedule = None
         self._failure_watcher = FailureWatcher()
         self._loaded_from_db_count = 0
+        self._db_schedule_ids = set()
+        # number of seconds the most recent full or incremental schedule load took
+        self.last_reload_duration = None
 
         # Force the use of the Pulp celery_instance when this custom Scheduler is used.
         kwargs['app'] = app
@@ -337,6 +340,7 @@ class Scheduler(beat.Scheduler):
             db_connection.initialize()
             Scheduler._mongo_initialized = True
         _logger.debug(_('loading schedules from app'))
+        start = time.time()
         self._schedule = {}
         for key, value in self.app.conf.CELERYBEAT_SCHEDULE.iteritems():
             self._schedule[key] = beat.ScheduleEntry(**dict(value, name=key))
@@ -346,7 +350,7 @@ class Scheduler(beat.Scheduler):
 
         _logger.debug(_('loading schedules from DB'))
         ignored_db_count = 0
-        self._loaded_from_db_count = 0
+        self._db_schedule_ids = set()
         for call in itertools.imap(ScheduledCall.from_db, utils.get_enabled()):
             if call.remaining_runs == 0:
                 _logger.debug(
@@ -354,12 +358,62 @@ class Scheduler(beat.Scheduler):
                 ignored_db_count += 1
             else:
                 self._schedule[call.id] = call.as_schedule_entry()
+                self._db_schedule_ids.add(call.id)
                 update_timestamps.append(call.last_updated)
-                self._loaded_from_db_count += 1
-
-        _logger.debug('loaded %(count)d schedules' % {'count': self._loaded_from_db_count})
+        self._loaded_from_db_count = len(self._db_schedule_ids)
 
         self._most_recent_timestamp = max(update_timestamps)
+        self.last_reload_duration = time.time() - start
+
+        _logger.debug('loaded %(count)d schedules in %(t).3f seconds' %
+                      {'count': self._loaded_from_db_count, 't': self.last_reload_duration})
+
+    def update_schedule(self):
+        """
+        Incrementally apply changes made in the database to the "_schedule" dictionary.
+
+        Only the enabled schedules updated since the most recent known update timestamp are read
+        and patched into the existing schedule. If the number of enabled schedules still does not
+        match what has been loaded afterwards, schedules have been deleted or disabled, and the
+        IDs of the enabled schedules are read to drop the entries that are no longer present.
+        """
+        start = time.time()
+        updated_count = 0
+
+        for call in itertools.imap(ScheduledCall.from_db,
+                                   utils.get_updated_since(self._most_recent_timestamp)):
+            updated_count += 1
+            self._most_recent_timestamp = max(self._most_recent_timestamp, call.last_updated)
+            if call.remaining_runs == 0:
+                _logger.debug(
+                    _('ignoring schedule with 0 remaining runs: %(id)s') % {'id': call.id})
+                self._remove_db_schedule(call.id)
+            else:
+                self._schedule[call.id] = call.as_schedule_entry()
+                self._db_schedule_ids.add(call.id)
+
+        removed_count = 0
+        if utils.get_enabled().count() != len(self._db_schedule_ids):
+            enabled_ids = set(utils.get_enabled_ids())
+            for schedule_id in self._db_schedule_ids - enabled_ids:
+                self._remove_db_schedule(schedule_id)
+                removed_count += 1
+
+        self._loaded_from_db_count = len(self._db_schedule_ids)
+        self.last_reload_duration = time.time() - start
+
+        _logger.debug('updated %(u)d and removed %(r)d schedules in %(t).3f seconds' %
+                      {'u': updated_count, 'r': removed_count, 't': self.last_reload_duration})
+
+    def _remove_db_schedule(self, schedule_id):
+        """
+        Remove a schedule that was loaded from the database from the "_schedule" dictionary.
+
+        :param schedule_id: ID of the schedule to remove
+        :type  schedule_id: basestring
+        """
+        self._db_schedule_ids.discard(schedule_id)
+        self._schedule.pop(schedule_id, None)
 
     @property
     @retry_decorator()
@@ -396,7 +450,7 @@ class Scheduler(beat.Scheduler):
             return self.get_schedule()
 
         if self.schedule_changed:
-            self.setup_schedule()
+            self.update_schedule()
 
         return self._schedule
 
@@ -26,6 +26,19 @@ from pulp.server.managers.repo import _common as common_utils
 controller = control.Control(app=celery)
 _logger = logging.getLogger(__name__)
 
+# The resource manager waits this many seconds after an unsuccessful attempt to find a worker
+# for a reservation. The wait is doubled after every further attempt until it reaches
+# RESERVATION_MAX_WAIT, so that a released resource is noticed quickly after short waits while
+# long waits do not query the database more often than necessary.
+RESERVATION_MIN_WAIT = 0.01
+RESERVATION_MAX_WAIT = 0.25
+
+# Workers heartbeat far more often than they are considered missing, so the resource manager can
+# safely reuse its view of the known workers for this many seconds.
+WORKER_CACHE_TIMEOUT = 5
+
+_worker_cache = {'timestamp': None, 'workers': {}}
+
 
 @task(acks_late=True)
 def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
@@ -53,7 +66,11 @@ def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
 
     :return: None
     """
+    wait = RESERVATION_MIN_WAIT
+    attempts = 0
+    start = time.time()
     while True:
+        attempts += 1
         try:
             worker = get_worker_for_reservation(resource_id)
         except NoWorkers:
@@ -69,7 +86,12 @@ def _queue_reserved_task(name, task_id, resource_id, inner_args, inner_kwargs):
             break
 
         # No worker is ready for this work, so we need to wait
-        time.sleep(0.25)
+        time.sleep(wait)
+        wait = min(wait * 2, RESERVATION_MAX_WAIT)
+
+    msg = _('Task %(id)s waited %(t).3f seconds and %(a)d attempts for resource %(r)s')
+    _logger.debug(msg % {'id': task_id, 't': time.time() - start, 'a': attempts,
+                         'r': resource_id})
 
     ReservedResource(task_id, worker['name'], resource_id).save()
 
@@ -131,21 +153,57 @@ def _get_unreserved_worker():
     :rtype:            pulp.server.db.model.resources.Worker
     """
 
-    # Build a mapping of queue names to Worker objects
-    workers_dict = dict((worker['name'], worker) for worker in Worker.objects())
+    workers_dict = _get_workers()
     worker_names = workers_dict.keys()
-    reserved_names = [r['worker_name'] for r in ReservedResource.get_collection().find()]
+    reserved_names = ReservedResource.get_collection().distinct('worker_name')
 
     # Find an unreserved worker using set differences of the names, and filter
     # out workers that should not be assigned work.
     # NB: this is a little messy but set comprehensions are in python 2.7+
     unreserved_workers = set(filter(_is_worker, worker_names)) - set(reserved_names)
 
-    try:
-        return workers_dict[unreserved_workers.pop()]
-    except KeyError:
-        # All workers are reserved
-        raise NoWorkers()
+    # The cached workers may include one that another process has since deleted, and reserving
+    # a resource for it would leave the task in a queue nobody consumes. Read the chosen worker
+    # again so that only a worker still in the database is returned.
+    for name in unreserved_workers:
+        worker = Worker.objects(name=name).first()
+        if worker is not None:
+            return worker
+        _clear_worker_cache()
+
+    # All workers are reserved
+    raise NoWorkers()
+
+
+def _get_workers():
+    """
+    Return a mapping of worker names to Worker instances.
+
+    The mapping is cached for WORKER_CACHE_TIMEOUT seconds so that the resource manager does not
+    read every Worker document each time it looks for an unreserved worker. The cache is also
+    refreshed whenever it is empty, so a newly started worker is picked up as soon as possible.
+    Workers are deleted by other processes, so a cached worker may no longer exist and must be
+    read again before it is given work.
+
+    :return: mapping of worker names to Worker instances
+    :rtype:  dict
+    """
+    now = time.time()
+    timestamp = _worker_cache['timestamp']
+    if timestamp is None or not _worker_cache['workers'] or \
+            now - timestamp > WORKER_CACHE_TIMEOUT:
+        _worker_cache['workers'] = dict((worker['name'], worker) for worker in Worker.objects())
+        _worker_cache['timestamp'] = now
+    return _worker_cache['workers']
+
+
+def _clear_worker_cache():
+    """
+    Discard this process's cached view of the known workers so that the next lookup reads them
+    again.
+    """
+    _worker_cache['timestamp'] = None
+    _worker_cache['workers'] = {}
 
 
 def _delete_worker(name, normal_shutdown=False):
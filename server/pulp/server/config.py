@@ -11,6 +11,10 @@ _default_values = {
         'rsa_key': '/etc/pki/pulp/rsa.key',
         'rsa_pub': '/etc/pki/pulp/rsa_pub.key',
     },
+    'authorization': {
+        'permission_cache_size': '10000',
+        'permission_cache_ttl': '60',  # in seconds
+    },
     'consumer_history': {
         'lifetime': '180',  # in days
     },
@@ -41,6 +45,13 @@ _default_values = {
         'enabled': 'false',
         'from': 'pulp@localhost',
     },
+    'http_notifier': {
+        'workers': '4',
+        'queue_size': '1000',
+        'enqueue_timeout': '5',  # in seconds
+        'connection_timeout': '30',  # in seconds
+        'stats_log_interval': '300',  # in seconds
+    },
     'oauth': {
         'enabled': 'true',
         'oauth_key': '',
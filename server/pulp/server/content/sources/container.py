@@ -1,12 +1,17 @@
 from collections import namedtuple
+from datetime import datetime
+from functools import partial
 from logging import getLogger
-from threading import Thread, RLock
+from multiprocessing.pool import ThreadPool
+from threading import Thread, RLock, Lock
 from Queue import Queue, Empty, Full
+import time
 
 from nectar.listener import DownloadEventListener
 from nectar.report import DownloadReport as NectarDownloadReport
 from nectar.request import DownloadRequest
 
+from pulp.plugins.util.misc import paginate
 from pulp.server.content.sources.model import ContentSource, PrimarySource, \
     DownloadReport, DownloadDetails, RefreshReport
 from pulp.server.managers import factory as managers
@@ -15,6 +20,20 @@ from pulp.server.managers import factory as managers
 log = getLogger(__name__)
 
 
+# The number of requests planned with a single content catalog lookup.
+PLAN_BATCH_SIZE = 1000
+
+# The default number of content sources refreshed concurrently.
+REFRESH_CONCURRENCY = 4
+
+# The weight given to the latest observation by the source statistics moving averages.
+STATS_WEIGHT = 0.2
+
+# Sources with an error rate at or above this are only used after the healthy
+# sources of the same priority.
+DEGRADED_ERROR_RATE = 0.5
+
+
 class ContentContainer(object):
     """
     The content container represents a virtual collection of content that is
@@ -56,33 +75,65 @@ class ContentContainer(object):
         report = batch.download()
         return report
 
-    def refresh(self, canceled, force=False):
+    def refresh(self, canceled, force=False, concurrency=REFRESH_CONCURRENCY):
         """
         Refresh the content catalog using available content sources.
+        Up to *concurrency* content sources are refreshed concurrently.
         :param canceled: An event that indicates the refresh has been canceled.
         :type canceled: threading.Event
         :param force: Force refresh of content sources with unexpired catalog entries.
         :type force: bool
+        :param concurrency: The maximum number of content sources refreshed concurrently.
+        :type concurrency: int
         :return: A list of refresh reports.
         :rtype: list of: pulp.server.content.sources.model.RefreshReport
         """
         reports = []
         catalog = managers.content_catalog_manager()
+        sources = []
         for source_id, source in self.sources.items():
             if canceled.is_set():
                 break
             if force or not catalog.has_entries(source_id):
-                try:
-                    report = source.refresh(canceled)
+                sources.append(source)
+        refresh = partial(self._refresh_source, canceled)
+        if concurrency > 1 and len(sources) > 1:
+            pool = ThreadPool(min(concurrency, len(sources)))
+            try:
+                for report in pool.map(refresh, sources):
                     reports.extend(report)
-                except Exception, e:
-                    log.error('refresh %s, failed: %s', source_id, e)
-                    report = RefreshReport(source_id, '')
-                    report.errors.append(str(e))
-                    reports.append(report)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for source in sources:
+                reports.extend(refresh(source))
         catalog.purge_expired()
         return reports
 
+    @staticmethod
+    def _refresh_source(canceled, source):
+        """
+        Refresh the content catalog using the specified content source.
+        :param canceled: An event that indicates the refresh has been canceled.
+        :type canceled: threading.Event
+        :param source: A content source.
+        :type source: ContentSource
+        :return: A list of refresh reports.
+        :rtype: list of: pulp.server.content.sources.model.RefreshReport
+        """
+        if canceled.is_set():
+            return []
+        started = time.time()
+        try:
+            return source.refresh(canceled)
+        except Exception, e:
+            log.error('refresh %s, failed: %s', source.id, e)
+            report = RefreshReport(source.id, '')
+            report.errors.append(str(e))
+            report.duration = time.time() - started
+            return [report]
+
     def purge_orphans(self):
         """
         Purge the catalog of orphaned entries.
@@ -138,12 +189,15 @@ class NectarListener(DownloadEventListener):
         except Exception:
             log.exception(str(method))
 
-    def __init__(self, batch):
+    def __init__(self, batch, stats=None):
         """
         :param batch: A download batch.
         :type batch: Batch
+        :param stats: The statistics of the content source the downloads are made from.
+        :type stats: SourceStats
         """
         self.batch = batch
+        self.stats = stats or SourceStats()
         self.total_succeeded = 0
         self.total_failed = 0
 
@@ -172,6 +226,7 @@ class NectarListener(DownloadEventListener):
         :type report: nectar.report.DownloadReport
         """
         self.total_succeeded += 1
+        self.stats.succeeded(*transfer(report))
         if self.batch.is_canceled:
             return
         request = report.data
@@ -193,6 +248,7 @@ class NectarListener(DownloadEventListener):
         :type report: nectar.report.DownloadReport
         """
         self.total_failed += 1
+        self.stats.failed()
         if self.batch.is_canceled:
             return
         request = report.data
@@ -250,6 +306,8 @@ class Batch(object):
     :type in_progress: Tracker
     :ivar queues: A dictionary of: RequestQueue keyed by source_id.
     :type queues: dict
+    :ivar stats: A dictionary of: SourceStats keyed by source_id.
+    :type stats: dict
     """
 
     def __init__(self, canceled, primary, sources, requests, listener):
@@ -274,6 +332,7 @@ class Batch(object):
         self.listener = listener
         self.in_progress = Tracker(canceled)
         self.queues = {}
+        self.stats = {}
 
     @property
     def is_canceled(self):
@@ -297,7 +356,7 @@ class Batch(object):
         """
         dispatched = False
         try:
-            source, url = request.sources.next()
+            source, url = request.next_source(self.rank)
             queue = self.find_queue(source)
             queue.put(Item(request, url))
             dispatched = True
@@ -305,6 +364,35 @@ class Batch(object):
             self.in_progress.decrement()
         return dispatched
 
+    def get_stats(self, source_id):
+        """
+        Get the statistics observed for the specified content source.
+        The statistics are created and added if not found.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :return: The source statistics.
+        :rtype: SourceStats
+        """
+        with self._mutex:
+            try:
+                return self.stats[source_id]
+            except KeyError:
+                stats = SourceStats()
+                self.stats[source_id] = stats
+                return stats
+
+    def rank(self, source):
+        """
+        Rank the specified content source using the statistics observed
+        while downloading from it.  Used to choose between sources of the
+        same priority.
+        :param source: A content source.
+        :type source: pulp.server.content.sources.model.ContentSource
+        :return: The rank.  Lower ranked sources are preferred.
+        :rtype: tuple
+        """
+        return self.get_stats(source.id).rank
+
     def find_queue(self, source):
         """
         Find the request queue associated with the specified content source.
@@ -330,11 +418,24 @@ class Batch(object):
         :rtype: RequestQueue
         """
         queue = RequestQueue(self.canceled, source)
-        queue.downloader.event_listener = NectarListener(self)
+        queue.downloader.event_listener = NectarListener(self, self.get_stats(source.id))
         self.queues[source.id] = queue
         queue.start()
         return queue
 
+    def plan(self, requests):
+        """
+        Find the content sources to be used to satisfy each of the specified
+        requests.  The content catalog entries for all of the requests are
+        looked up together rather than one request at a time.
+        :param requests: A list of: pulp.server.content.sources.model.Request.
+        :type requests: list
+        """
+        catalog = managers.content_catalog_manager()
+        units = [(request.type_id, request.unit_key) for request in requests]
+        for request, entries in zip(requests, catalog.find_all(units)):
+            request.find_sources(self.primary, self.sources, entries)
+
     def download(self):
         """
         Begin processing the batch of requests.
@@ -351,12 +452,15 @@ class Batch(object):
         report.total_sources = len(self.sources)
 
         try:
-            for request in self.requests:
+            for requests in paginate(self.requests, PLAN_BATCH_SIZE):
                 if self.is_canceled:
                     break
-                request.find_sources(self.primary, self.sources)
-                self.dispatch(request)
-                count += 1
+                self.plan(requests)
+                for request in requests:
+                    if self.is_canceled:
+                        break
+                    self.dispatch(request)
+                    count += 1
         except Exception:
             self.canceled.set()
             raise
@@ -373,6 +477,8 @@ class Batch(object):
             downloads = report.downloads.setdefault(source_id, DownloadDetails())
             downloads.total_succeeded += listener.total_succeeded
             downloads.total_failed += listener.total_failed
+            downloads.throughput = listener.stats.throughput or 0.0
+            downloads.error_rate = listener.stats.error_rate
         return report
 
 
@@ -545,3 +651,91 @@ class Tracker(object):
             except Empty:
                 # ignored
                 pass
+
+
+class SourceStats(object):
+    """
+    Moving averages of the throughput and error rate observed while
+    downloading from a content source.
+    :ivar throughput: The observed throughput (bytes/sec).  None until measured.
+    :type throughput: float
+    :ivar error_rate: The observed error rate (0.0 - 1.0).
+    :type error_rate: float
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.throughput = None
+        self.error_rate = 0.0
+
+    @staticmethod
+    def _average(average, value):
+        """
+        Update an exponential moving average.
+        :param average: The current average.  None when nothing was observed.
+        :type average: float
+        :param value: The observed value.
+        :type value: float
+        :return: The updated average.
+        :rtype: float
+        """
+        if average is None:
+            return float(value)
+        return average + STATS_WEIGHT * (value - average)
+
+    def succeeded(self, nbytes, seconds):
+        """
+        Record a successful download.
+        :param nbytes: The number of bytes downloaded.
+        :type nbytes: int
+        :param seconds: The number of seconds the download took.  Not
+            measured when None or 0.
+        :type seconds: float
+        """
+        with self._lock:
+            self.error_rate = self._average(self.error_rate, 0)
+            if seconds:
+                self.throughput = self._average(self.throughput, nbytes / seconds)
+
+    def failed(self):
+        """
+        Record a failed download.
+        """
+        with self._lock:
+            self.error_rate = self._average(self.error_rate, 1)
+
+    @property
+    def rank(self):
+        """
+        Get the rank of the source.  Degraded sources are ranked after
+        healthy sources.  Sources are otherwise ranked by the expected
+        time spent per byte, including retries.  Unmeasured sources are
+        ranked first so they get measured.
+        :return: tuple of: (degraded, cost)
+        :rtype: tuple
+        """
+        with self._lock:
+            degraded = self.error_rate >= DEGRADED_ERROR_RATE
+            if not self.throughput:
+                return degraded, 0.0
+            cost = 1.0 / self.throughput / max(1.0 - self.error_rate, 0.01)
+            return degraded, cost
+
+
+def transfer(report):
+    """
+    Get the number of bytes transferred and the time spent by a download.
+    :param report: A nectar download report.
+    :type report: nectar.report.DownloadReport
+    :return: tuple of: (bytes, seconds).  The seconds are None when the
+        download was not timed.
+    :rtype: tuple
+    """
+    nbytes = report.bytes_downloaded
+    started = report.start_time
+    finished = report.finish_time
+    if not isinstance(nbytes, (int, long)):
+        return 0, None
+    if not (isinstance(started, datetime) and isinstance(finished, datetime)):
+        return nbytes, None
+    return nbytes, (finished - started).total_seconds()
@@ -12,7 +12,10 @@
 import sys
 import os
 import re
+import time
 
+from functools import partial
+from multiprocessing.pool import ThreadPool
 from urlparse import urljoin
 from logging import getLogger
 from ConfigParser import ConfigParser
@@ -34,6 +37,8 @@ PATHS_REGEX = re.compile(r'\s+')
 REFRESHING = 'Refreshing [%s] url:%s'
 REFRESH_SUCCEEDED = 'Refresh [%s] succeeded.  Added: %d, Deleted: %d'
 REFRESH_FAILED = 'Refresh [%s] url: %s, failed: %s'
+REFRESH_COMMITTED = 'Refresh [%s] committed.  Added: %d, Purged: %d, Seconds: %.2f'
+REFRESH_NOT_COMMITTED = 'Refresh [%s] not committed.  Previous entries kept.'
 
 
 class Request(object):
@@ -80,7 +85,7 @@ class Request(object):
         self.errors = []
         self.data = None
 
-    def find_sources(self, primary, alternates):
+    def find_sources(self, primary, alternates, entries=None):
         """
         Find and set the list of content sources in the order they are to
         be used to satisfy the request.  The alternate sources are
@@ -89,10 +94,15 @@ class Request(object):
         :type primary: ContentSource
         :param alternates: A list of alternative sources.
         :type list of: ContentSource
+        :param entries: The content catalog entries matching this request when
+            already looked up by the caller.  Looked up in the catalog when None.
+        :type entries: list
         """
         resolved = [(primary, self.url)]
-        catalog = managers.content_catalog_manager()
-        for entry in catalog.find(self.type_id, self.unit_key):
+        if entries is None:
+            catalog = managers.content_catalog_manager()
+            entries = catalog.find(self.type_id, self.unit_key)
+        for entry in entries:
             source_id = entry[constants.SOURCE_ID]
             source = alternates.get(source_id)
             if source is None:
@@ -102,6 +112,31 @@ class Request(object):
         resolved.sort()
         self.sources = iter(resolved)
 
+    def next_source(self, rank=None):
+        """
+        Get the next content source to be used to satisfy the request.
+        Sources are used in priority order.  When a rank function is specified,
+        the remaining source with the lowest rank is selected from those sharing
+        the highest remaining priority; ties keep the catalog order.
+        :param rank: An optional function used to rank a content source.
+            Lower ranked sources are preferred.
+        :type rank: callable
+        :return: tuple of: (ContentSource, url)
+        :rtype: tuple
+        :raise StopIteration: when no sources remain.
+        """
+        if rank is None:
+            return self.sources.next()
+        remaining = list(self.sources)
+        if not remaining:
+            raise StopIteration()
+        priority = remaining[0][0].priority
+        candidates = [i for i, (s, u) in enumerate(remaining) if s.priority == priority]
+        selected = min(candidates, key=lambda i: rank(remaining[i][0]))
+        next_source = remaining.pop(selected)
+        self.sources = iter(remaining)
+        return next_source
+
 
 class ContentSource(object):
     """
@@ -224,7 +259,7 @@ class ContentSource(object):
         :return: The download concurrency.
         :rtype: int
         """
-        return int(self.descriptor[constants.MAX_CONCURRENT])
+        return int(self.descriptor.get(constants.MAX_CONCURRENT, DEFAULT[constants.MAX_CONCURRENT]))
 
     @property
     def urls(self):
@@ -283,34 +318,83 @@ class ContentSource(object):
     def refresh(self, cancel_event):
         """
         Refresh the content catalog using the cataloger plugin as
-        defined by the "type" descriptor property.
+        defined by the "type" descriptor property.  The entries are added
+        in a new generation which replaces the entries previously contributed
+        by this source only when every URL is refreshed successfully.
+        Up to max_concurrent URLs are refreshed concurrently.
         :param cancel_event: An event that indicates the refresh has been canceled.
         :type cancel_event: threading.Event
         :return: The list of refresh reports.
         :rtype: list of: RefreshReport
         """
         reports = []
+        urls = self.urls
+        started = time.time()
         conduit = self.get_conduit()
-        plugin = self.get_cataloger()
-        for url in self.urls:
-            if cancel_event.isSet():
-                break
-            conduit.reset()
-            report = RefreshReport(self.id, url)
-            log.info(REFRESHING, self.id, url)
-            try:
-                plugin.refresh(conduit, self.descriptor, url)
-                log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
-                report.succeeded = True
-                report.added_count = conduit.added_count
-                report.deleted_count = conduit.deleted_count
-            except Exception, e:
-                log.error(REFRESH_FAILED, self.id, url, e)
-                report.errors.append(str(e))
-            finally:
-                reports.append(report)
+        conduit.open_generation()
+        refresh = partial(self._refresh_url, cancel_event, conduit.generation)
+        concurrency = min(self.max_concurrent, len(urls))
+        try:
+            if concurrency > 1:
+                pool = ThreadPool(concurrency)
+                try:
+                    reports = [r for r in pool.map(refresh, urls) if r is not None]
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                for url in urls:
+                    report = refresh(url)
+                    if report is None:
+                        break
+                    reports.append(report)
+        finally:
+            complete = len(reports) == len(urls) and all(r.succeeded for r in reports)
+            if reports and complete and not cancel_event.isSet():
+                purged = conduit.commit_generation()
+                reports[-1].deleted_count += purged
+                added = sum(r.added_count for r in reports)
+                log.info(REFRESH_COMMITTED, self.id, added, purged, time.time() - started)
+            else:
+                conduit.close_generation()
+                log.info(REFRESH_NOT_COMMITTED, self.id)
         return reports
 
+    def _refresh_url(self, cancel_event, generation, url):
+        """
+        Refresh the content catalog using the specified URL.  Each URL is
+        refreshed using its own conduit and cataloger plugin so that URLs
+        may be refreshed concurrently.
+        :param cancel_event: An event that indicates the refresh has been canceled.
+        :type cancel_event: threading.Event
+        :param generation: The generation the added entries belong to.
+        :type generation: ObjectId
+        :param url: The URL used to refresh.
+        :type url: str
+        :return: The refresh report or None when canceled before the refresh started.
+        :rtype: RefreshReport
+        """
+        if cancel_event.isSet():
+            return None
+        conduit = self.get_conduit()
+        conduit.open_generation(generation)
+        report = RefreshReport(self.id, url)
+        log.info(REFRESHING, self.id, url)
+        started = time.time()
+        try:
+            plugin = self.get_cataloger()
+            plugin.refresh(conduit, self.descriptor, url)
+            conduit.flush()
+            log.info(REFRESH_SUCCEEDED, self.id, conduit.added_count, conduit.deleted_count)
+            report.succeeded = True
+            report.added_count = conduit.added_count
+            report.deleted_count = conduit.deleted_count
+        except Exception, e:
+            log.error(REFRESH_FAILED, self.id, url, e)
+            report.errors.append(str(e))
+        report.duration = time.time() - started
+        return report
+
     def dict(self):
         """
         Dictionary representation.
@@ -389,11 +473,17 @@ class DownloadDetails(object):
     :type total_succeeded: int
     :ivar total_failed: The total number of downloads that failed.
     :type total_failed: int
+    :ivar throughput: The moving average of the observed throughput (bytes/sec).
+    :type throughput: float
+    :ivar error_rate: The moving average of the observed error rate (0.0 - 1.0).
+    :type error_rate: float
     """
 
     def __init__(self):
         self.total_succeeded = 0
         self.total_failed = 0
+        self.throughput = 0.0
+        self.error_rate = 0.0
 
     def dict(self):
         """
@@ -440,6 +530,8 @@ class RefreshReport(object):
     :type deleted_count: int
     :ivar errors: The list of errors.
     :type errors: list
+    :ivar duration: The number of seconds spent refreshing the URL.
+    :type duration: float
     """
 
     def __init__(self, source_id, url):
@@ -455,6 +547,7 @@ class RefreshReport(object):
         self.added_count = 0
         self.deleted_count = 0
         self.errors = []
+        self.duration = 0
 
     def dict(self):
         """
@@ -464,4 +557,4 @@ class RefreshReport(object):
         """
         return dict(source_id=self.source_id, url=self.url, succeeded=self.succeeded,
                     added_count=self.added_count, deleted_count=self.deleted_count,
-                    errors=self.errors)
+                    errors=self.errors, duration=self.duration)
@@ -81,7 +81,7 @@ class ScheduledCall(Model):
 
     collection_name = 'scheduled_calls'
     unique_indices = ()
-    search_indices = ('resource', 'last_updated')
+    search_indices = ('resource', 'last_updated', ('enabled', 'last_updated'))
 
     def __init__(self, iso_schedule, task, total_run_count=0, next_run=None,
                  schedule=None, args=None, kwargs=None, principal=None, last_updated=None,
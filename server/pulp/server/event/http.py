@@ -6,47 +6,291 @@ url
   Full URL to contact with the event data. A POST request will be made to this
   URL with the contents of the events in the body.
 
-Eventually this should be enhanced to support authentication credentials as well.
+username, password
+  Optional credentials sent to the URL using HTTP basic authentication.
+
+batch_size
+  Optional maximum number of queued events for the same URL that are sent together
+  in a single POST. When greater than 1, the body of each POST is a list of events
+  instead of a single event. Defaults to 1.
+
+Events are queued and sent by a pool of worker threads, each of which keeps a
+connection open to every host it has contacted. The size of the pool and of the
+queue are set in the http_notifier section of the server configuration, as is how
+often the delivery and failure counters of the notifier are logged.
 """
 
 import base64
+import errno
 import httplib
 import logging
+import Queue
+import socket
 import threading
+import time
 
+from pulp.server import config as pulp_config
 from pulp.server.compat import json, json_util
 
 
 TYPE_ID = 'http'
 
+# socket errors raised when writing to a connection the server has already closed
+CONNECTION_CLOSED_ERRNOS = frozenset([errno.EPIPE, errno.ECONNRESET, errno.ECONNABORTED])
+
 _logger = logging.getLogger(__name__)
 
+_notifier = None
+_notifier_lock = threading.Lock()
+
+# queued in place of an event to tell a worker thread to exit
+_STOP = object()
+
+
+class HTTPNotifier(object):
+    """
+    A bounded queue of events waiting to be posted and the pool of threads that post them.
+
+    When the queue is full, handing over an event blocks for up to enqueue_timeout seconds
+    before the event is dropped, so that a burst of events slows down the callers instead of
+    exhausting the memory of the process.
+
+    :ivar sent:          number of POST requests that succeeded
+    :type sent:          int
+    :ivar failed:        number of POST requests that failed or received an error response
+    :type failed:        int
+    :ivar dropped:       number of events discarded because the queue was full
+    :type dropped:       int
+    :ivar total_latency: sum of the seconds each sent event spent between being queued and
+                         being delivered
+    :type total_latency: float
+    :ivar max_latency:   largest number of seconds a sent event spent between being queued and
+                         being delivered
+    :type max_latency:   float
+    """
+
+    def __init__(self, workers, queue_size, enqueue_timeout, connection_timeout,
+                 stats_log_interval=0):
+        """
+        :param workers:            number of threads posting events
+        :type  workers:            int
+        :param queue_size:         maximum number of events waiting to be posted
+        :type  queue_size:         int
+        :param enqueue_timeout:    seconds to wait for room in a full queue
+        :type  enqueue_timeout:    float
+        :param connection_timeout: seconds to wait on the network when posting
+        :type  connection_timeout: float
+        :param stats_log_interval: minimum seconds between logging the counters after a post;
+                                   0 disables the logging
+        :type  stats_log_interval: float
+        """
+        self.enqueue_timeout = enqueue_timeout
+        self.connection_timeout = connection_timeout
+        self.stats_log_interval = stats_log_interval
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.delivered_events = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._stats_logged = time.time()
+        self._queue = Queue.Queue(queue_size)
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name='http-notifier-%d' % i)
+            thread.setDaemon(True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, notifier_config, destination, body):
+        """
+        Queue an event to be posted.
+
+        :param notifier_config: configuration of the notifier the event is sent to
+        :type  notifier_config: dict
+        :param destination:     tuple of the scheme, server and path to post to
+        :type  destination:     tuple
+        :param body:            JSON serialized event
+        :type  body:            str
+        """
+        item = (notifier_config, destination, body, time.time())
+        try:
+            self._queue.put(item, timeout=self.enqueue_timeout)
+        except Queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            _logger.warn('HTTP notifier queue is full; dropping event for %(u)s' %
+                         {'u': notifier_config['url']})
+
+    def stop(self):
+        """
+        Ask the worker threads to exit once the events queued so far are sent.
+        """
+        for thread in self._threads:
+            self._queue.put(_STOP)
+
+    def stats(self):
+        """
+        :return: the delivery and failure counters and the number of queued events
+        :rtype:  dict
+        """
+        with self._stats_lock:
+            average = self.total_latency / self.delivered_events if self.delivered_events else 0.0
+            return {'queued': self._queue.qsize(),
+                    'sent': self.sent,
+                    'failed': self.failed,
+                    'dropped': self.dropped,
+                    'average_latency': average,
+                    'max_latency': self.max_latency}
+
+    def _run(self):
+        """
+        Post queued events until told to stop. Consecutive events for the same URL are sent
+        in a single POST when their notifier is configured with a batch_size.
+        """
+        connections = {}
+        pending = []
+        while True:
+            item = pending.pop() if pending else self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            batch_size = int(item[0].get('batch_size') or 1)
+            while len(batch) < batch_size:
+                try:
+                    next_item = self._queue.get_nowait()
+                except Queue.Empty:
+                    break
+                if next_item is _STOP or next_item[0] != item[0]:
+                    pending.append(next_item)
+                    break
+                batch.append(next_item)
+            self._post(connections, batch, batch_size > 1)
+        for connection in connections.values():
+            connection.close()
+
+    def _post(self, connections, batch, batched):
+        """
+        Post a batch of events queued for the same notifier, reusing this thread's connection
+        to the server when there is one.
+
+        :param connections: connections of this thread keyed by scheme and server
+        :type  connections: dict
+        :param batch:       queued items, all for the same notifier
+        :type  batch:       list
+        :param batched:     True if the events should be posted as a list
+        :type  batched:     bool
+        """
+        notifier_config, (scheme, server, path) = batch[0][:2]
+        if batched:
+            body = '[%s]' % ', '.join(item[2] for item in batch)
+        else:
+            body = batch[0][2]
+
+        try:
+            succeeded = _send_post(connections, notifier_config, scheme, server, path, body,
+                                   self.connection_timeout)
+        except Exception:
+            _logger.exception('Error sending event to HTTP notifier at %(u)s' %
+                              {'u': notifier_config['url']})
+            succeeded = False
+
+        now = time.time()
+        with self._stats_lock:
+            if succeeded:
+                self.sent += 1
+                for item in batch:
+                    latency = now - item[3]
+                    self.delivered_events += 1
+                    self.total_latency += latency
+                    self.max_latency = max(self.max_latency, latency)
+            else:
+                self.failed += 1
+        self._log_stats(now)
+
+    def _log_stats(self, now):
+        """
+        Log the counters if at least stats_log_interval seconds have passed since they were
+        last logged.
+
+        :param now: the current time
+        :type  now: float
+        """
+        if not self.stats_log_interval:
+            return
+        with self._stats_lock:
+            if now - self._stats_logged < self.stats_log_interval:
+                return
+            self._stats_logged = now
+        _logger.info('HTTP notifier: %(sent)d sent, %(failed)d failed, %(dropped)d dropped, '
+                     '%(queued)d queued, average latency %(average_latency).3fs, '
+                     'max latency %(max_latency).3fs' % self.stats())
+
 
 def handle_event(notifier_config, event):
-    # fire the actual http push function off in a separate thread to keep
+    # hand the actual http push off to the notifier threads to keep
     # pulp from blocking or deadlocking due to the tasking subsystem
 
     data = event.data()
 
     _logger.info(data)
 
+    destination = _parse_url(notifier_config)
+    if destination is None:
+        return
+
     body = json.dumps(data, default=json_util.default)
 
-    thread = threading.Thread(target=_send_post, args=[notifier_config, body])
-    thread.setDaemon(True)
-    thread.start()
+    get_notifier().put(notifier_config, destination, body)
 
 
-def _send_post(notifier_config, body):
+def get_notifier():
+    """
+    Return the HTTP notifier of this process, starting it from the server
+    configuration on first use.
 
-    # Basic headers
-    headers = {'Accept': 'application/json',
-               'Content-Type': 'application/json'}
+    :return: the HTTP notifier
+    :rtype:  HTTPNotifier
+    """
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                config = pulp_config.config
+                _notifier = HTTPNotifier(
+                    config.getint('http_notifier', 'workers'),
+                    config.getint('http_notifier', 'queue_size'),
+                    config.getfloat('http_notifier', 'enqueue_timeout'),
+                    config.getfloat('http_notifier', 'connection_timeout'),
+                    config.getfloat('http_notifier', 'stats_log_interval'))
+    return _notifier
+
+
+def stats():
+    """
+    Return the delivery and failure counters of the HTTP notifier of this process.
+
+    :return: counters as returned by HTTPNotifier.stats, empty if no event was sent yet
+    :rtype:  dict
+    """
+    if _notifier is None:
+        return {}
+    return _notifier.stats()
 
-    # Parse the URL for the pieces we need
+
+def _parse_url(notifier_config):
+    """
+    Split the URL of the notifier into the pieces needed to post to it.
+
+    :param notifier_config: configuration of the notifier
+    :type  notifier_config: dict
+    :return: tuple of scheme, server and path, or None if the URL is missing or invalid
+    :rtype:  tuple
+    """
     if 'url' not in notifier_config or not notifier_config['url']:
         _logger.warn('HTTP notifier configured without a URL; cannot fire event')
-        return
+        return None
 
     url = notifier_config['url']
 
@@ -54,9 +298,39 @@ def _send_post(notifier_config, body):
         scheme, empty, server, path = url.split('/', 3)
     except ValueError:
         _logger.warn('Improperly configured post_sync_url: %(u)s' % {'u': url})
-        return
+        return None
+
+    return scheme, server, path
 
-    connection = _create_connection(scheme, server)
+
+def _send_post(connections, notifier_config, scheme, server, path, body, timeout):
+    """
+    Post a body to the notifier. The server may have closed a connection kept open from an
+    earlier post, so a post that fails on one before it reached the server is retried once
+    with a new connection.
+
+    :param connections: open connections of the calling worker keyed by (scheme, server);
+                        updated as connections are created and closed
+    :type  connections: dict
+    :param notifier_config: configuration of the notifier
+    :type  notifier_config: dict
+    :param scheme: scheme of the notifier URL, as returned by _parse_url
+    :type  scheme: str
+    :param server: server of the notifier URL, as returned by _parse_url
+    :type  server: str
+    :param path: path of the notifier URL, as returned by _parse_url
+    :type  path: str
+    :param body: serialized body of the post
+    :type  body: str
+    :param timeout: timeout in seconds of a new connection
+    :type  timeout: int
+    :return: True if the server accepted the post
+    :rtype:  bool
+    """
+
+    # Basic headers
+    headers = {'Accept': 'application/json',
+               'Content-Type': 'application/json'}
 
     # Process authentication
     if 'username' in notifier_config and 'password' in notifier_config:
@@ -64,17 +338,57 @@ def _send_post(notifier_config, body):
         encoded = base64.encodestring(raw)[:-1]
         headers['Authorization'] = 'Basic ' + encoded
 
-    connection.request('POST', '/' + path, body=body, headers=headers)
-    response = connection.getresponse()
+    key = (scheme, server)
+    reused = key in connections
+    while True:
+        if key not in connections:
+            connections[key] = _create_connection(scheme, server, timeout)
+        connection = connections[key]
+        sent = False
+        try:
+            connection.request('POST', '/' + path, body=body, headers=headers)
+            sent = True
+            response = connection.getresponse()
+            error_msg = response.read()
+            break
+        except (httplib.HTTPException, socket.error), e:
+            connection.close()
+            del connections[key]
+            if not (reused and _closed_before_sending(e, sent)):
+                raise
+            reused = False
+
+    if response.will_close:
+        connection.close()
+        del connections[key]
+
     if response.status != httplib.OK:
-        error_msg = response.read()
         _logger.warn('Error response from HTTP notifier: %(e)s' % {'e': error_msg})
-    connection.close()
+        return False
+    return True
+
+
+def _closed_before_sending(error, sent):
+    """
+    Determine whether a failed post shows that the server closed the connection before the
+    post reached it, in which case the post may safely be sent again.
+
+    :param error: error raised by the failed post
+    :type  error: Exception
+    :param sent: True if the post was completely written to the connection
+    :type  sent: bool
+    :return: True if writing the post failed because the connection was closed, or if the
+             connection was closed without any response being sent
+    :rtype:  bool
+    """
+    if not sent:
+        return isinstance(error, socket.error) and error.errno in CONNECTION_CLOSED_ERRNOS
+    return isinstance(error, httplib.BadStatusLine) and error.line == repr('')
 
 
-def _create_connection(scheme, server):
+def _create_connection(scheme, server, timeout=None):
     if scheme.startswith('https'):
-        connection = httplib.HTTPSConnection(server)
+        connection = httplib.HTTPSConnection(server, timeout=timeout)
     else:
-        connection = httplib.HTTPConnection(server)
+        connection = httplib.HTTPConnection(server, timeout=timeout)
     return connection
@@ -0,0 +1,147 @@
+"""
+Per-process cache of resolved user permissions.
+
+Every authenticated REST call checks the caller's permissions, which costs one
+database query to determine whether the user is a super user plus one query per
+segment of the resource path. This module caches the results of those lookups,
+keyed by user login, so repeated requests by the same user do not hit the database.
+
+Each process keeps its own cache. Changes made through the permission, role and
+user managers invalidate the entries of the affected users in the process that made
+the change; other processes pick the change up when their entries expire.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+from pulp.server import config as pulp_config
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class PermissionCache(object):
+    """
+    A bounded, thread-safe cache whose entries expire after a fixed number of seconds.
+
+    Keys are tuples whose first element is the login of the user the entry belongs to,
+    so that all the entries of a user can be invalidated together. When the cache is
+    full, the least recently stored entry is evicted.
+
+    :ivar max_size: maximum number of entries held in the cache
+    :type max_size: int
+    :ivar ttl:      number of seconds an entry may be used after it was stored
+    :type ttl:      int
+    :ivar hits:     number of lookups answered from the cache
+    :type hits:     int
+    :ivar misses:   number of lookups not answered from the cache
+    :type misses:   int
+    """
+
+    def __init__(self, max_size, ttl):
+        """
+        :param max_size: maximum number of entries held in the cache
+        :type  max_size: int
+        :param ttl:      number of seconds an entry may be used after it was stored
+        :type  ttl:      int
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up an entry in the cache.
+
+        :param key: tuple whose first element is a user login
+        :type  key: tuple
+
+        :return: tuple of (found, value) where found is True if an unexpired entry exists
+        :rtype:  tuple
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expiration, value = entry
+                if expiration > time.time():
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        """
+        Store an entry in the cache, evicting the oldest entry if the cache is full.
+
+        :param key:   tuple whose first element is a user login
+        :type  key:   tuple
+        :param value: value to store
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+            self._entries[key] = (time.time() + self.ttl, value)
+
+    def invalidate(self, login=None):
+        """
+        Discard the entries of the given user, or every entry if no login is given.
+
+        :param login: login of the user whose entries should be discarded
+        :type  login: str or None
+        """
+        with self._lock:
+            if login is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == login]:
+                del self._entries[key]
+
+    def stats(self):
+        """
+        :return: the size, limits and hit and miss counters of the cache
+        :rtype:  dict
+        """
+        with self._lock:
+            return {'size': len(self._entries),
+                    'max_size': self.max_size,
+                    'ttl': self.ttl,
+                    'hits': self.hits,
+                    'misses': self.misses}
+
+
+def get_cache():
+    """
+    Return the permission cache of this process, creating it from the server
+    configuration on first use.
+
+    :return: the permission cache
+    :rtype:  PermissionCache
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                max_size = pulp_config.config.getint('authorization', 'permission_cache_size')
+                ttl = pulp_config.config.getint('authorization', 'permission_cache_ttl')
+                _cache = PermissionCache(max_size, ttl)
+    return _cache
+
+
+def invalidate(login=None):
+    """
+    Discard the cached permissions of the given user, or of every user if no login is given.
+
+    :param login: login of the user whose permissions changed
+    :type  login: str or None
+    """
+    if _cache is not None:
+        _cache.invalidate(login)
@@ -14,6 +14,7 @@ from pulp.server.exceptions import (
     DuplicateResource, InvalidValue, MissingResource, PulpDataException,
     PulpExecutionException)
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import cache as permission_cache
 from pulp.server.managers.auth.user import system
 
 
@@ -76,6 +77,7 @@ class PermissionManager(object):
             raise PulpDataException(_("Update Keyword [%s] is not supported" % key))
 
         Permission.get_collection().save(found, safe=True)
+        permission_cache.invalidate()
 
     @staticmethod
     def delete_permission(resource_uri):
@@ -98,6 +100,7 @@ class PermissionManager(object):
             raise MissingResource(resource_uri)
 
         Permission.get_collection().remove({'resource': resource_uri}, safe=True)
+        permission_cache.invalidate()
 
     @staticmethod
     def grant(resource, login, operations):
@@ -139,6 +142,7 @@ class PermissionManager(object):
             current_ops.append(o)
 
         Permission.get_collection().save(permission, safe=True)
+        permission_cache.invalidate(login)
 
     @staticmethod
     def revoke(resource, login, operations):
@@ -186,6 +190,7 @@ class PermissionManager(object):
             return
 
         Permission.get_collection().save(permission, safe=True)
+        permission_cache.invalidate(login)
 
     def grant_automatic_permissions_for_resource(self, resource):
         """
@@ -254,6 +259,7 @@ class PermissionManager(object):
             else:
                 # Delete entire permission if there are no more users
                 Permission.get_collection().remove({'resource': permission['resource']}, safe=True)
+        permission_cache.invalidate(login)
 
     def operation_name_to_value(self, name):
         """
@@ -14,6 +14,7 @@ from pulp.server.db.model.auth import Role, User
 from pulp.server.exceptions import (DuplicateResource, InvalidValue, MissingResource,
                                     PulpDataException)
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import cache as permission_cache
 from pulp.server.util import Delta
 
 
@@ -261,6 +262,7 @@ class RoleManager(object):
 
         user['roles'].append(role_id)
         User.get_collection().save(user, safe=True)
+        permission_cache.invalidate(login)
 
         for item in role['permissions']:
             factory.permission_manager().grant(item['resource'], login,
@@ -297,6 +299,7 @@ class RoleManager(object):
 
         user['roles'].remove(role_id)
         User.get_collection().save(user, safe=True)
+        permission_cache.invalidate(login)
 
         for item in role['permissions']:
             other_roles = factory.role_query_manager().get_other_roles(role, user['roles'])
@@ -14,6 +14,7 @@ from pulp.server.db.model.auth import User
 from pulp.server.exceptions import (PulpDataException, DuplicateResource, InvalidValue,
                                     MissingResource)
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import cache as permission_cache
 from pulp.server.managers.auth.role.cud import SUPER_USER_ROLE
 
 
@@ -147,6 +148,7 @@ class UserManager(object):
             raise InvalidValue(delta.keys())
 
         User.get_collection().save(user, safe=True)
+        permission_cache.invalidate(login)
 
         # Retrieve the user to return the SON object
         updated = User.get_collection().find_one({'login': login})
@@ -184,6 +186,7 @@ class UserManager(object):
         permission_manager.revoke_all_permissions_from_user(login)
 
         User.get_collection().remove({'login': login}, safe=True)
+        permission_cache.invalidate(login)
 
     def ensure_admin(self):
         """
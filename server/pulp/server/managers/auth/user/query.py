@@ -4,9 +4,10 @@ Contains users query classes
 
 from gettext import gettext as _
 
-from pulp.server.db.model.auth import User, Permission, Role
+from pulp.server.db.model.auth import User, Role
 from pulp.server.exceptions import PulpDataException, MissingResource
 from pulp.server.managers import factory
+from pulp.server.managers.auth.permission import cache as permission_cache
 from pulp.server.managers.auth.role.cud import SUPER_USER_ROLE
 
 
@@ -87,11 +88,18 @@ class UserQueryManager(object):
         @rtype: bool
         @return: True if the user is a super user, False otherwise
         """
+        cache = permission_cache.get_cache()
+        found, is_superuser = cache.get((login, None))
+        if found:
+            return is_superuser
+
         user = User.get_collection().find_one({'login': login})
         if user is None:
             raise MissingResource(login)
 
-        return SUPER_USER_ROLE in user['roles']
+        is_superuser = SUPER_USER_ROLE in user['roles']
+        cache.set((login, None), is_superuser)
+        return is_superuser
 
     def is_authorized(self, resource, login, operation):
         """
@@ -113,20 +121,45 @@ class UserQueryManager(object):
         if self.is_superuser(login):
             return True
 
-        permission_query_manager = factory.permission_query_manager()
-
         parts = [p for p in resource.split('/') if p]
         while parts:
             current_resource = '/%s/' % '/'.join(parts)
-            permission = permission_query_manager.find_by_resource(current_resource)
-            if permission is not None:
-                if operation in permission_query_manager.find_user_permission(permission, login):
-                    return True
+            if operation in self._find_user_operations(current_resource, login):
+                return True
             parts = parts[:-1]
 
-        permission = Permission.get_collection().find_one({'resource': '/'})
-        return (permission is not None and
-                operation in permission_query_manager.find_user_permission(permission, login))
+        return operation in self._find_user_operations('/', login)
+
+    @staticmethod
+    def _find_user_operations(resource, login):
+        """
+        Return the operations a user has been granted on exactly the given resource.
+
+        Results are kept in the per-process permission cache, including the absence
+        of a permission, so repeated checks of the same resource do not hit the database.
+
+        @type resource: str
+        @param resource: pulp resource path
+
+        @type login: str
+        @param login: login of user to find the operations of
+
+        @rtype: tuple of int
+        @return: operations granted to the user on the resource
+        """
+        cache = permission_cache.get_cache()
+        found, operations = cache.get((login, resource))
+        if found:
+            return operations
+
+        permission_query_manager = factory.permission_query_manager()
+        permission = permission_query_manager.find_by_resource(resource)
+        if permission is None:
+            operations = ()
+        else:
+            operations = tuple(permission_query_manager.find_user_permission(permission, login))
+        cache.set((login, resource), operations)
+        return operations
 
     def is_last_super_user(self, login):
         """
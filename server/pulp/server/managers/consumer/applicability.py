@@ -4,6 +4,8 @@ Contains content applicability management classes
 
 from gettext import gettext as _
 from logging import getLogger
+import time
+import uuid
 
 from celery import task
 
@@ -11,7 +13,9 @@ from pulp.plugins.conduits.profiler import ProfilerConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api, exceptions as plugin_exceptions
 from pulp.plugins.profiler import Profiler
-from pulp.server.async.tasks import Task
+from pulp.common import tags
+from pulp.plugins.util.misc import paginate
+from pulp.server.async.tasks import Task, TaskResult
 from pulp.server.db.model.consumer import Bind, RepoProfileApplicability, UnitProfile
 from pulp.server.db.model.criteria import Criteria
 from pulp.server.db.model.repository import Repo
@@ -21,6 +25,9 @@ from pulp.server.managers.consumer.query import ConsumerQueryManager
 
 _logger = getLogger(__name__)
 
+# maximum number of (repo_id, profile_hash) pairs regenerated by a single task
+REGENERATION_CHUNK_SIZE = 1000
+
 
 class ApplicabilityRegenerationManager(object):
     @staticmethod
@@ -105,12 +112,22 @@ class ApplicabilityRegenerationManager(object):
             manager.regenerate_applicability(profile_hash, content_type, profile_id, repo_id)
 
     @staticmethod
-    def regenerate_applicability_for_repos(repo_criteria):
+    def regenerate_applicability_for_repos(repo_criteria, chunk_size=REGENERATION_CHUNK_SIZE):
         """
         Regenerate and save applicability data affected by given updated repositories.
 
+        The existing applicability data of the repositories is split into chunks of at most
+        chunk_size (repo_id, profile_hash) pairs. A single chunk is regenerated in this task;
+        when there is more than one, each chunk is dispatched as its own task so the work is
+        spread across the available workers.
+
         :param repo_criteria: The repo selection criteria
         :type repo_criteria: dict
+        :param chunk_size: maximum number of (repo_id, profile_hash) pairs per chunk
+        :type chunk_size: int
+
+        :return: the regeneration report of the single chunk, or the spawned chunk tasks
+        :rtype: pulp.server.async.tasks.TaskResult
         """
         repo_criteria = Criteria.from_dict(repo_criteria)
         repo_query_manager = managers.repo_query_manager()
@@ -119,31 +136,107 @@ class ApplicabilityRegenerationManager(object):
         repo_criteria.fields = ['id']
         repo_ids = [r['id'] for r in repo_query_manager.find_by_criteria(repo_criteria)]
 
-        for repo_id in repo_ids:
-            # Find all existing applicabilities for given repo_id
+        # Find the unique (repo_id, profile_hash) pairs that have existing applicability data
+        repo_profile_hashes = set()
+        for page in paginate(repo_ids, chunk_size):
             existing_applicabilities = RepoProfileApplicability.get_collection().find(
-                {'repo_id': repo_id})
+                {'repo_id': {'$in': list(page)}}, fields=['repo_id', 'profile_hash'])
             for existing_applicability in existing_applicabilities:
+                repo_profile_hashes.add((existing_applicability['repo_id'],
+                                         existing_applicability['profile_hash']))
+
+        chunks = list(paginate(sorted(repo_profile_hashes), chunk_size))
+        if len(chunks) <= 1:
+            report = ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles(
+                chunks[0] if chunks else [])
+            return TaskResult(result=report)
+
+        spawned_tasks = []
+        regeneration_tag = tags.action_tag('content_applicability_regeneration')
+        for chunk in chunks:
+            # Each chunk reserves its own resource so that the chunks run concurrently. No two
+            # chunks share a pair, and a consumer regeneration only creates applicability data
+            # that does not exist yet, while the chunks only replace existing data.
+            async_result = regenerate_applicability_for_repo_profiles.apply_async_with_reservation(
+                tags.RESOURCE_REPOSITORY_PROFILE_APPLICABILITY_TYPE, str(uuid.uuid4()),
+                ([list(pair) for pair in chunk],), tags=[regeneration_tag])
+            spawned_tasks.append(async_result)
+        _logger.info(_('Dispatched applicability regeneration of %(pairs)d repository profiles '
+                       'in %(chunks)d tasks') % {'pairs': len(repo_profile_hashes),
+                                                 'chunks': len(chunks)})
+        return TaskResult(spawned_tasks=spawned_tasks)
+
+    @staticmethod
+    def regenerate_applicability_for_repo_profiles(repo_profile_hashes):
+        """
+        Regenerate and save the existing applicability data for the given (repo_id, profile_hash)
+        pairs.
+
+        The unit profiles, the content types of the repositories and the existing applicability
+        documents are each fetched with a single query up front, instead of once per pair.
+
+        :param repo_profile_hashes: list of (repo_id, profile_hash) pairs
+        :type repo_profile_hashes: list
+
+        :return: report containing the number of pairs, the number of regenerated pairs,
+                 the elapsed seconds and the number of pairs regenerated per second
+        :rtype: dict
+        """
+        start = time.time()
+        repo_profile_hashes = [tuple(pair) for pair in repo_profile_hashes]
+        repo_ids = sorted(set(repo_id for repo_id, profile_hash in repo_profile_hashes))
+        profile_hashes = list(set(profile_hash for repo_id, profile_hash in repo_profile_hashes))
+
+        # We need just one unit profile per profile_hash to know its content type
+        unit_profiles = {}
+        if profile_hashes:
+            for unit_profile in UnitProfile.get_collection().find(
+                    {'profile_hash': {'$in': profile_hashes}},
+                    fields=['id', 'content_type', 'profile_hash']):
+                unit_profiles.setdefault(unit_profile['profile_hash'], unit_profile)
+
+        repo_content_types = ApplicabilityRegenerationManager._get_existing_repo_content_types_map(
+            repo_ids)
+
+        existing_applicabilities = {}
+        if repo_profile_hashes:
+            query = {'repo_id': {'$in': repo_ids}, 'profile_hash': {'$in': profile_hashes}}
+            for existing_applicability in RepoProfileApplicability.get_collection().find(query):
                 # Convert cursor to RepoProfileApplicability object
                 existing_applicability = RepoProfileApplicability(**dict(existing_applicability))
-                profile_hash = existing_applicability['profile_hash']
-                unit_profile = UnitProfile.get_collection().find_one({'profile_hash': profile_hash},
-                                                                     fields=['id', 'content_type'])
-                if unit_profile is None:
-                    # Unit profiles change whenever packages are installed or removed on consumers,
-                    # and it is possible that existing_applicability references a UnitProfile
-                    # that no longer exists. This is harmless, as Pulp has a monthly cleanup task
-                    # that will identify these dangling references and remove them.
-                    continue
-
-                # Regenerate applicability data for given unit_profile and repo id
-                ApplicabilityRegenerationManager.regenerate_applicability(
-                    profile_hash, unit_profile['content_type'], unit_profile['id'], repo_id,
-                    existing_applicability)
+                key = (existing_applicability['repo_id'], existing_applicability['profile_hash'])
+                existing_applicabilities[key] = existing_applicability
+
+        regenerated = 0
+        for repo_id, profile_hash in repo_profile_hashes:
+            existing_applicability = existing_applicabilities.get((repo_id, profile_hash))
+            unit_profile = unit_profiles.get(profile_hash)
+            if existing_applicability is None or unit_profile is None:
+                # Unit profiles change whenever packages are installed or removed on consumers,
+                # and it is possible that existing_applicability references a UnitProfile
+                # that no longer exists. This is harmless, as Pulp has a monthly cleanup task
+                # that will identify these dangling references and remove them.
+                continue
+
+            # Regenerate applicability data for given unit_profile and repo id
+            ApplicabilityRegenerationManager.regenerate_applicability(
+                profile_hash, unit_profile['content_type'], unit_profile['id'], repo_id,
+                existing_applicability, repo_content_types.get(repo_id, []))
+            regenerated += 1
+
+        elapsed = time.time() - start
+        rate = regenerated / elapsed if elapsed > 0 else 0.0
+        _logger.info(_('Regenerated applicability of %(regenerated)d of %(pairs)d repository '
+                       'profiles in %(elapsed).2f seconds (%(rate).1f per second)') %
+                     {'regenerated': regenerated, 'pairs': len(repo_profile_hashes),
+                      'elapsed': elapsed, 'rate': rate})
+        return {'pairs': len(repo_profile_hashes), 'regenerated': regenerated,
+                'seconds': elapsed, 'rate': rate}
 
     @staticmethod
     def regenerate_applicability(profile_hash, content_type, profile_id,
-                                 bound_repo_id, existing_applicability=None):
+                                 bound_repo_id, existing_applicability=None,
+                                 repo_content_types=None):
         """
         Regenerate and save applicability data for given profile and bound repo id.
         If existing_applicability is not None, replace it with the new applicability data.
@@ -163,6 +256,10 @@ class ApplicabilityRegenerationManager(object):
 
         :param existing_applicability: existing RepoProfileApplicability object to be replaced
         :type existing_applicability: pulp.server.db.model.consumer.RepoProfileApplicability
+
+        :param repo_content_types: content types with units in the bound repo, looked up
+                                   when not given
+        :type repo_content_types: list
         """
         profiler_conduit = ProfilerConduit()
         # Get the profiler for content_type of given unit_profile
@@ -175,8 +272,9 @@ class ApplicabilityRegenerationManager(object):
             return
 
         # Find out which content types have unit counts greater than zero in the bound repo
-        repo_content_types = ApplicabilityRegenerationManager._get_existing_repo_content_types(
-            bound_repo_id)
+        if repo_content_types is None:
+            repo_content_types = ApplicabilityRegenerationManager._get_existing_repo_content_types(
+                bound_repo_id)
         # Get the intersection of existing types in the repo and the types that the profiler
         # handles. If the intersection is not empty, regenerate applicability
         if (set(repo_content_types) & set(profiler.metadata()['types'])):
@@ -230,6 +328,29 @@ class ApplicabilityRegenerationManager(object):
                     repo_content_types_with_non_zero_unit_count.append(content_type)
         return repo_content_types_with_non_zero_unit_count
 
+    @staticmethod
+    def _get_existing_repo_content_types_map(repo_ids):
+        """
+        For the given repo_ids, return a map of repo_id to the list of content_type_ids that
+        have content unit counts greater than 0, using a single query.
+
+        :param repo_ids: The repo_ids of the repositories whose unit types we wish to know
+        :type  repo_ids: list
+        :return:         A dict keyed by repo_id of lists of content type ids that have unit
+                         counts greater than 0
+        :rtype:          dict
+        """
+        repo_content_types = {}
+        if not repo_ids:
+            return repo_content_types
+        repos = Repo.get_collection().find({'id': {'$in': list(repo_ids)}},
+                                           fields=['id', 'content_unit_counts'])
+        for repo in repos:
+            repo_content_types[repo['id']] = [
+                content_type for content_type, count in
+                repo.get('content_unit_counts', {}).items() if count > 0]
+        return repo_content_types
+
     @staticmethod
     def _is_existing_applicability(repo_id, profile_hash):
         """
@@ -273,6 +394,9 @@ regenerate_applicability_for_consumers = task(
 regenerate_applicability_for_repos = task(
     ApplicabilityRegenerationManager.regenerate_applicability_for_repos, base=Task,
     ignore_result=True)
+regenerate_applicability_for_repo_profiles = task(
+    ApplicabilityRegenerationManager.regenerate_applicability_for_repo_profiles, base=Task,
+    ignore_result=True)
 
 
 class DoesNotExist(Exception):
@@ -11,8 +11,7 @@
 
 from logging import getLogger
 
-from pymongo import ASCENDING
-
+from pulp.plugins.util.misc import paginate
 from pulp.server.db.model.content import ContentCatalog
 
 
@@ -24,6 +23,9 @@ log = getLogger(__name__)
 # in the catalog after it has expired.
 GRACE_PERIOD = 3600  # 1 hour.
 
+# The maximum number of locators matched by a single query.
+FIND_BATCH_SIZE = 1000
+
 
 class ContentCatalogManager(object):
     """
@@ -60,6 +62,50 @@ class ContentCatalogManager(object):
         entry = ContentCatalog(source_id, expires, type_id, unit_key, url)
         collection.insert(entry, safe=True)
 
+    def add_entries(self, source_id, expires, entries, generation=None):
+        """
+        Add entries to the content catalog using a single insert.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param expires: The entry expiration in seconds.
+        :type expires: int
+        :param entries: An iterable of: (type_id, unit_key, url).
+        :type entries: iterable
+        :param generation: The generation (refresh) the entries belong to.
+        :type generation: ObjectId
+        :return: The number of entries added.
+        :rtype: int
+        """
+        collection = ContentCatalog.get_collection()
+        documents = [ContentCatalog(source_id, expires, type_id, unit_key, url, generation)
+                     for type_id, unit_key, url in entries]
+        if documents:
+            collection.insert(documents, safe=True)
+        return len(documents)
+
+    def purge_generations(self, source_id, generation):
+        """
+        Purge (delete) the entries belonging to the specified content source
+        that were added before the specified generation was started, replacing
+        them with the entries of that generation.  Entries added by another
+        refresh started after this generation are kept.
+        :param source_id: A content source ID.
+        :type source_id: str
+        :param generation: The generation (refresh) that replaces the earlier entries.
+            Generations are ObjectIds created when the refresh starts.
+        :type generation: ObjectId
+        :return: The number of entries purged.
+        :rtype: int
+        """
+        collection = ContentCatalog.get_collection()
+        query = {
+            'source_id': source_id,
+            'generation': {'$ne': generation},
+            '_id': {'$lt': generation}
+        }
+        result = collection.remove(query, safe=True)
+        return result['n']
+
     def delete_entry(self, source_id, type_id, unit_key):
         """
         Delete an entry from the content catalog.
@@ -137,16 +183,35 @@ class ContentCatalogManager(object):
         :return: A list of matching entries.
         :rtype: list
         """
+        return self.find_all([(type_id, unit_key)])[0]
+
+    def find_all(self, units):
+        """
+        Find entries in the content catalog for many units at once.  The entries
+        are matched using one query for every FIND_BATCH_SIZE distinct units
+        rather than one query per unit.  As with find(), only the newest entry
+        for each source is included for each unit.
+        :param units: An iterable of: (type_id, unit_key).
+        :type units: iterable
+        :return: A list containing, for each unit in the order specified, the
+            list of matching entries.
+        :rtype: list
+        """
         collection = ContentCatalog.get_collection()
-        locator = ContentCatalog.get_locator(type_id, unit_key)
-        query = {
-            'locator': locator,
-            'expiration': {'$gte': ContentCatalog.get_expiration(0)}
-        }
-        newest_by_source = {}
-        for entry in collection.find(query, sort=[('_id', ASCENDING)]):
-            newest_by_source[entry['source_id']] = entry
-        return newest_by_source.values()
+        locators = [ContentCatalog.get_locator(type_id, unit_key) for type_id, unit_key in units]
+        expiration = ContentCatalog.get_expiration(0)
+        newest = {}
+        for page in paginate(set(locators), FIND_BATCH_SIZE):
+            query = {
+                'locator': {'$in': list(page)},
+                'expiration': {'$gte': expiration}
+            }
+            for entry in collection.find(query):
+                newest_by_source = newest.setdefault(entry['locator'], {})
+                found = newest_by_source.get(entry['source_id'])
+                if found is None or found['_id'] < entry['_id']:
+                    newest_by_source[entry['source_id']] = entry
+        return [newest.get(locator, {}).values() for locator in locators]
 
     def has_entries(self, source_id):
         """
@@ -1,5 +1,7 @@
 import uuid
 
+from pymongo.errors import DuplicateKeyError
+
 from pulp.common import dateutils
 from pulp.plugins.types import database as content_types_db
 from pulp.server.exceptions import InvalidValue
@@ -35,6 +37,47 @@ class ContentManager(object):
         collection.insert(unit_doc, safe=True)
         return unit_id
 
+    def add_content_units(self, content_type, units_metadata):
+        """
+        Add multiple content units and their metadata to the corresponding pulp
+        db collection using a single batch insert.
+
+        Units that cannot be inserted because a unit with the same unit key
+        already exists are skipped; None is returned in their place so the
+        caller can update the existing units instead.
+        @param content_type: unique id of content collection
+        @type content_type: str
+        @param units_metadata: list of content unit metadata
+        @type units_metadata: list of dict
+        @return: list of generated unit ids, in the same order as units_metadata;
+                 None for each unit that already existed
+        @rtype: list of str or None
+        """
+        collection = content_types_db.type_units_collection(content_type)
+        last_updated = dateutils.now_utc_timestamp()
+        unit_docs = []
+        unit_ids = []
+        for unit_metadata in units_metadata:
+            unit_doc = {
+                '_id': str(uuid.uuid4()),
+                '_content_type_id': content_type,
+                '_last_updated': last_updated
+            }
+            unit_doc.update(unit_metadata)
+            unit_docs.append(unit_doc)
+            unit_ids.append(unit_doc['_id'])
+        if not unit_docs:
+            return unit_ids
+
+        try:
+            collection.insert(unit_docs, safe=True, continue_on_error=True)
+        except DuplicateKeyError:
+            # find out which of the units made it in; the others already existed
+            inserted = set(doc['_id'] for doc in
+                           collection.find({'_id': {'$in': unit_ids}}, fields=['_id']))
+            unit_ids = [unit_id if unit_id in inserted else None for unit_id in unit_ids]
+        return unit_ids
+
     def update_content_unit(self, content_type, unit_id, unit_metadata_delta):
         """
         Update a content unit's stored metadata.
@@ -7,6 +7,7 @@ import shutil
 from celery import task
 
 from pulp.plugins.types import database as content_types_db
+from pulp.plugins.util.misc import paginate
 from pulp.server import config as pulp_config, exceptions as pulp_exceptions
 from pulp.server.async.tasks import Task
 from pulp.server.db.model.repository import RepoContentUnit
@@ -14,34 +15,46 @@ from pulp.server.db.model.repository import RepoContentUnit
 
 _logger = logging.getLogger(__name__)
 
+# number of content units whose associations are checked with a single query
+ORPHAN_BATCH_SIZE = 1000
+
 
 class OrphanManager(object):
 
-    def orphans_summary(self):
+    def orphans_summary(self, progress_callback=None):
         """
         Return a summary of the orphaned units as a dictionary of
         content type -> number of orphaned units
 
+        :param progress_callback: optional callable passed to generate_orphan_pages_by_type
+        :type progress_callback: callable or None
         :return: summary of orphaned units
         :rtype: dict
         """
         summary = {}
         for content_type_id in content_types_db.all_type_ids():
-            summary[content_type_id] = self.orphans_count_by_type(content_type_id)
+            summary[content_type_id] = self.orphans_count_by_type(content_type_id,
+                                                                  progress_callback)
         return summary
 
-    def orphans_count_by_type(self, content_type_id):
+    def orphans_count_by_type(self, content_type_id, progress_callback=None):
         """
         Generate a count of the orphans of a given content type.
 
+        The count is accumulated from the batches of orphans found by
+        generate_orphan_pages_by_type, so no content unit is checked more than once.
+
         :param content_type_id: unique id of the content type to count orphans of
         :type content_type_id: basestring
+        :param progress_callback: optional callable passed to generate_orphan_pages_by_type
+        :type progress_callback: callable or None
         :return: count of orphaned units of the given type
         :rtype: int
         """
         count = 0
-        for unit in OrphanManager.generate_orphans_by_type(content_type_id):
-            count += 1
+        for page in OrphanManager.generate_orphan_pages_by_type(
+                content_type_id, progress_callback=progress_callback):
+            count += len(page)
         return count
 
     def generate_all_orphans(self, fields=None):
@@ -91,19 +104,66 @@ class OrphanManager(object):
         :rtype: generator
         """
 
+        for page in OrphanManager.generate_orphan_pages_by_type(content_type_id, fields):
+            for content_unit in page:
+                yield content_unit
+
+    @staticmethod
+    def generate_orphan_pages_by_type(content_type_id, fields=None,
+                                      batch_size=ORPHAN_BATCH_SIZE, progress_callback=None):
+        """
+        Return a generator of lists of orphaned content units of the given content type.
+
+        The content units of the type collection are streamed in batches of
+        batch_size. For each batch, a single query against the repo_content_units
+        collection determines which of the units are associated with any repository,
+        and the remaining units are yielded together as orphans. This costs one
+        round trip per batch instead of one per content unit.
+
+        If fields is not specified, only the `_id` field will be present.
+
+        If progress_callback is specified, it is called after each batch with
+        the content type id, the number of units checked so far and the number
+        of orphans found so far.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :param fields: list of fields to include in each content unit
+        :type fields: list or None
+        :param batch_size: number of content units to check per query
+        :type batch_size: int
+        :param progress_callback: called as progress_callback(content_type_id, checked, orphaned)
+        :type progress_callback: callable or None
+        :return: generator of lists of orphaned content units for the given content type
+        :rtype: generator
+        """
+
         fields = fields if fields is not None else ['_id']
         content_units_collection = content_types_db.type_units_collection(content_type_id)
         repo_content_units_collection = RepoContentUnit.get_collection()
 
-        for content_unit in content_units_collection.find({}, fields=fields):
+        checked = 0
+        orphaned = 0
 
-            repo_content_units_cursor = repo_content_units_collection.find(
-                {'unit_id': content_unit['_id']})
+        content_units_cursor = content_units_collection.find({}, fields=fields)
+        for page in paginate(content_units_cursor, batch_size):
+            unit_ids = [content_unit['_id'] for content_unit in page]
+            spec = {'unit_id': {'$in': unit_ids}}
+            associated_ids = set(repo_content_unit['unit_id'] for repo_content_unit in
+                                 repo_content_units_collection.find(spec, fields=['unit_id']))
 
-            if repo_content_units_cursor.count() > 0:
-                continue
+            orphans = [content_unit for content_unit in page
+                       if content_unit['_id'] not in associated_ids]
 
-            yield content_unit
+            checked += len(page)
+            orphaned += len(orphans)
+            _logger.debug(_('Checked %(c)d content units of type %(t)s, %(o)d orphaned') %
+                          {'c': checked, 't': content_type_id, 'o': orphaned})
+            if progress_callback is not None:
+                progress_callback(content_type_id, checked, orphaned)
+
+            if orphans:
+                yield orphans
 
     @staticmethod
     def generate_orphans_by_type_with_unit_keys(content_type_id):
@@ -203,18 +263,25 @@ class OrphanManager(object):
         """
 
         content_units_collection = content_types_db.type_units_collection(content_type_id)
+        if content_unit_ids is not None:
+            content_unit_ids = set(content_unit_ids)
 
-        for content_unit in OrphanManager.generate_orphans_by_type(content_type_id,
-                                                                   fields=['_id', '_storage_path']):
+        for page in OrphanManager.generate_orphan_pages_by_type(content_type_id,
+                                                                fields=['_id', '_storage_path']):
 
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
-                continue
+            if content_unit_ids is not None:
+                page = [content_unit for content_unit in page
+                        if content_unit['_id'] in content_unit_ids]
+                if not page:
+                    continue
 
-            content_units_collection.remove(content_unit['_id'], safe=False)
+            page_ids = [content_unit['_id'] for content_unit in page]
+            content_units_collection.remove({'_id': {'$in': page_ids}}, safe=False)
 
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                OrphanManager.delete_orphaned_file(storage_path)
+            for content_unit in page:
+                storage_path = content_unit.get('_storage_path', None)
+                if storage_path is not None:
+                    OrphanManager.delete_orphaned_file(storage_path)
 
     @staticmethod
     def delete_orphaned_file(path):
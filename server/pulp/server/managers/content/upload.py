@@ -13,9 +13,12 @@
 from celery import task
 from gettext import gettext as _
 from uuid import uuid4
+import hashlib
+import json
 import logging
 import os
 import sys
+import threading
 
 from pulp.plugins.conduits.upload import UploadConduit
 from pulp.plugins.config import PluginCallConfiguration
@@ -31,6 +34,20 @@ import pulp.server.managers.repo._common as repo_common_utils
 
 logger = logging.getLogger(__name__)
 
+# size of the buffers in which uploaded data is streamed to disk
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+
+# checksums calculated while the chunks of an upload are received
+UPLOAD_CHECKSUM_TYPES = ('md5', 'sha1', 'sha256')
+
+# suffix of the file storing the checksums of an upload next to the uploaded file
+CHECKSUMS_SUFFIX = '.checksums'
+
+# running checksums of the uploads written by this process, keyed by upload ID; each value
+# is a tuple of the offset the next sequential chunk starts at and a dict of hash objects
+_running_checksums_by_upload = {}
+_running_checksums_by_upload_lock = threading.Lock()
+
 
 class ContentUploadManager(object):
     def initialize_upload(self):
@@ -68,6 +85,15 @@ class ContentUploadManager(object):
         to retrieve the upload_id value and perform any steps necessary before
         bits can be saved.
 
+        The data may be a file-like object, such as the request body, in which
+        case it is streamed to disk in buffers of UPLOAD_BUFFER_SIZE bytes rather
+        than read into memory at once.
+
+        While the chunks of an upload arrive in sequence, starting at offset 0,
+        running checksums of the uploaded file are kept up to date so that they
+        can be handed to the importer without reading the file again. A chunk
+        written out of sequence discards them.
+
         @param upload_id: upload request ID
         @type  upload_id: str
 
@@ -75,7 +101,7 @@ class ContentUploadManager(object):
         @type  offset: int
 
         @param data: content to write to the file
-        @type  data: str
+        @type  data: str or file-like object
         """
 
         file_path = ContentUploadManager._upload_file_path(upload_id)
@@ -84,10 +110,50 @@ class ContentUploadManager(object):
         if not os.path.exists(file_path):
             raise MissingResource(upload_request=upload_id)
 
+        hashers = ContentUploadManager._running_checksums(upload_id, offset)
+
+        written = 0
         f = open(file_path, 'r+')
-        f.seek(offset)
-        f.write(data)
-        f.close()
+        try:
+            f.seek(offset)
+            for buf in ContentUploadManager._buffers(data):
+                f.write(buf)
+                for hasher in hashers.values():
+                    hasher.update(buf)
+                written += len(buf)
+        finally:
+            f.close()
+
+        if hashers:
+            ContentUploadManager._save_running_checksums(upload_id, offset + written, hashers)
+
+    def get_upload_checksums(self, upload_id):
+        """
+        Returns the checksums calculated while the bits of the given upload
+        were saved. Checksums are only available when every chunk of the upload
+        was saved in sequence by the same process.
+
+        @param upload_id: upload request ID
+        @type  upload_id: str
+
+        @return: hex digests keyed by checksum type, empty if none are available
+        @rtype:  dict
+        """
+        file_path = ContentUploadManager._upload_file_path(upload_id)
+        try:
+            f = open(file_path + CHECKSUMS_SUFFIX)
+            try:
+                checksums = json.load(f)
+            finally:
+                f.close()
+            size = os.path.getsize(file_path)
+        except (IOError, OSError, ValueError):
+            return {}
+
+        # the file may have been extended or rewritten by another process since
+        if checksums.pop('size', None) != size:
+            return {}
+        return checksums
 
     def delete_upload(self, upload_id):
         """
@@ -104,6 +170,7 @@ class ContentUploadManager(object):
         file_path = ContentUploadManager._upload_file_path(upload_id)
         if os.path.exists(file_path):
             os.remove(file_path)
+            ContentUploadManager._discard_running_checksums(upload_id)
         else:
             raise MissingResource(upload_id=upload_id)
 
@@ -139,7 +206,8 @@ class ContentUploadManager(object):
         @rtype:  list
         """
         upload_dir = ContentUploadManager._upload_storage_dir()
-        upload_ids = os.listdir(upload_dir)
+        upload_ids = [name for name in os.listdir(upload_dir)
+                      if not name.endswith(CHECKSUMS_SUFFIX)]
         return upload_ids
 
     @staticmethod
@@ -212,8 +280,10 @@ class ContentUploadManager(object):
             raise MissingResource(repo_id), None, sys.exc_info()[2]
 
         # Assemble the data needed for the import
+        upload_checksums = ContentUploadManager().get_upload_checksums(upload_id)
         conduit = UploadConduit(repo_id, repo_importer['id'], RepoContentUnit.OWNER_TYPE_USER,
-                                manager_factory.principal_manager().get_principal()['login'])
+                                manager_factory.principal_manager().get_principal()['login'],
+                                upload_checksums=upload_checksums)
 
         call_config = PluginCallConfiguration(plugin_config, repo_importer['config'],
                                               override_config)
@@ -238,6 +308,90 @@ class ContentUploadManager(object):
 
         # TODO: Add support for tracking the report as a history entry on the repo
 
+    @staticmethod
+    def _buffers(data):
+        """
+        Yields the given data in buffers of at most UPLOAD_BUFFER_SIZE bytes.
+
+        :param data: content to split into buffers
+        :type  data: str or file-like object
+        :return:     generator of str
+        :rtype:      generator
+        """
+        if not hasattr(data, 'read'):
+            if data:
+                yield data
+            return
+        while True:
+            buf = data.read(UPLOAD_BUFFER_SIZE)
+            if not buf:
+                return
+            yield buf
+
+    @staticmethod
+    def _running_checksums(upload_id, offset):
+        """
+        Returns the hash objects to update with a chunk of the given upload
+        that starts at the given offset. A chunk at offset 0 starts new
+        checksums, while a chunk that does not continue where the previous one
+        ended discards them.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        :param offset:    offset the chunk starts at
+        :type  offset:    int
+        :return:          hash objects keyed by checksum type, empty if the
+                          checksums are not being calculated
+        :rtype:           dict
+        """
+        with _running_checksums_by_upload_lock:
+            if offset == 0:
+                return dict((t, hashlib.new(t)) for t in UPLOAD_CHECKSUM_TYPES)
+            next_offset, hashers = _running_checksums_by_upload.pop(upload_id, (None, {}))
+        if next_offset == offset:
+            return hashers
+        ContentUploadManager._discard_running_checksums(upload_id)
+        return {}
+
+    @staticmethod
+    def _save_running_checksums(upload_id, next_offset, hashers):
+        """
+        Remembers the running checksums of the given upload for its next chunk
+        and writes their current digests next to the uploaded file, where
+        get_upload_checksums can find them from any process.
+
+        :param upload_id:   identifies the upload in question
+        :type  upload_id:   str
+        :param next_offset: offset the next sequential chunk starts at
+        :type  next_offset: int
+        :param hashers:     hash objects keyed by checksum type
+        :type  hashers:     dict
+        """
+        with _running_checksums_by_upload_lock:
+            _running_checksums_by_upload[upload_id] = (next_offset, hashers)
+        checksums = dict((t, h.hexdigest()) for t, h in hashers.items())
+        checksums['size'] = next_offset
+        file_path = ContentUploadManager._upload_file_path(upload_id)
+        f = open(file_path + CHECKSUMS_SUFFIX, 'w')
+        try:
+            json.dump(checksums, f)
+        finally:
+            f.close()
+
+    @staticmethod
+    def _discard_running_checksums(upload_id):
+        """
+        Forgets the running checksums of the given upload.
+
+        :param upload_id: identifies the upload in question
+        :type  upload_id: str
+        """
+        with _running_checksums_by_upload_lock:
+            _running_checksums_by_upload.pop(upload_id, None)
+        checksums_path = ContentUploadManager._upload_file_path(upload_id) + CHECKSUMS_SUFFIX
+        if os.path.exists(checksums_path):
+            os.remove(checksums_path)
+
     @staticmethod
     def _upload_file_path(upload_id):
         """
@@ -5,6 +5,7 @@ or distributor configuration.
 """
 
 from gettext import gettext as _
+from multiprocessing.pool import ThreadPool
 import logging
 import re
 import sys
@@ -29,6 +30,9 @@ _DISTRIBUTOR_ID_REGEX = _REPO_ID_REGEX  # for now, use the same constraints
 
 _logger = logging.getLogger(__name__)
 
+# number of repositories whose content unit counts are rebuilt with a single aggregation
+REBUILD_COUNTS_CHUNK_SIZE = 500
+
 
 class RepoManager(object):
     """
@@ -523,40 +527,74 @@ class RepoManager(object):
             raise MissingResource(repo_id=repo_id)
 
     @staticmethod
-    def rebuild_content_unit_counts(repo_ids=None):
+    def rebuild_content_unit_counts(repo_ids=None, chunk_size=REBUILD_COUNTS_CHUNK_SIZE,
+                                    concurrency=1):
         """
-        WARNING: This might take a long time, and it should not be used unless
-        absolutely necessary. Not responsible for melted servers.
-
         This will iterate through the given repositories, which defaults to ALL
         repositories, and recalculate the content unit counts for each content
         type.
 
+        The repositories are processed in chunks of chunk_size. The counts for
+        all repositories and content types of a chunk are computed with a single
+        aggregation over the repo_content_units collection, so the cost no longer
+        grows with the number of content types in each repository. When
+        concurrency is greater than 1, that many chunks are processed at once.
+
         This method is called from platform migration 0004, so consult that
         migration before changing this method.
 
         :param repo_ids:    list of repository IDs. DEFAULTS TO ALL REPO IDs!!!
         :type  repo_ids:    list
+        :param chunk_size:  number of repositories to count with each aggregation
+        :type  chunk_size:  int
+        :param concurrency: number of chunks to process at the same time
+        :type  concurrency: int
         """
-        association_collection = RepoContentUnit.get_collection()
-        repo_collection = Repo.get_collection()
-
         # default to all repos if none were specified
         if not repo_ids:
-            repo_ids = [repo['id'] for repo in repo_collection.find(fields=['id'])]
+            repo_ids = [repo['id'] for repo in Repo.get_collection().find(fields=['id'])]
+        repo_ids = list(repo_ids)
 
         _logger.info('regenerating content unit counts for %d repositories' % len(repo_ids))
 
+        chunks = [repo_ids[i:i + chunk_size] for i in xrange(0, len(repo_ids), chunk_size)]
+        if concurrency > 1 and len(chunks) > 1:
+            pool = ThreadPool(min(concurrency, len(chunks)))
+            try:
+                pool.map(RepoManager._rebuild_content_unit_counts_chunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for chunk in chunks:
+                RepoManager._rebuild_content_unit_counts_chunk(chunk)
+
+    @staticmethod
+    def _rebuild_content_unit_counts_chunk(repo_ids):
+        """
+        Recalculate the content unit counts of the given repositories using a
+        single aggregation grouped by repository and content type.
+
+        :param repo_ids:    list of repository IDs
+        :type  repo_ids:    list
+        """
+        _logger.debug('regenerating content unit counts for repositories %s' % repo_ids)
+        association_collection = RepoContentUnit.get_collection()
+        repo_collection = Repo.get_collection()
+
+        pipeline = [
+            {'$match': {'repo_id': {'$in': repo_ids}}},
+            {'$group': {'_id': {'repo_id': '$repo_id', 'unit_type_id': '$unit_type_id'},
+                        'count': {'$sum': 1}}},
+        ]
+        counts = dict((repo_id, {}) for repo_id in repo_ids)
+        for result in association_collection.aggregate(pipeline)['result']:
+            group = result['_id']
+            counts[group['repo_id']][group['unit_type_id']] = result['count']
+
         for repo_id in repo_ids:
-            _logger.debug('regenerating content unit count for repository "%s"' % repo_id)
-            counts = {}
-            cursor = association_collection.find({'repo_id': repo_id})
-            type_ids = cursor.distinct('unit_type_id')
-            cursor.close()
-            for type_id in type_ids:
-                spec = {'repo_id': repo_id, 'unit_type_id': type_id}
-                counts[type_id] = association_collection.find(spec).count()
-            repo_collection.update({'id': repo_id}, {'$set': {'content_unit_counts': counts}},
+            repo_collection.update({'id': repo_id},
+                                   {'$set': {'content_unit_counts': counts[repo_id]}},
                                    safe=True)
 
 
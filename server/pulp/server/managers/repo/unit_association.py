@@ -3,6 +3,7 @@ Contains the manager class and exceptions for handling the mappings between
 repositories and content units.
 """
 from gettext import gettext as _
+import copy
 import logging
 import sys
 
@@ -12,6 +13,7 @@ import pymongo
 from pulp.plugins.conduits.unit_import import ImportUnitConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.loader import api as plugin_api
+from pulp.plugins.util.misc import paginate
 from pulp.server.async.tasks import Task
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
@@ -43,6 +45,9 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# number of units whose associations are created with a single batch insert
+ASSOCIATE_BATCH_SIZE = 1000
+
 logger = logging.getLogger(__name__)
 
 
@@ -123,11 +128,14 @@ class RepoUnitAssociationManager(object):
             # update the record for the last added field
             manager.update_last_unit_added(repo_id)
 
-    def associate_all_by_ids(self, repo_id, unit_type_id, unit_id_list, owner_type, owner_id):
+    def associate_all_by_ids(self, repo_id, unit_type_id, unit_id_list, owner_type, owner_id,
+                             update_repo_metadata=True):
         """
         Creates multiple associations between the given repo and content units.
 
-        See associate_unit_by_id for semantics.
+        See associate_unit_by_id for semantics. The existing associations are
+        looked up and the new ones inserted in batches of ASSOCIATE_BATCH_SIZE
+        units, rather than one unit at a time.
 
         @param repo_id: identifies the repo
         @type  repo_id: str
@@ -146,24 +154,54 @@ class RepoUnitAssociationManager(object):
                          the importer ID or user login
         @type  owner_id: str
 
+        @param update_repo_metadata: if True, updates the unit association count
+                                     and the last unit added field of the repo.
+                                     Set this to False when the caller combines
+                                     several calls into one update.
+        @type  update_repo_metadata: bool
+
         :return:    number of new units added to the repo
         :rtype:     int
 
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
+        if owner_type not in _OWNER_TYPES:
+            raise exceptions.InvalidValue(['owner_type'])
 
-        # There may be a way to batch this in mongo which would be ideal for a
-        # bulk operation like this. But for deadline purposes, this call will
-        # simply loop and call the single method.
-
+        collection = RepoContentUnit.get_collection()
         unique_count = 0
-        for unit_id in unit_id_list:
-            if not RepoUnitAssociationManager.association_exists(repo_id, unit_id, unit_type_id):
-                unique_count += 1
-            self.associate_unit_by_id(repo_id, unit_type_id, unit_id, owner_type, owner_id, False)
+        for page in paginate(unit_id_list, ASSOCIATE_BATCH_SIZE):
+            spec = {'repo_id': repo_id,
+                    'unit_type_id': unit_type_id,
+                    'unit_id': {'$in': list(page)}}
+            associated_ids = set(association['unit_id'] for association in
+                                 collection.find(spec, fields=['unit_id']))
+
+            associations = []
+            for unit_id in page:
+                if unit_id in associated_ids:
+                    continue
+                # also skips duplicates within the page
+                associated_ids.add(unit_id)
+                associations.append(
+                    RepoContentUnit(repo_id, unit_id, unit_type_id, owner_type, owner_id))
+            if not associations:
+                continue
+
+            try:
+                collection.insert(associations, safe=True, continue_on_error=True)
+            except pymongo.errors.DuplicateKeyError:
+                # another workflow created some of the same associations concurrently, so only
+                # count the documents from this batch that were actually inserted
+                logger.debug(_('some associations already existed in repository [%(r)s]') %
+                             {'r': repo_id})
+                inserted_ids = [association['_id'] for association in associations]
+                unique_count += collection.find({'_id': {'$in': inserted_ids}}).count()
+            else:
+                unique_count += len(associations)
 
         # update the count of associated units on the repo object
-        if unique_count:
+        if unique_count and update_repo_metadata:
             manager_factory.repo_manager().update_unit_count(
                 repo_id, unit_type_id, unique_count)
             # update the timestamp for when the units were added to the repo
@@ -191,6 +229,17 @@ class RepoUnitAssociationManager(object):
         If criteria is None, the effect of this call is to copy the source
         repository's associations into the destination repository.
 
+        Importers can change how the units reach them with optional keys in
+        their metadata:
+
+        * streaming_import_units - if True, the units matched by a criteria
+          are passed to import_units as a generator that converts each unit as
+          it is consumed, instead of a list holding all of them.
+        * bulk_copy - if True, importing units is equivalent to associating
+          them with the destination repository. When every unit is copied (no
+          criteria and no config override), the associations are then copied
+          directly in the database without calling import_units.
+
         :param source_repo_id:         identifies the source repository
         :type  source_repo_id:         str
         :param dest_repo_id:           identifies the destination repository
@@ -220,31 +269,53 @@ class RepoUnitAssociationManager(object):
 
         # The docs are incorrect on the list_importer_types call; it actually
         # returns a dict with the types under key "types" for some reason.
-        supported_type_ids = plugin_api.list_importer_types(
-            dest_repo_importer['importer_type_id'])['types']
+        importer_metadata = plugin_api.list_importer_types(dest_repo_importer['importer_type_id'])
+        supported_type_ids = importer_metadata['types']
+        streaming = importer_metadata.get('streaming_import_units', False)
 
         # If criteria is specified, retrieve the list of units now
         associate_us = None
+        associated_unit_type_ids = None
         if criteria is not None:
-            associate_us = load_associated_units(source_repo_id, criteria)
+            if streaming:
+                # Only the IDs are loaded to find the types of the matching units
+                associated_unit_type_ids = calculate_matching_type_ids(source_repo_id, criteria)
+                no_units = len(associated_unit_type_ids) == 0
+            else:
+                associate_us = load_associated_units(source_repo_id, criteria)
+                no_units = len(associate_us) == 0
 
             # If units were supposed to be filtered but none matched, we're done
-            if len(associate_us) == 0:
+            if no_units:
                 # Return an empty list to indicate nothing was copied
                 return {'units_successful': []}
 
         # Now we can make sure the destination repository's importer is capable
         # of importing either the selected units or all of the units
-        associated_unit_type_ids = calculate_associated_type_ids(source_repo_id, associate_us)
+        if associated_unit_type_ids is None:
+            associated_unit_type_ids = calculate_associated_type_ids(source_repo_id, associate_us)
         unsupported_types = [t for t in associated_unit_type_ids if t not in supported_type_ids]
 
         if len(unsupported_types) > 0:
             raise exceptions.InvalidValue(['types'])
 
+        login = manager_factory.principal_manager().get_principal()['login']
+
+        # Copying everything into a repository whose importer would only
+        # associate the units can be done without involving the importer
+        if criteria is None and not import_config_override and \
+                importer_metadata.get('bulk_copy', False):
+            unit_ids = RepoUnitAssociationManager._bulk_copy(
+                source_repo_id, dest_repo_id, associated_unit_type_ids, login)
+            return {'units_successful': unit_ids}
+
         # Convert all of the units into the plugin standard representation if
         # a filter was specified
         transfer_units = None
-        if associate_us is not None:
+        if criteria is not None and streaming:
+            associated_units = load_associated_units(source_repo_id, criteria, as_generator=True)
+            transfer_units = generate_transfer_units(associated_units, associated_unit_type_ids)
+        elif associate_us is not None:
             transfer_units = create_transfer_units(associate_us, associated_unit_type_ids)
 
         # Convert the two repos into the plugin API model
@@ -258,7 +329,6 @@ class RepoUnitAssociationManager(object):
 
         call_config = PluginCallConfiguration(plugin_config, dest_repo_importer['config'],
                                               import_config_override)
-        login = manager_factory.principal_manager().get_principal()['login']
         conduit = ImportUnitConduit(
             source_repo_id, dest_repo_id, source_repo_importer['id'], dest_repo_importer['id'],
             RepoContentUnit.OWNER_TYPE_USER, login)
@@ -276,6 +346,59 @@ class RepoUnitAssociationManager(object):
             logger.exception(msg)
             raise exceptions.PulpExecutionException(), None, sys.exc_info()[2]
 
+    @staticmethod
+    def _bulk_copy(source_repo_id, dest_repo_id, unit_type_ids, login):
+        """
+        Associate every unit of the source repository with the destination
+        repository by copying the associations in batches, without loading
+        the units themselves.
+
+        :param source_repo_id: identifies the source repository
+        :type  source_repo_id: str
+        :param dest_repo_id:   identifies the destination repository
+        :type  dest_repo_id:   str
+        :param unit_type_ids:  types of the units in the source repository
+        :type  unit_type_ids:  iterable
+        :param login:          login of the user making the associations
+        :type  login:          str
+        :return:               type ID and unit key of each copied unit
+        :rtype:                list of dict
+        """
+        association_manager = manager_factory.repo_unit_association_manager()
+        repo_manager = manager_factory.repo_manager()
+        collection = RepoContentUnit.get_collection()
+
+        unit_ids = []
+        added = False
+        for unit_type_id in sorted(unit_type_ids):
+            spec = {'repo_id': source_repo_id, 'unit_type_id': unit_type_id}
+            source_unit_ids = (association['unit_id'] for association in
+                               collection.find(spec, fields=['unit_id']))
+            count = association_manager.associate_all_by_ids(
+                dest_repo_id, unit_type_id, source_unit_ids, OWNER_TYPE_USER, login,
+                update_repo_metadata=False)
+            if count:
+                repo_manager.update_unit_count(dest_repo_id, unit_type_id, count)
+                added = True
+
+            # Report the copied units the way an importer would, reading only their keys
+            unit_key_fields = types_db.type_units_unit_key(unit_type_id) or []
+            units_collection = types_db.type_units_collection(unit_type_id)
+            reported_ids = set()
+            associations = collection.find(spec, fields=['unit_id'])
+            for page in paginate(associations, ASSOCIATE_BATCH_SIZE):
+                # a unit may be associated more than once, by different owners
+                page_ids = set(association['unit_id'] for association in page) - reported_ids
+                reported_ids.update(page_ids)
+                for unit in units_collection.find({'_id': {'$in': list(page_ids)}},
+                                                  fields=unit_key_fields):
+                    unit_key = dict((k, unit.get(k)) for k in unit_key_fields)
+                    unit_ids.append({'type_id': unit_type_id, 'unit_key': unit_key})
+
+        if added:
+            repo_manager.update_last_unit_added(dest_repo_id)
+        return unit_ids
+
     def unassociate_unit_by_id(self, repo_id, unit_type_id, unit_id, owner_type, owner_id,
                                notify_plugins=True):
         """
@@ -441,16 +564,35 @@ associate_from_repo = task(RepoUnitAssociationManager.associate_from_repo, base=
 unassociate_by_criteria = task(RepoUnitAssociationManager.unassociate_by_criteria, base=Task)
 
 
-def load_associated_units(source_repo_id, criteria):
+def load_associated_units(source_repo_id, criteria, as_generator=False):
     criteria.association_fields = None
 
     # Retrieve the units to be associated
     association_query_manager = manager_factory.repo_unit_association_query_manager()
-    associate_us = association_query_manager.get_units(source_repo_id, criteria=criteria)
+    associate_us = association_query_manager.get_units(source_repo_id, criteria=criteria,
+                                                       as_generator=as_generator)
 
     return associate_us
 
 
+def calculate_matching_type_ids(source_repo_id, criteria):
+    """
+    Determine the types of the units in the source repository that match the
+    criteria, loading only the IDs of the units.
+
+    :param source_repo_id: identifies the source repository
+    :type  source_repo_id: str
+    :param criteria:       criteria selecting the units
+    :type  criteria:       UnitAssociationCriteria
+    :return:               type IDs of the matching units
+    :rtype:                set
+    """
+    id_criteria = copy.copy(criteria)
+    id_criteria.unit_fields = ['_id']
+    associated_units = load_associated_units(source_repo_id, id_criteria, as_generator=True)
+    return set(u['unit_type_id'] for u in associated_units)
+
+
 def calculate_associated_type_ids(source_repo_id, associated_units):
     if associated_units is not None:
         associated_unit_type_ids = set([u['unit_type_id'] for u in associated_units])
@@ -461,18 +603,29 @@ def calculate_associated_type_ids(source_repo_id, associated_units):
 
 
 def create_transfer_units(associate_units, associated_unit_type_ids):
+    return list(generate_transfer_units(associate_units, associated_unit_type_ids))
+
+
+def generate_transfer_units(associate_units, associated_unit_type_ids):
+    """
+    Convert units into the plugin standard representation one at a time, as
+    they are consumed.
+
+    :param associate_units:          units to convert
+    :type  associate_units:          iterable of dict
+    :param associated_unit_type_ids: types of the units
+    :type  associated_unit_type_ids: iterable of str
+    :return:                         generator of units in the plugin representation
+    :rtype:                          generator of pulp.plugins.model.AssociatedUnit
+    """
     type_defs = {}
     for def_id in associated_unit_type_ids:
         type_def = types_db.type_definition(def_id)
         type_defs[def_id] = type_def
 
-    transfer_units = []
     for unit in associate_units:
         type_id = unit['unit_type_id']
-        u = conduit_common_utils.to_plugin_associated_unit(unit, type_defs[type_id])
-        transfer_units.append(u)
-
-    return transfer_units
+        yield conduit_common_utils.to_plugin_associated_unit(unit, type_defs[type_id])
 
 
 def remove_from_importer(repo_id, transfer_units):
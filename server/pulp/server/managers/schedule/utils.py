@@ -69,6 +69,17 @@ def get_enabled():
     return ScheduledCall.get_collection().query(criteria)
 
 
+def get_enabled_ids():
+    """
+    Get the IDs of schedules that are enabled, that is, their "enabled" attribute is True
+
+    :return:    list of schedule IDs
+    :rtype:     list of basestring
+    """
+    cursor = ScheduledCall.get_collection().find({'enabled': True}, fields=['_id'])
+    return [str(call['_id']) for call in cursor]
+
+
 def get_updated_since(seconds):
     """
     Get schedules that are enabled, that is, their "enabled" attribute is True,
@@ -7,6 +7,8 @@ from pkg_resources import get_distribution
 from pulp.server.async.celery_instance import celery
 from pulp.server.db import connection
 from pulp.server.db.model.workers import Worker
+from pulp.server.event import http as http_notifier
+from pulp.server.managers.auth.permission import cache as permission_cache
 
 
 def get_version():
@@ -25,6 +27,22 @@ def get_workers():
     return Worker.objects()
 
 
+def get_permission_cache_stats():
+    """
+    :returns:          size and hit and miss counters of this process's permission cache
+    :rtype:            dict
+    """
+    return permission_cache.get_cache().stats()
+
+
+def get_http_notifier_stats():
+    """
+    :returns:          delivery and failure counters of this process's HTTP notifier
+    :rtype:            dict
+    """
+    return http_notifier.stats()
+
+
 def get_mongo_conn_status():
     """
     Perform a simple mongo operation and return success or failure.
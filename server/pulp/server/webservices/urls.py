@@ -209,7 +209,10 @@ urlpatterns = patterns('',
     url(r'^v2/status/$', StatusView.as_view(), name='status'),
     url(r'^v2/tasks/$', tasks.TaskCollectionView.as_view(), name='task_collection'),
     url(r'^v2/tasks/search/$', tasks.TaskSearchView.as_view(), name='task_search'),
+    url(r'^v2/tasks/wait/$', tasks.TaskWaitView.as_view(), name='task_wait'),
     url(r'^v2/tasks/(?P<task_id>[^/]+)/$', tasks.TaskResourceView.as_view(), name='task_resource'),
+    url(r'^v2/tasks/(?P<task_id>[^/]+)/wait/$', tasks.TaskResourceWaitView.as_view(),
+        name='task_resource_wait'),
     url(r'^v2/users/$', users.UsersView.as_view(), name='users'),
     url(r'^v2/users/search/$', users.UserSearchView.as_view(),
         name='user_search'),
@@ -39,6 +39,8 @@ class StatusView(View):
                        'versions': pulp_version,
                        'database_connection': pulp_db_connection,
                        'messaging_connection': pulp_messaging_connection,
-                       'known_workers': pulp_workers}
+                       'known_workers': pulp_workers,
+                       'permission_cache': status_manager.get_permission_cache_stats(),
+                       'http_notifier': status_manager.get_http_notifier_stats()}
 
         return generate_json_response_with_pulp_encoder(status_data)
@@ -2,20 +2,32 @@
 This module contains views related to Pulp's task system models.
 """
 from datetime import datetime
+import hashlib
+import time
 
 from django.views.generic import View
 from mongoengine.queryset import DoesNotExist
 
 from pulp.server.async import tasks
 from pulp.server.auth import authorization
+from pulp.server.compat import json, json_util
 from pulp.server.db.model import dispatch
 from pulp.server.db.model.workers import Worker
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.webservices import serialization
 from pulp.server.webservices.controllers.decorators import auth_required
 from pulp.server.webservices.views import search
 from pulp.server.webservices.views.util import (generate_json_response,
-                                                generate_json_response_with_pulp_encoder)
+                                                generate_json_response_with_pulp_encoder,
+                                                json_body_required)
+
+
+# seconds a wait request blocks when the caller does not specify a timeout
+WAIT_TIMEOUT = 30
+# longest a wait request may block, so that waiting callers do not tie up the web server
+MAX_WAIT_TIMEOUT = 60
+# seconds between reads of the waited on tasks
+WAIT_INTERVAL = 0.5
 
 
 def task_serializer(task):
@@ -34,6 +46,90 @@ def task_serializer(task):
     return task
 
 
+def state_hash(task):
+    """
+    Return a hash of the state and progress report of a task. Callers waiting on a task pass
+    back the hash they last received so the wait returns as soon as either one changes.
+
+    :param task: The task from the database
+    :type  task: pulp.server.db.model.dispatch.TaskStatus
+
+    :return: hex digest of the state and progress report
+    :rtype:  str
+    """
+    content = json.dumps([task['state'], task['progress_report']], sort_keys=True,
+                         default=json_util.default)
+    return hashlib.sha1(content).hexdigest()
+
+
+def wait_for_tasks(state_hashes, timeout):
+    """
+    Block until the state hash of one of the given tasks differs from the hash given for it, or
+    the timeout passes. The tasks are read from the database every WAIT_INTERVAL seconds.
+
+    :param state_hashes: the hash last seen by the caller keyed by task ID; None for a task the
+                         caller has not seen yet, which does not block
+    :type  state_hashes: dict
+    :param timeout:      maximum number of seconds to block
+    :type  timeout:      float
+
+    :return: the tasks as of when the wait ended
+    :rtype:  list of pulp.server.db.model.dispatch.TaskStatus
+    :raises MissingResource: if one of the tasks is not found
+    """
+    deadline = time.time() + timeout
+    task_ids = list(state_hashes)
+    while True:
+        found = list(dispatch.TaskStatus.objects(task_id__in=task_ids))
+        if len(found) < len(task_ids):
+            found_ids = set(task['task_id'] for task in found)
+            raise MissingResource(task_ids=[t for t in task_ids if t not in found_ids])
+        for task in found:
+            if state_hash(task) != state_hashes[task['task_id']]:
+                return found
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return found
+        time.sleep(min(WAIT_INTERVAL, remaining))
+
+
+def _wait_timeout(value):
+    """
+    Parse the timeout of a wait request.
+
+    :param value: number of seconds given by the caller, or None to use WAIT_TIMEOUT
+    :type  value: str, float or None
+
+    :return: number of seconds to wait, at most MAX_WAIT_TIMEOUT
+    :rtype:  float
+    :raises InvalidValue: if the value is not a non-negative number
+    """
+    if value is None:
+        return WAIT_TIMEOUT
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        raise InvalidValue(['timeout'])
+    if timeout < 0:
+        raise InvalidValue(['timeout'])
+    return min(timeout, MAX_WAIT_TIMEOUT)
+
+
+def _wait_serializer(task):
+    """
+    Serialize a task returned by a wait request, which includes its state hash.
+
+    :param task: The task from the database
+    :type  task: pulp.server.db.model.dispatch.TaskStatus
+
+    :return: the serialized task
+    :rtype:  dict
+    """
+    task_dict = task_serializer(task)
+    task_dict['state_hash'] = state_hash(task)
+    return task_dict
+
+
 class TaskSearchView(search.SearchView):
     """
     This view provides GET and POST searching on TaskStatus objects.
@@ -114,3 +210,68 @@ class TaskResourceView(View):
         """
         tasks.cancel(task_id)
         return generate_json_response(None)
+
+
+class TaskWaitView(View):
+    """
+    View for waiting on changes to any of several tasks.
+    """
+
+    @auth_required(authorization.READ)
+    @json_body_required
+    def post(self, request):
+        """
+        Block until the state or progress of one of the given tasks changes, or the timeout
+        passes, and return all of the given tasks.
+
+        The body contains "tasks", an object mapping each task ID to the state hash last
+        received for it (or null), and an optional "timeout" in seconds.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+
+        :return: Response containing a list of serialized tasks, including their state hashes
+        :rtype:  django.http.HttpResponse
+        :raises InvalidValue: if the tasks or timeout are not valid
+        :raises MissingResource: if one of the tasks is not found
+        """
+        state_hashes = request.body_as_json.get('tasks')
+        if not state_hashes or not isinstance(state_hashes, dict):
+            raise InvalidValue(['tasks'])
+        timeout = _wait_timeout(request.body_as_json.get('timeout'))
+        waited = wait_for_tasks(state_hashes, timeout)
+        return generate_json_response_with_pulp_encoder([_wait_serializer(t) for t in waited])
+
+
+class TaskResourceWaitView(View):
+    """
+    View for waiting on changes to a single task.
+    """
+
+    @auth_required(authorization.READ)
+    def get(self, request, task_id):
+        """
+        Block until the state or progress of the task changes, or the timeout passes, and
+        return the task. The optional "state_hash" parameter is the hash last received for the
+        task, and "timeout" is the maximum number of seconds to block.
+
+        :param request: WSGI request object
+        :type  request: django.core.handlers.wsgi.WSGIRequest
+        :param task_id: The ID of the task to wait on
+        :type  task_id: basestring
+
+        :return: Response containing a serialized dict of the task, including its state hash
+        :rtype:  django.http.HttpResponse
+        :raises InvalidValue: if the timeout is not valid
+        :raises MissingResource: if the task is not found
+        """
+        timeout = _wait_timeout(request.GET.get('timeout'))
+        try:
+            task = wait_for_tasks({task_id: request.GET.get('state_hash')}, timeout)[0]
+        except MissingResource:
+            raise MissingResource(task_id)
+        task_dict = _wait_serializer(task)
+        if 'worker_name' in task_dict:
+            queue_name = Worker(task_dict['worker_name'], datetime.now()).queue_name
+            task_dict.update({'queue': queue_name})
+        return generate_json_response_with_pulp_encoder(task_dict)
@@ -29,6 +29,7 @@ from pulp.server.db.model.workers import Worker
 from pulp.server.logs import start_logging, stop_logging
 from pulp.server.managers import factory as manager_factory
 from pulp.server.managers.auth.cert.cert_generator import SerialNumber
+from pulp.server.managers.auth.permission import cache as permission_cache
 from pulp.server.managers.auth.role.cud import SUPER_USER_ROLE
 from pulp.server.webservices import http
 from pulp.server.webservices.middleware.exception import ExceptionHandlerMiddleware
@@ -74,6 +75,8 @@ class PulpServerTests(unittest.TestCase):
         super(PulpServerTests, self).setUp()
         self._mocks = {}
         self.config = PulpServerTests.CONFIG # shadow for simplicity
+        # tests modify the auth collections directly, so never reuse resolved permissions
+        permission_cache.invalidate()
         self.clean()
 
     def tearDown(self):
@@ -1,5 +1,7 @@
 from uuid import uuid4
 
+from mock import patch
+
 from ...base import PulpServerTests
 from pulp.plugins.conduits.cataloger import CatalogerConduit
 from pulp.server.db.model.content import ContentCatalog
@@ -78,3 +80,61 @@ class TestCatalogerConduit(PulpServerTests):
         conduit.reset()
         self.assertEqual(conduit.added_count, 0)
         self.assertEqual(conduit.deleted_count, 0)
+
+    @patch('pulp.plugins.conduits.cataloger.BUFFER_SIZE', 4)
+    def test_add_buffered(self):
+        units = self.units(0, 10)
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
+        conduit.open_generation()
+        collection = ContentCatalog.get_collection()
+        for unit_key, url in units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        self.assertEqual(collection.find().count(), 8)
+        conduit.flush()
+        self.assertEqual(collection.find().count(), len(units))
+        self.assertEqual(conduit.added_count, len(units))
+        for entry in collection.find():
+            self.assertEqual(entry['generation'], conduit.generation)
+
+    def test_commit_generation(self):
+        old_units = self.units(0, 10)
+        new_units = self.units(5, 10)
+        other = CatalogerConduit('other', EXPIRES)
+        other.add_entry(TYPE_ID, *old_units[0])
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
+        for unit_key, url in old_units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        conduit.open_generation()
+        generation = conduit.generation
+        for unit_key, url in new_units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        purged = conduit.commit_generation()
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(purged, len(old_units))
+        self.assertTrue(conduit.generation is None)
+        entries = list(collection.find({'source_id': SOURCE_ID}))
+        self.assertEqual(len(entries), len(new_units))
+        for entry in entries:
+            self.assertEqual(entry['generation'], generation)
+        self.assertEqual(collection.find({'source_id': 'other'}).count(), 1)
+
+    def test_open_generation(self):
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
+        conduit.open_generation()
+        other = CatalogerConduit(SOURCE_ID, EXPIRES)
+        other.open_generation(conduit.generation)
+        self.assertTrue(conduit.generation is not None)
+        self.assertEqual(other.generation, conduit.generation)
+
+    def test_close_generation(self):
+        old_units = self.units(0, 10)
+        conduit = CatalogerConduit(SOURCE_ID, EXPIRES)
+        for unit_key, url in old_units:
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        conduit.open_generation()
+        for unit_key, url in self.units(10, 5):
+            conduit.add_entry(TYPE_ID, unit_key, url)
+        conduit.close_generation()
+        collection = ContentCatalog.get_collection()
+        self.assertTrue(conduit.generation is None)
+        self.assertEqual(collection.find().count(), 15)
@@ -724,6 +724,75 @@ class AddUnitMixinTests(unittest.TestCase):
         # Test
         self.assertRaises(mixins.ImporterConduitException, self.mixin.save_unit, None)
 
+    @mock.patch('pulp.plugins.types.database.type_units_unit_key', return_value=['k'])
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_multiple_units_by_keys_dicts')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.'
+                'associate_all_by_ids')
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_last_unit_added')
+    def test_save_units(self, mock_last_added, mock_unit_count, mock_associate, mock_add,
+                        mock_update, mock_get, mock_unit_key):
+        units = [Unit('t', {'k': str(i)}, {}, None) for i in range(3)]
+        mock_get.side_effect = lambda type_id, keys, model_fields: \
+            [{'_id': 'existing-1', 'k': '1'}] if {'k': '1'} in keys else []
+        mock_add.side_effect = lambda type_id, pulp_units: \
+            ['new-%s' % u['k'] for u in pulp_units]
+        mock_associate.return_value = 1
+
+        self.mixin.save_units(iter(units), batch_size=2)
+
+        self.assertEqual([u.id for u in units], ['new-0', 'existing-1', 'new-2'])
+        self.assertEqual(self.mixin._added_count, 2)
+        self.assertEqual(self.mixin._updated_count, 1)
+        self.assertEqual(mock_update.call_count, 1)
+        self.assertEqual(mock_add.call_count, 2)
+        mock_associate.assert_any_call(self.repo_id, 't', ['new-0', 'existing-1'],
+                                       self.association_owner_type,
+                                       self.association_owner_id, update_repo_metadata=False)
+        mock_associate.assert_any_call(self.repo_id, 't', ['new-2'],
+                                       self.association_owner_type,
+                                       self.association_owner_id, update_repo_metadata=False)
+        # a single combined count update
+        mock_unit_count.assert_called_once_with(self.repo_id, 't', 2)
+        mock_last_added.assert_called_once_with(self.repo_id)
+
+    @mock.patch('pulp.plugins.types.database.type_units_unit_key', return_value=['k'])
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.'
+                'get_multiple_units_by_keys_dicts', return_value=[])
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.'
+                'associate_all_by_ids', return_value=0)
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_save_units_race_condition(self, mock_unit_count, mock_associate, mock_add,
+                                       mock_update, mock_get_multiple, mock_get, mock_unit_key):
+        """
+        A unit added by another workflow after the lookup is updated instead.
+        """
+        unit = Unit('t', {'k': 'v'}, {}, None)
+        mock_add.return_value = [None]
+        mock_get.return_value = {'_id': 'existing'}
+
+        self.mixin.save_units([unit])
+
+        self.assertEqual(unit.id, 'existing')
+        self.assertEqual(self.mixin._added_count, 0)
+        self.assertEqual(self.mixin._updated_count, 1)
+        self.assertEqual(mock_update.call_count, 1)
+        self.assertFalse(mock_unit_count.called)
+
+    @mock.patch('pulp.plugins.types.database.type_units_unit_key')
+    def test_save_units_with_error(self, mock_unit_key):
+        mock_unit_key.side_effect = Exception()
+
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.save_units,
+                          [Unit('t', {'k': 'v'}, {}, None)])
+
     @mock.patch('pulp.server.managers.content.cud.ContentManager.link_referenced_content_units')
     def test_link_unit(self, mock_link):
         # Setup
@@ -803,6 +872,42 @@ class StatusMixinTests(unittest.TestCase):
         test_task_documents.update_one.assert_called_with(
             set__progress_report={'test-report': 'status'})
 
+    @mock.patch('pulp.server.db.model.dispatch.TaskStatus._get_collection')
+    @mock.patch('pulp.server.db.model.dispatch.TaskStatus.objects')
+    @mock.patch('pulp.plugins.conduits.mixins.get_current_task_id')
+    def test_set_progress_changes(self, mock_get_task_id, mock_task_status_objects,
+                                  mock_get_collection):
+        mock_get_task_id.return_value = 'test-id'
+        mixin = mixins.StatusMixin('test-report', mixins.ImporterConduitException)
+        status = [{'state': 'running', 'num_processed': 0, 'sub_steps': [{'num_processed': 0}]},
+                  {'state': 'not_started', 'num_processed': 0}]
+        mixin.set_progress(status)
+
+        # Test
+        status[0]['num_processed'] = 5
+        status[0]['sub_steps'][0]['num_processed'] = 5
+        mixin.set_progress(status)
+        mixin.set_progress(status)
+
+        # Verify
+        self.assertEqual(1, mock_task_status_objects.return_value.update_one.call_count)
+        collection = mock_get_collection.return_value
+        self.assertEqual(1, collection.update.call_count)
+        collection.update.assert_called_once_with(
+            {'task_id': 'test-id'},
+            {'$set': {'progress_report.test-report.0.num_processed': 5,
+                      'progress_report.test-report.0.sub_steps.0.num_processed': 5}})
+
+    def test_changed_fields(self):
+        self.assertEqual({}, mixins._changed_fields('p', {'a': [1]}, {'a': [1]}))
+        self.assertEqual({'p.a.1': 3}, mixins._changed_fields('p', {'a': [1, 2]}, {'a': [1, 3]}))
+        self.assertEqual({'p.b': 2}, mixins._changed_fields('p', {'a': 1}, {'a': 1, 'b': 2}))
+        # lists that changed length and dictionaries that lost keys are replaced whole
+        self.assertEqual({'p.a': [1, 2]}, mixins._changed_fields('p', {'a': [1]}, {'a': [1, 2]}))
+        self.assertEqual({'p': {'b': 1}}, mixins._changed_fields('p', {'a': 1}, {'b': 1}))
+        # keys that are not usable in a dotted path are replaced through their parent
+        self.assertEqual({'p': {'a.b': 2}}, mixins._changed_fields('p', {'a.b': 1}, {'a.b': 2}))
+
     @mock.patch('pulp.server.db.model.dispatch.TaskStatus.objects')
     @mock.patch('pulp.plugins.conduits.mixins.get_current_task_id')
     def test_set_progress_no_task(self, mock_get_task_id, mock_task_status_objects):
@@ -14,6 +14,7 @@ from pulp.devel.unit.server.util import assert_validation_exception
 from pulp.plugins.util.metadata_writer import MetadataFileContext, JSONArrayFileContext
 from pulp.plugins.util.metadata_writer import XmlFileContext
 from pulp.plugins.util.metadata_writer import FastForwardXmlFileContext
+from pulp.plugins.util.metadata_writer import ParallelGzipFile
 from pulp.plugins.util.verification import TYPE_SHA1
 
 
@@ -247,6 +248,45 @@ class MetadataWriterTests(unittest.TestCase):
                                                    expected_metadata_file_name)
         self.assertEquals(expected_metadata_file_path, context.metadata_file_path)
 
+    def test_finalize_checksum_gzip(self):
+        path = os.path.join(self.metadata_file_dir, 'test.xml.gz')
+        context = MetadataFileContext(path, checksum_type='sha256')
+
+        context.initialize()
+        context.metadata_file_handle.write('<metadata/>')
+        context.finalize()
+
+        with open(context.metadata_file_path, 'rb') as file_handle:
+            self.assertEquals(hashlib.sha256(file_handle.read()).hexdigest(), context.checksum)
+        self.assertEquals(gzip.open(context.metadata_file_path).read(), '<metadata/>')
+
+    @patch('pulp.plugins.util.metadata_writer.GZIP_BLOCK_SIZE', 100)
+    def test_finalize_parallel_gzip(self):
+        path = os.path.join(self.metadata_file_dir, 'test.xml.gz')
+        context = MetadataFileContext(path, checksum_type='sha1', gzip_threads=3)
+        content = ''.join('<unit id="%d"/>' % i for i in range(1000))
+
+        context.initialize()
+        self.assertTrue(isinstance(context.metadata_file_handle, ParallelGzipFile))
+        context.metadata_file_handle.write(content)
+        context.finalize()
+
+        with open(context.metadata_file_path, 'rb') as file_handle:
+            self.assertEquals(hashlib.sha1(file_handle.read()).hexdigest(), context.checksum)
+        self.assertEquals(gzip.open(context.metadata_file_path).read(), content)
+
+    def test_finalize_parallel_gzip_unicode_path(self):
+        path = os.path.join(unicode(self.metadata_file_dir), u'test-unicode.xml.gz')
+        context = MetadataFileContext(path, gzip_threads=2)
+
+        context.initialize()
+        context.metadata_file_handle.write('<units/>')
+        context.finalize()
+
+        with open(context.metadata_file_path, 'rb') as file_handle:
+            self.assertEquals(file_handle.read(27)[10:], 'test-unicode.xml\000')
+        self.assertEquals(gzip.open(context.metadata_file_path).read(), '<units/>')
+
     @patch('pulp.plugins.util.metadata_writer._LOG.exception')
     def test_finalize_error_on_footer(self, mock_logger):
 
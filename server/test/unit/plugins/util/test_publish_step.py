@@ -1,4 +1,5 @@
 import contextlib
+import errno
 import os
 import shutil
 import sys
@@ -19,7 +20,7 @@ from pulp.plugins.conduits.repo_sync import RepoSyncConduit
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.model import Repository, SyncReport, Unit
 from pulp.plugins.util.publish_step import Step, PublishStep, UnitPublishStep, PluginStep, \
-    AtomicDirectoryPublishStep, SaveTarFilePublishStep, _post_order, CopyDirectoryStep, \
+    AtomicDirectoryPublishStep, SaveTarFilePublishStep, CopyDirectoryStep, \
     PluginStepIterativeProcessingMixin, DownloadStep, GetLocalUnitsStep
 from pulp.server.managers import factory
 
@@ -64,27 +65,6 @@ class PluginBase(unittest.TestCase):
                                      config=self.config, plugin_type='test_plugin_type')
 
 
-class PostOrderTests(unittest.TestCase):
-
-    def test_ordered_output(self):
-        class Node:
-            def __init__(self, value):
-                self.value = value
-                self.children = []
-
-        n1 = Node(1)
-        n2 = Node(2)
-        n3 = Node(3)
-        n4 = Node(4)
-        n5 = Node(5)
-
-        n5.children = [n1, n4]
-        n4.children = [n2, n3]
-
-        value_list = [n.value for n in _post_order(n5)]
-        self.assertEquals(value_list, [1, 2, 3, 4, 5])
-
-
 class StepTests(PublisherBase):
 
     def test_add_child(self):
@@ -116,6 +96,96 @@ class StepTests(PublisherBase):
         step.parent.get_status_conduit.return_value = 'foo'
         self.assertEquals('foo', step.get_status_conduit())
 
+    def test_add_child_depends_on(self):
+        step = Step('foo')
+        step2 = Step('step2')
+        step3 = Step('step3')
+        step.add_child(step2)
+        step.add_child(step3, depends_on=[step2])
+        self.assertEquals(step3.dependencies, [step2])
+        self.assertEquals(step2.dependencies, [])
+
+    def test_add_child_depends_on_non_child(self):
+        step = Step('foo')
+        self.assertRaises(ValueError, step.add_child, Step('step2'), depends_on=[Step('step3')])
+
+    def test_process_children_concurrently(self):
+        step = Step('foo', status_conduit=Mock())
+        step.concurrency = 3
+        processed = []
+        children = [Step('step%d' % i) for i in range(4)]
+        for child in children:
+            child.process_main = Mock(side_effect=lambda c=child: processed.append(c))
+        step.add_child(children[0])
+        step.add_child(children[1])
+        step.add_child(children[2], depends_on=[children[0], children[1]])
+        step.add_child(children[3], depends_on=[children[2]])
+
+        step.process_lifecycle()
+
+        self.assertEquals(set(processed), set(children))
+        self.assertEquals(processed[2:], children[2:])
+        for child in children:
+            self.assertEquals(child.state, reporting_constants.STATE_COMPLETE)
+        self.assertEquals(step.state, reporting_constants.STATE_COMPLETE)
+
+    def test_process_children_concurrently_failure(self):
+        step = Step('foo', status_conduit=Mock())
+        step.concurrency = 2
+        step.on_error = Mock()
+        failing = Step('failing')
+        failing.process_main = Mock(side_effect=ValueError('boom'))
+        other = Step('other')
+        dependent = Step('dependent')
+        dependent.process_main = Mock()
+        step.add_child(failing)
+        step.add_child(other)
+        step.add_child(dependent, depends_on=[failing])
+
+        self.assertRaises(ValueError, step.process_lifecycle)
+
+        self.assertEquals(failing.state, reporting_constants.STATE_FAILED)
+        self.assertEquals(other.state, reporting_constants.STATE_COMPLETE)
+        self.assertEquals(dependent.state, reporting_constants.STATE_NOT_STARTED)
+        self.assertFalse(dependent.process_main.called)
+        self.assertEquals(step.state, reporting_constants.STATE_FAILED)
+        self.assertEquals(step.progress_failures, 1)
+        self.assertTrue(step.on_error.called)
+
+    @patch('pulp.plugins.util.publish_step.time.time')
+    def test_report_progress_interval(self, mock_time):
+        conduit = Mock()
+        step = Step('foo_step', status_conduit=conduit)
+        step.progress_interval = 2
+
+        mock_time.return_value = 100.0
+        step.report_progress()
+        mock_time.return_value = 101.5
+        step.report_progress()
+        step.report_progress()
+        mock_time.return_value = 102.0
+        step.report_progress()
+
+        self.assertEquals(2, conduit.set_progress.call_count)
+        self.assertEquals(2, step.progress_flushes)
+
+    @patch('pulp.plugins.util.publish_step.time.time')
+    def test_report_progress_state_change(self, mock_time):
+        mock_time.return_value = 100.0
+        conduit = Mock()
+        step = Step('foo_step', status_conduit=conduit)
+        child = Step('child_step')
+        step.add_child(child)
+        step.report_progress()
+
+        child.state = reporting_constants.STATE_RUNNING
+        child.report_progress()
+        child.report_progress()
+        step.report_progress(force=True)
+
+        self.assertEquals(3, conduit.set_progress.call_count)
+        self.assertEquals(3, step.progress_flushes)
+
 
 class PluginStepTests(PluginBase):
     """
@@ -827,6 +897,67 @@ class TestAtomicDirectoryPublishStep(unittest.TestCase):
         self.assertTrue(os.path.exists(existing_file))
         self.assertEquals(1, len(os.listdir(master_dir)))
 
+    def test_process_main_incremental(self):
+        source_dir = os.path.join(self.working_directory, 'source')
+        master_dir = os.path.join(self.working_directory, 'master')
+        publish_dir = os.path.join(self.working_directory, 'publish', 'bar')
+        unchanged_file = os.path.join(source_dir, 'foo', 'unchanged.html')
+        changed_file = os.path.join(source_dir, 'changed.html')
+        for path, content in ((unchanged_file, 'same'), (changed_file, 'old')):
+            touch(path)
+            with open(path, 'w') as file_handle:
+                file_handle.write(content)
+        os.symlink(unchanged_file, os.path.join(source_dir, 'link.html'))
+
+        step = AtomicDirectoryPublishStep(source_dir, [('/', publish_dir)], master_dir,
+                                          incremental=True)
+        step.parent = Mock(timestamp='1')
+        step.process_main()
+        self.assertEquals((0, 2), (step.files_reused, step.files_copied))
+
+        # rewrite both files, only one of them with new contents
+        for path, content in ((unchanged_file, 'same'), (changed_file, 'new contents')):
+            with open(path, 'w') as file_handle:
+                file_handle.write(content)
+        previous_inode = os.stat(os.path.join(master_dir, '1', 'foo', 'unchanged.html')).st_ino
+
+        step = AtomicDirectoryPublishStep(source_dir, [('/', publish_dir)], master_dir,
+                                          incremental=True)
+        step.parent = Mock(timestamp='2')
+        step.process_main()
+
+        self.assertEquals((1, 1), (step.files_reused, step.files_copied))
+        self.assertEquals(['2'], os.listdir(master_dir))
+        reused_file = os.path.join(publish_dir, 'foo', 'unchanged.html')
+        self.assertEquals(previous_inode, os.stat(reused_file).st_ino)
+        with open(os.path.join(publish_dir, 'changed.html')) as file_handle:
+            self.assertEquals('new contents', file_handle.read())
+        self.assertEquals(unchanged_file, os.readlink(os.path.join(publish_dir, 'link.html')))
+
+        report = step.get_progress_report()[0]
+        self.assertEquals(1, report[reporting_constants.PROGRESS_FILES_REUSED_KEY])
+        self.assertEquals(1, report[reporting_constants.PROGRESS_FILES_COPIED_KEY])
+
+    @patch('pulp.plugins.util.publish_step.os.link')
+    def test_process_main_incremental_cross_device(self, mock_link):
+        mock_link.side_effect = OSError(errno.EXDEV, 'Invalid cross-device link')
+        source_dir = os.path.join(self.working_directory, 'source')
+        master_dir = os.path.join(self.working_directory, 'master')
+        publish_dir = os.path.join(self.working_directory, 'publish', 'bar')
+        touch(os.path.join(source_dir, 'bar.html'))
+        touch(os.path.join(master_dir, '1', 'bar.html'))
+        shutil.copystat(os.path.join(source_dir, 'bar.html'),
+                        os.path.join(master_dir, '1', 'bar.html'))
+
+        step = AtomicDirectoryPublishStep(source_dir, [('/', publish_dir)], master_dir,
+                                          incremental=True)
+        step.parent = Mock(timestamp='2')
+        step.process_main()
+
+        self.assertTrue(mock_link.called)
+        self.assertEquals((0, 1), (step.files_reused, step.files_copied))
+        self.assertTrue(os.path.exists(os.path.join(publish_dir, 'bar.html')))
+
 
 class TestSaveTarFilePublishStep(unittest.TestCase):
     def setUp(self):
@@ -1116,19 +1247,73 @@ class DownloadStepTests(unittest.TestCase):
         dlstep._process_block()
         mock_downloader.download.assert_called_once_with(['fake', 'downloads'])
 
+    def test__get_total_supplied(self):
+        dlstep = DownloadStep('fake-step', downloads=iter(['fake', 'downloads']), total=5)
+        self.assertEquals(dlstep._get_total(), 5)
+
+    def test__get_total_generator(self):
+        generator = (d for d in ['fake', 'downloads'])
+        dlstep = DownloadStep('fake-step', downloads=generator)
+        self.assertEquals(dlstep._get_total(), 0)
+        # the generator is left for the downloader to consume
+        self.assertEquals(list(generator), ['fake', 'downloads'])
+
+    def test__process_block_generator(self):
+        consumed = []
+
+        def download(requests):
+            for request in requests:
+                consumed.append(request)
+
+        dlstep = DownloadStep('fake-step', downloads=(str(i) for i in range(50)), queue_size=5)
+        dlstep.downloader = Mock()
+        dlstep.downloader.download.side_effect = download
+
+        dlstep._process_block()
+
+        self.assertEquals(consumed, [str(i) for i in range(50)])
+        # without a supplied total, the total grows with the requests read
+        self.assertEquals(dlstep.total_units, 50)
+
+    def test__process_block_generator_error(self):
+        def generator():
+            yield 'fake'
+            raise ValueError('bad request')
+
+        dlstep = DownloadStep('fake-step', downloads=generator())
+        dlstep.downloader = Mock()
+        dlstep.downloader.download.side_effect = lambda requests: list(requests)
+
+        self.assertRaises(ValueError, dlstep._process_block)
+
+    def test_download_progress_report(self):
+        dlstep = DownloadStep('fake-step')
+        dlstep.report_progress = Mock()
+        dlstep.download_start_time = time.time() - 2
+        dlstep.download_started(Mock())
+        dlstep.download_started(Mock())
+        dlstep.download_succeeded(Mock(bytes_downloaded=1000))
+
+        report = dlstep.get_progress_report()[0]
+
+        self.assertEquals(report[reporting_constants.PROGRESS_DOWNLOADS_IN_FLIGHT_KEY], 1)
+        self.assertEquals(report[reporting_constants.PROGRESS_BYTES_DOWNLOADED_KEY], 1000)
+        self.assertTrue(0 < report[reporting_constants.PROGRESS_BYTES_PER_SECOND_KEY] <= 500)
+
     def test_download_succeeded(self):
         dlstep = DownloadStep('fake-step')
-        mock_report = Mock()
+        mock_report = Mock(bytes_downloaded=10)
         mock_report_progress = Mock()
         dlstep.report_progress = mock_report_progress
         dlstep.download_succeeded(mock_report)
         self.assertEquals(dlstep.progress_successes, 1)
+        self.assertEquals(dlstep.bytes_downloaded, 10)
         # assert report_progress was called with no args
         mock_report_progress.assert_called_once_with()
 
     def test_download_failed(self):
         dlstep = DownloadStep('fake-step')
-        mock_report = Mock()
+        mock_report = Mock(bytes_downloaded=None)
         mock_report_progress = Mock()
         dlstep.report_progress = mock_report_progress
         dlstep.download_failed(mock_report)
@@ -1146,6 +1331,33 @@ class DownloadStepTests(unittest.TestCase):
         self.assertEqual(len(downloads), 1)
         self.assertTrue(isinstance(downloads[0], DownloadRequest))
 
+    def test_downloads_property_overridden(self):
+        class LazyDownloadStep(DownloadStep):
+            @property
+            def downloads(self):
+                return ['fake', 'downloads']
+
+        dlstep = LazyDownloadStep('fake-step')
+        dlstep.downloader = Mock()
+
+        self.assertEquals(dlstep._get_total(), 2)
+        dlstep._process_block()
+        dlstep.downloader.download.assert_called_once_with(['fake', 'downloads'])
+
+    def test_downloads_property_overridden_generator(self):
+        class LazyDownloadStep(DownloadStep):
+            @property
+            def downloads(self):
+                return (str(i) for i in range(3))
+
+        dlstep = LazyDownloadStep('fake-step')
+        dlstep.downloader = Mock()
+        dlstep.downloader.download.side_effect = lambda requests: list(requests)
+
+        self.assertEquals(dlstep._get_total(), 0)
+        dlstep._process_block()
+        self.assertEquals(dlstep.total_units, 3)
+
     def test_cancel(self):
         dlstep = DownloadStep('fake-step')
         dlstep.parent = MagicMock()
@@ -382,6 +382,55 @@ class TestSchedulerScheduleChanged(unittest.TestCase):
         self.assertTrue(sched_instance.schedule_changed is False)
 
 
+class TestSchedulerUpdateSchedule(unittest.TestCase):
+    @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
+    def test_updated_schedule_patched(self, mock_updated_since, mock_get_enabled,
+                                      mock_get_enabled_ids):
+        mock_get_enabled.return_value = SCHEDULES[1:2]
+        sched_instance = scheduler.Scheduler()
+        existing = sched_instance._schedule['529f4bd93de3a31d0ec77339']
+
+        mock_updated_since.return_value = SCHEDULES[:1]
+        mock_get_enabled.return_value = mock.MagicMock()
+        mock_get_enabled.return_value.count.return_value = 2
+
+        sched_instance.update_schedule()
+
+        mock_updated_since.assert_called_once_with(1387218500.598727)
+        self.assertTrue('529f4bd93de3a31d0ec77338' in sched_instance._schedule)
+        self.assertTrue(sched_instance._schedule['529f4bd93de3a31d0ec77339'] is existing)
+        self.assertEqual(sched_instance._most_recent_timestamp, 1387218569.811224)
+        self.assertEqual(sched_instance._loaded_from_db_count, 2)
+        self.assertFalse(mock_get_enabled_ids.called)
+        self.assertTrue(sched_instance.last_reload_duration is not None)
+
+    @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled_ids')
+    @mock.patch('pulp.server.managers.schedule.utils.get_enabled')
+    @mock.patch('pulp.server.managers.schedule.utils.get_updated_since')
+    def test_removed_schedule_dropped(self, mock_updated_since, mock_get_enabled,
+                                      mock_get_enabled_ids):
+        mock_get_enabled.return_value = SCHEDULES
+        sched_instance = scheduler.Scheduler()
+
+        mock_updated_since.return_value = []
+        mock_get_enabled.return_value = mock.MagicMock()
+        mock_get_enabled.return_value.count.return_value = 1
+        mock_get_enabled_ids.return_value = ['529f4bd93de3a31d0ec77339']
+
+        sched_instance.update_schedule()
+
+        self.assertTrue('529f4bd93de3a31d0ec77338' not in sched_instance._schedule)
+        self.assertTrue('529f4bd93de3a31d0ec77339' in sched_instance._schedule)
+        self.assertEqual(sched_instance._loaded_from_db_count, 1)
+        # schedules from the app configuration are left alone
+        for key in scheduler.app.conf.CELERYBEAT_SCHEDULE:
+            self.assertTrue(key in sched_instance._schedule)
+
+
 class TestSchedulerSchedule(unittest.TestCase):
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch.object(scheduler.Scheduler, 'get_schedule')
@@ -395,15 +444,17 @@ class TestSchedulerSchedule(unittest.TestCase):
         mock_get_schedule.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
+    @mock.patch.object(scheduler.Scheduler, 'update_schedule')
     @mock.patch.object(scheduler.Scheduler, 'setup_schedule')
     @mock.patch.object(scheduler.Scheduler, 'schedule_changed', new=True)
-    def test_schedule_changed(self, mock_setup_schedule):
+    def test_schedule_changed(self, mock_setup_schedule, mock_update_schedule):
         sched_instance = scheduler.Scheduler()
+        sched_instance._schedule = {}
 
         sched_instance.schedule
 
-        # make sure it called the setup_schedule() method
-        mock_setup_schedule.assert_called_once_with()
+        # make sure it applied the changes incrementally
+        mock_update_schedule.assert_called_once_with()
 
     @mock.patch('threading.Thread', new=mock.MagicMock())
     @mock.patch.object(scheduler.Scheduler, 'schedule_changed', return_value=False)
@@ -42,6 +42,7 @@ class TestQueueReservedTask(ResourceReservationTests):
 
         self.patch_c = mock.patch('pulp.server.async.tasks.time', autospec=True)
         self.mock_time = self.patch_c.start()
+        self.mock_time.time.return_value = 0
 
         self.patch_d = mock.patch('pulp.server.async.tasks.ReservedResource', autospec=True)
         self.mock_reserved_resource = self.patch_d.start()
@@ -120,7 +121,30 @@ class TestQueueReservedTask(ResourceReservationTests):
         else:
             self.fail('_queue_reserved_task should have raised a BreakOutException')
 
-        self.mock_time.sleep.assert_has_calls([mock.call(0.25), mock.call(0.25)])
+        self.mock_time.sleep.assert_has_calls([mock.call(tasks.RESERVATION_MIN_WAIT),
+                                               mock.call(tasks.RESERVATION_MIN_WAIT * 2)])
+
+    def test_wait_does_not_exceed_maximum(self):
+        self.mock_get_worker_for_reservation.side_effect = NoWorkers()
+        self.mock_get_unreserved_worker.side_effect = NoWorkers()
+
+        class BreakOutException(Exception):
+            pass
+
+        waits = []
+
+        def side_effect(wait):
+            waits.append(wait)
+            if len(waits) == 10:
+                raise BreakOutException()
+
+        self.mock_time.sleep.side_effect = side_effect
+
+        self.assertRaises(BreakOutException, tasks._queue_reserved_task, 'task_name',
+                          'my_task_id', 'my_resource_id', [1, 2], {'a': 2})
+
+        self.assertEqual(waits[-1], tasks.RESERVATION_MAX_WAIT)
+        self.assertEqual(waits, sorted(waits))
 
 
 class TestDeleteWorker(ResourceReservationTests):
@@ -846,10 +870,18 @@ class TestGetWorkerForReservation(ResourceReservationTests):
 
 class TestGetUnreservedWorker(ResourceReservationTests):
 
+    def setUp(self):
+        super(TestGetUnreservedWorker, self).setUp()
+        tasks._clear_worker_cache()
+
+    def tearDown(self):
+        super(TestGetUnreservedWorker, self).tearDown()
+        tasks._clear_worker_cache()
+
     @mock.patch('pulp.server.async.tasks.ReservedResource')
     def test_reserved_resources_queried_correctly(self, mock_reserved_resource):
-        find = mock_reserved_resource.get_collection.return_value.find
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
+        distinct = mock_reserved_resource.get_collection.return_value.distinct
+        distinct.return_value = ['a', 'b']
         try:
             tasks._get_unreserved_worker()
         except NoWorkers:
@@ -857,24 +889,53 @@ class TestGetUnreservedWorker(ResourceReservationTests):
         else:
             self.fail("NoWorkers() Exception should have been raised.")
         mock_reserved_resource.get_collection.assert_called_once_with()
-        find.assert_called_once_with()
+        distinct.assert_called_once_with('worker_name')
 
     @mock.patch('pulp.server.async.tasks.Worker.objects')
     @mock.patch('pulp.server.async.tasks.ReservedResource')
     def test_worker_returned_when_one_worker_is_not_reserved(self, mock_reserved_resource,
                                                              mock_worker_objects):
-        mock_worker_objects.return_value = [{'name': 'a'}, {'name': 'b'}]
-        find = mock_reserved_resource.get_collection.return_value.find
-        find.return_value = [{'worker_name': 'a'}]
+        mock_worker_objects.side_effect = self._worker_objects([{'name': 'a'}, {'name': 'b'}])
+        distinct = mock_reserved_resource.get_collection.return_value.distinct
+        distinct.return_value = ['a']
         result = tasks._get_unreserved_worker()
         self.assertEqual(result, {'name': 'b'})
+        mock_worker_objects.assert_called_with(name='b')
+
+    @mock.patch('pulp.server.async.tasks.Worker.objects')
+    @mock.patch('pulp.server.async.tasks.ReservedResource')
+    def test_deleted_worker_not_returned(self, mock_reserved_resource, mock_worker_objects):
+        # 'b' is cached but has since been deleted by another process
+        mock_worker_objects.side_effect = self._worker_objects([{'name': 'a'}, {'name': 'b'}])
+        distinct = mock_reserved_resource.get_collection.return_value.distinct
+        distinct.return_value = ['a']
+        tasks._get_workers()
+        mock_worker_objects.side_effect = self._worker_objects([{'name': 'a'}])
+
+        self.assertRaises(NoWorkers, tasks._get_unreserved_worker)
+        # the stale cache is discarded so the next lookup reads the workers again
+        self.assertEqual(tasks._worker_cache['workers'], {})
+
+    @staticmethod
+    def _worker_objects(workers):
+        """
+        Return a side effect for Worker.objects that lists the given workers, or finds one of
+        them when called with a name.
+        """
+        def objects(name=None):
+            if name is None:
+                return workers
+            query = mock.Mock()
+            query.first.return_value = dict((w['name'], w) for w in workers).get(name)
+            return query
+        return objects
 
     @mock.patch('pulp.server.async.tasks.Worker.objects')
     @mock.patch('pulp.server.async.tasks.ReservedResource')
     def test_no_workers_raised_when_all_workers_reserved(self, mock_reserved_resource, mock_worker):
         mock_worker.objects.return_value = [{'name': 'a'}, {'name': 'b'}]
-        find = mock_reserved_resource.get_collection.return_value.find
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
+        distinct = mock_reserved_resource.get_collection.return_value.distinct
+        distinct.return_value = ['a', 'b']
         try:
             tasks._get_unreserved_worker()
         except NoWorkers:
@@ -886,8 +947,8 @@ class TestGetUnreservedWorker(ResourceReservationTests):
     @mock.patch('pulp.server.async.tasks.ReservedResource')
     def test_no_workers_raised_when_there_are_no_workers(self, mock_reserved_resource, mock_worker):
         mock_worker.objects.return_value = []
-        find = mock_reserved_resource.get_collection.return_value.find
-        find.return_value = [{'worker_name': 'a'}, {'worker_name': 'b'}]
+        distinct = mock_reserved_resource.get_collection.return_value.distinct
+        distinct.return_value = ['a', 'b']
         try:
             tasks._get_unreserved_worker()
         except NoWorkers:
@@ -903,3 +964,37 @@ class TestGetUnreservedWorker(ResourceReservationTests):
 
     def test_is_not_worker_is_resource_mgr(self):
         self.assertEquals(tasks._is_worker("resource_manager@some.hostname"), False)
+
+
+class TestGetWorkers(unittest.TestCase):
+
+    def setUp(self):
+        tasks._clear_worker_cache()
+
+    def tearDown(self):
+        tasks._clear_worker_cache()
+
+    @mock.patch('pulp.server.async.tasks.time')
+    @mock.patch('pulp.server.async.tasks.Worker.objects')
+    def test_workers_cached(self, mock_worker_objects, mock_time):
+        mock_worker_objects.return_value = [{'name': 'a'}]
+        mock_time.time.return_value = 100
+
+        tasks._get_workers()
+        mock_time.time.return_value = 100 + tasks.WORKER_CACHE_TIMEOUT
+        result = tasks._get_workers()
+
+        self.assertEqual(result, {'a': {'name': 'a'}})
+        self.assertEqual(mock_worker_objects.call_count, 1)
+
+    @mock.patch('pulp.server.async.tasks.time')
+    @mock.patch('pulp.server.async.tasks.Worker.objects')
+    def test_workers_reloaded_after_timeout(self, mock_worker_objects, mock_time):
+        mock_worker_objects.return_value = [{'name': 'a'}]
+        mock_time.time.return_value = 100
+
+        tasks._get_workers()
+        mock_time.time.return_value = 101 + tasks.WORKER_CACHE_TIMEOUT
+        tasks._get_workers()
+
+        self.assertEqual(mock_worker_objects.call_count, 2)
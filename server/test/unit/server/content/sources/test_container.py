@@ -15,12 +15,13 @@ from unittest import TestCase
 
 from Queue import Queue, Full, Empty
 from collections import namedtuple
+from datetime import datetime
 
 from mock import patch, Mock
 
 from pulp.server.content.sources.container import (
     ContentContainer, NectarListener, Item, RequestQueue, Batch, DownloadReport,
-    Listener, NectarFeed, Tracker)
+    Listener, NectarFeed, Tracker, SourceStats, transfer)
 from pulp.server.content.sources.model import ContentSource
 
 
@@ -105,6 +106,38 @@ class TestContainer(TestCase):
 
         self.assertEqual(sorted(report), [0, 1, 2])
 
+    @patch('pulp.server.content.sources.container.ThreadPool')
+    @patch('pulp.server.content.sources.container.ContentSource.load_all')
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_refresh_concurrency(self, fake_manager, fake_load, fake_pool):
+        sources = {}
+        canceled = Mock()
+        canceled.is_set.return_value = False
+        for n in range(3):
+            s = ContentSource('s-%d' % n, {})
+            s.refresh = Mock(return_value=[n])
+            sources[s.id] = s
+
+        fake_manager().has_entries.return_value = False
+        fake_load.return_value = sources
+        fake_pool.return_value.map.side_effect = lambda fn, items: [fn(i) for i in items]
+
+        # test
+        container = ContentContainer('')
+        report = container.refresh(canceled, concurrency=2)
+
+        # validation
+        fake_pool.assert_called_once_with(2)
+        fake_pool.return_value.close.assert_called_once_with()
+        fake_pool.return_value.join.assert_called_once_with()
+        self.assertEqual(sorted(report), [0, 1, 2])
+
+        # serial
+        fake_pool.reset_mock()
+        report = container.refresh(canceled, concurrency=1)
+        self.assertFalse(fake_pool.called)
+        self.assertEqual(sorted(report), [0, 1, 2])
+
     @patch('pulp.server.content.sources.container.ContentSource.load_all')
     @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
     def test_refresh_raised(self, fake_manager, fake_load):
@@ -277,6 +310,34 @@ class TestNectarListener(TestCase):
         batch.listener.download_succeeded.assert_called_with(report.data)
         self.assertEqual(listener.total_succeeded, 1)
 
+    def test_download_succeeded_stats(self):
+        batch = Mock()
+        batch.is_canceled = False
+        stats = Mock()
+        report = Mock()
+        report.bytes_downloaded = 100
+        report.start_time = datetime(2014, 1, 1, 10, 0, 0)
+        report.finish_time = datetime(2014, 1, 1, 10, 0, 2)
+
+        # test
+        listener = NectarListener(batch, stats)
+        listener.download_succeeded(report)
+
+        # validation
+        stats.succeeded.assert_called_once_with(100, 2.0)
+
+    def test_download_failed_stats(self):
+        batch = Mock()
+        batch.is_canceled = True
+        stats = Mock()
+
+        # test
+        listener = NectarListener(batch, stats)
+        listener.download_failed(Mock())
+
+        # validation
+        stats.failed.assert_called_once_with()
+
     def test_download_succeeded_no_listener(self):
         batch = Mock()
         batch.is_canceled = False
@@ -441,7 +502,7 @@ class TestBatch(TestCase):
         fake_queue = Mock()
         fake_request = Mock()
         sources = [(Mock(), 'http://')]
-        fake_request.sources = iter(sources)
+        fake_request.next_source.return_value = sources[0]
         fake_find.return_value = fake_queue
         # test
         canceled = Mock()
@@ -450,6 +511,7 @@ class TestBatch(TestCase):
         dispatched = batch.dispatch(fake_request)
 
         # validation
+        fake_request.next_source.assert_called_with(batch.rank)
         fake_find.assert_called_with(sources[0][0])
         fake_item.assert_called_with(fake_request, sources[0][1])
         fake_queue.put.assert_called_with(fake_item())
@@ -462,8 +524,7 @@ class TestBatch(TestCase):
     def test_dispatch_no_remaining_sources(self, fake_decrement, fake_find):
         fake_queue = Mock()
         fake_request = Mock()
-        sources = []
-        fake_request.sources = iter(sources)
+        fake_request.next_source.side_effect = StopIteration()
         fake_find.return_value = fake_queue
 
         # test
@@ -478,6 +539,21 @@ class TestBatch(TestCase):
         self.assertFalse(fake_queue.put.called)
         self.assertFalse(fake_find.called)
 
+    def test_rank(self):
+        source = Mock()
+        source.id = 'fake-id'
+        canceled = Mock()
+        canceled.is_set.return_value = False
+        batch = Batch(canceled, None, None, None, None)
+
+        # test
+        batch.get_stats(source.id).succeeded(1000, 1.0)
+        rank = batch.rank(source)
+
+        # validation
+        self.assertEqual(rank, batch.stats[source.id].rank)
+        self.assertTrue(batch.get_stats(source.id) is batch.stats[source.id])
+
     @patch('pulp.server.content.sources.container.RLock')
     @patch('pulp.server.content.sources.container.Batch._add_queue')
     def test_find_queue(self, fake_add, fake_lock):
@@ -533,15 +609,17 @@ class TestBatch(TestCase):
 
         # validation
         fake_queue.assert_called_with(canceled, fake_source)
-        fake_listener.assert_called_with(batch)
+        fake_listener.assert_called_with(batch, batch.stats[fake_source.id])
         fake_queue().start.assert_called_with()
         self.assertEqual(fake_queue().downloader.event_listener, fake_listener())
         self.assertEqual(batch.queues[fake_source.id], fake_queue())
         self.assertEqual(queue, fake_queue())
 
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
     @patch('pulp.server.content.sources.container.Tracker.wait')
     @patch('pulp.server.content.sources.container.Batch.dispatch')
-    def test_download(self, fake_dispatch, fake_wait):
+    def test_download(self, fake_dispatch, fake_wait, fake_manager):
+        fake_manager().find_all.side_effect = lambda units: [['entry']] * len(units)
         primary = Mock()
         sources = [Mock(), Mock()]
         requests = [Mock(), Mock(), Mock()]
@@ -551,11 +629,15 @@ class TestBatch(TestCase):
         queue_1.downloader.event_listener = Mock()
         queue_1.downloader.event_listener.total_succeeded = 100
         queue_1.downloader.event_listener.total_failed = 3
+        queue_1.downloader.event_listener.stats = SourceStats()
+        queue_1.downloader.event_listener.stats.throughput = 1024.0
+        queue_1.downloader.event_listener.stats.error_rate = 0.25
         queue_2 = Mock()
         queue_2.downloader = Mock()
         queue_2.downloader.event_listener = Mock()
         queue_2.downloader.event_listener.total_succeeded = 200
         queue_2.downloader.event_listener.total_failed = 10
+        queue_2.downloader.event_listener.stats = SourceStats()
 
         # test
         canceled = Mock()
@@ -566,8 +648,10 @@ class TestBatch(TestCase):
 
         # validation
         # initial dispatch
+        # catalog entries found for all requests with a single lookup
+        self.assertEqual(fake_manager().find_all.call_count, 1)
         for request in requests:
-            request.find_sources.assert_called_with(primary, sources)
+            request.find_sources.assert_called_with(primary, sources, ['entry'])
         calls = fake_dispatch.call_args_list
         self.assertEqual(len(calls), len(requests))
         for i, request in enumerate(requests):
@@ -586,6 +670,28 @@ class TestBatch(TestCase):
         self.assertEqual(report.downloads['source-1'].total_failed, 3)
         self.assertEqual(report.downloads['source-2'].total_succeeded, 200)
         self.assertEqual(report.downloads['source-2'].total_failed, 10)
+        self.assertEqual(report.downloads['source-1'].throughput, 1024.0)
+        self.assertEqual(report.downloads['source-1'].error_rate, 0.25)
+        self.assertEqual(report.downloads['source-2'].throughput, 0.0)
+        self.assertEqual(report.downloads['source-2'].error_rate, 0.0)
+
+    @patch('pulp.server.content.sources.container.managers.content_catalog_manager')
+    def test_plan(self, fake_manager):
+        primary = Mock()
+        sources = {'source-1': Mock()}
+        requests = [Mock(), Mock()]
+        entries = [['entry-1'], []]
+        fake_manager().find_all.return_value = entries
+
+        # test
+        batch = Batch(None, primary, sources, iter(requests), None)
+        batch.plan(requests)
+
+        # validation
+        fake_manager().find_all.assert_called_once_with(
+            [(r.type_id, r.unit_key) for r in requests])
+        for request, request_entries in zip(requests, entries):
+            request.find_sources.assert_called_once_with(primary, sources, request_entries)
 
     @patch('pulp.server.content.sources.container.Tracker.wait')
     @patch('pulp.server.content.sources.container.Batch.dispatch')
@@ -646,6 +752,7 @@ class TestBatch(TestCase):
         self.assertEqual(report.downloads['source-2'].total_succeeded, 200)
         self.assertEqual(report.downloads['source-2'].total_failed, 10)
 
+    @patch('pulp.server.content.sources.container.Batch.plan', Mock())
     @patch('pulp.server.content.sources.container.Tracker.wait')
     @patch('pulp.server.content.sources.container.Batch.dispatch')
     def test_download_with_exception(self, fake_dispatch, fake_wait):
@@ -1016,3 +1123,66 @@ class TestTracker(TestCase):
         # validation
         self.assertEqual(canceled.is_set.call_count, len(tokens))
         self.assertEqual(fake_get.call_count, len(tokens))
+
+
+class TestSourceStats(TestCase):
+
+    def test_construction(self):
+        stats = SourceStats()
+        self.assertEqual(stats.throughput, None)
+        self.assertEqual(stats.error_rate, 0.0)
+        self.assertEqual(stats.rank, (False, 0.0))
+
+    @patch('pulp.server.content.sources.container.STATS_WEIGHT', 0.5)
+    def test_succeeded(self):
+        stats = SourceStats()
+
+        # test
+        stats.succeeded(1000, 2.0)
+        stats.succeeded(3000, 1.0)
+        stats.succeeded(1000, None)
+
+        # validation
+        self.assertEqual(stats.throughput, 1750.0)
+        self.assertEqual(stats.error_rate, 0.0)
+
+    @patch('pulp.server.content.sources.container.STATS_WEIGHT', 0.5)
+    def test_failed(self):
+        stats = SourceStats()
+
+        # test
+        stats.failed()
+        stats.failed()
+
+        # validation
+        self.assertEqual(stats.error_rate, 0.75)
+        self.assertEqual(stats.rank, (True, 0.0))
+
+    def test_rank(self):
+        fast = SourceStats()
+        fast.succeeded(2000, 1.0)
+        slow = SourceStats()
+        slow.succeeded(1000, 1.0)
+        failing = SourceStats()
+        failing.succeeded(2000, 1.0)
+        failing.failed()
+        degraded = SourceStats()
+        degraded.succeeded(100000, 1.0)
+        degraded.error_rate = 0.9
+
+        # validation
+        self.assertTrue(fast.rank < slow.rank)
+        self.assertTrue(fast.rank < failing.rank)
+        self.assertTrue(slow.rank < degraded.rank)
+        self.assertTrue(SourceStats().rank < fast.rank)
+
+    def test_transfer(self):
+        report = Mock()
+        report.bytes_downloaded = 1024
+        report.start_time = datetime(2014, 1, 1, 10, 0, 0)
+        report.finish_time = datetime(2014, 1, 1, 10, 0, 4)
+        self.assertEqual(transfer(report), (1024, 4.0))
+        report.finish_time = None
+        self.assertEqual(transfer(report), (1024, None))
+        report.bytes_downloaded = None
+        self.assertEqual(transfer(report), (0, None))
@@ -147,6 +147,26 @@ class TestRequest(TestCase):
         self.assertEqual(request.sources[4][0].id, primary.id)
         self.assertEqual(request.sources[4][1], url)
 
+    def test_next_source_ranked(self):
+        s1 = ContentSource('s-1', {constants.PRIORITY: '1'})
+        s2 = ContentSource('s-2', {constants.PRIORITY: '1'})
+        s3 = ContentSource('s-3', {constants.PRIORITY: '2'})
+        primary = PrimarySource(None)
+        request = Request('', {}, '', '')
+        request.sources = iter([(s1, 'u1'), (s2, 'u2'), (s3, 'u3'), (primary, 'u0')])
+        ranks = {'s-1': 2, 's-2': 1, 's-3': 0, PRIMARY_ID: 0}
+
+        def rank(source):
+            return ranks[source.id]
+
+        # test and validation
+
+        self.assertEqual(request.next_source(rank), (s2, 'u2'))
+        self.assertEqual(request.next_source(rank), (s1, 'u1'))
+        self.assertEqual(request.next_source(rank), (s3, 'u3'))
+        self.assertEqual(request.next_source(), (primary, 'u0'))
+        self.assertRaises(StopIteration, request.next_source, rank)
+
     def test_next_source(self):
         sources = [1, 2, 3]
         request = Request('', {}, '', '')
@@ -385,10 +405,11 @@ class TestContentSource(TestCase):
         canceled = Mock()
         canceled.isSet = Mock(return_value=False)
         conduit = Mock()
+        conduit.commit_generation.return_value = 5
         cataloger = Mock()
         cataloger.refresh.side_effect = FakeRefresh()
 
-        source = ContentSource('s-1', {constants.BASE_URL: url})
+        source = ContentSource('s-1', {constants.BASE_URL: url, constants.MAX_CONCURRENT: '1'})
         source.get_conduit = Mock(return_value=conduit)
         source.get_cataloger = Mock(return_value=cataloger)
 
@@ -398,9 +419,14 @@ class TestContentSource(TestCase):
 
         # validation
 
-        self.assertEqual(canceled.isSet.call_count, len(urls))
-        self.assertEqual(conduit.reset.call_count, len(urls))
+        self.assertEqual(canceled.isSet.call_count, len(urls) + 1)
+        self.assertEqual(source.get_conduit.call_count, len(urls) + 1)
         self.assertEqual(cataloger.refresh.call_count, len(urls))
+        self.assertEqual(conduit.flush.call_count, len(urls))
+        conduit.open_generation.assert_any_call()
+        conduit.open_generation.assert_any_call(conduit.generation)
+        conduit.commit_generation.assert_called_once_with()
+        self.assertFalse(conduit.close_generation.called)
 
         n = 0
         added = 10
@@ -412,6 +438,8 @@ class TestContentSource(TestCase):
             self.assertTrue(report[n].succeeded)
             self.assertEqual(report[n].errors, [])
             self.assertEqual(report[n].added_count, added)
+            if n == len(urls) - 1:
+                deleted += conduit.commit_generation.return_value
             self.assertEqual(report[n].deleted_count, deleted)
             added += 10
             deleted += 1
@@ -439,10 +467,12 @@ class TestContentSource(TestCase):
 
         # validation
 
-        self.assertEqual(canceled.isSet.call_count, 1)
-        self.assertEqual(conduit.reset.call_count, 0)
+        self.assertEqual(canceled.isSet.call_count, len(urls))
+        self.assertEqual(source.get_conduit.call_count, 1)
         self.assertEqual(cataloger.refresh.call_count, 0)
         self.assertEqual(report, [])
+        conduit.close_generation.assert_called_once_with()
+        self.assertFalse(conduit.commit_generation.called)
 
     @patch('pulp.server.content.sources.model.ContentSource.urls')
     def test_refresh_raised(self, fake_urls):
@@ -467,7 +497,7 @@ class TestContentSource(TestCase):
         # validation
 
         self.assertEqual(canceled.isSet.call_count, len(urls))
-        self.assertEqual(conduit.reset.call_count, len(urls))
+        self.assertEqual(source.get_conduit.call_count, len(urls) + 1)
         self.assertEqual(cataloger.refresh.call_count, len(urls))
 
         n = 0
@@ -481,6 +511,66 @@ class TestContentSource(TestCase):
             self.assertEqual(report[n].deleted_count, 0)
             n += 1
 
+        conduit.close_generation.assert_called_once_with()
+        self.assertFalse(conduit.commit_generation.called)
+
+    @patch('pulp.server.content.sources.model.ThreadPool')
+    @patch('pulp.server.content.sources.model.ContentSource.urls')
+    def test_refresh_concurrent(self, fake_urls, fake_pool):
+        url = 'http://xyz.com'
+        urls = ['url-1', 'url-2', 'url-3', 'url-4']
+        fake_urls.__get__ = Mock(return_value=urls)
+        fake_pool.return_value.map.side_effect = lambda fn, items: [fn(i) for i in items]
+
+        canceled = Mock()
+        canceled.isSet = Mock(return_value=False)
+        conduit = Mock()
+        conduit.commit_generation.return_value = 0
+        cataloger = Mock()
+
+        descriptor = {constants.BASE_URL: url, constants.MAX_CONCURRENT: '3'}
+        source = ContentSource('s-1', descriptor)
+        source.get_conduit = Mock(return_value=conduit)
+        source.get_cataloger = Mock(return_value=cataloger)
+
+        # test
+
+        report = source.refresh(canceled)
+
+        # validation
+
+        fake_pool.assert_called_once_with(3)
+        fake_pool.return_value.close.assert_called_once_with()
+        fake_pool.return_value.join.assert_called_once_with()
+        self.assertEqual(cataloger.refresh.call_count, len(urls))
+        self.assertEqual([r.url for r in report], urls)
+        self.assertTrue(all(r.succeeded for r in report))
+        conduit.commit_generation.assert_called_once_with()
+
+    @patch('pulp.server.content.sources.model.ContentSource.urls')
+    def test_refresh_url_duration(self, fake_urls):
+        url = 'http://xyz.com'
+        fake_urls.__get__ = Mock(return_value=[url])
+
+        canceled = Mock()
+        canceled.isSet = Mock(return_value=False)
+        conduit = Mock()
+        conduit.commit_generation.return_value = 0
+
+        source = ContentSource('s-1', {constants.BASE_URL: url})
+        source.get_conduit = Mock(return_value=conduit)
+        source.get_cataloger = Mock()
+
+        # test
+
+        with patch('pulp.server.content.sources.model.time') as fake_time:
+            fake_time.time.side_effect = [100, 110, 112.5, 120]
+            report = source.refresh(canceled)
+
+        # validation
+
+        self.assertEqual(report[0].duration, 2.5)
+
     def test_dict(self):
         descriptor = {'A': 1, 'B': 2}
 
@@ -559,10 +649,13 @@ class TestDownloadDetails(TestCase):
         details = DownloadDetails()
         self.assertEqual(details.total_succeeded, 0)
         self.assertEqual(details.total_failed, 0)
+        self.assertEqual(details.throughput, 0.0)
+        self.assertEqual(details.error_rate, 0.0)
 
     def test_dict(self):
         details = DownloadDetails()
-        self.assertEqual(details.dict(), {'total_failed': 0, 'total_succeeded': 0})
+        expected = {'total_failed': 0, 'total_succeeded': 0, 'throughput': 0.0, 'error_rate': 0.0}
+        self.assertEqual(details.dict(), expected)
 
 
 class TestDownloadReport(TestCase):
@@ -579,8 +672,10 @@ class TestDownloadReport(TestCase):
         expected = {
             'total_sources': 0,
             'downloads': {
-                's1': {'total_failed': 0, 'total_succeeded': 0},
-                's2': {'total_failed': 0, 'total_succeeded': 0}
+                's1': {'total_failed': 0, 'total_succeeded': 0,
+                       'throughput': 0.0, 'error_rate': 0.0},
+                's2': {'total_failed': 0, 'total_succeeded': 0,
+                       'throughput': 0.0, 'error_rate': 0.0}
             },
         }
         self.assertEqual(report.dict(), expected)
@@ -598,6 +693,7 @@ class TestRefreshReport(TestCase):
         self.assertEqual(report.added_count, 0)
         self.assertEqual(report.deleted_count, 0)
         self.assertEqual(report.errors, [])
+        self.assertEqual(report.duration, 0)
 
     def test_dict(self):
         source_id = 's-1'
@@ -610,3 +706,4 @@ class TestRefreshReport(TestCase):
         self.assertEqual(report_dict['added_count'], 0)
         self.assertEqual(report_dict['deleted_count'], 0)
         self.assertEqual(report_dict['errors'], [])
+        self.assertEqual(report_dict['duration'], 0)
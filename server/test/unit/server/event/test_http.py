@@ -1,4 +1,6 @@
+import errno
 import httplib
+import socket
 import time
 
 # needed to create unserializable ID
@@ -13,6 +15,24 @@ from pulp.server.event.data import Event
 
 class TestHTTPNotifierTests(base.PulpServerTests):
 
+    def setUp(self):
+        super(TestHTTPNotifierTests, self).setUp()
+        http._notifier = None
+
+    def tearDown(self):
+        super(TestHTTPNotifierTests, self).tearDown()
+        if http._notifier is not None:
+            http._notifier.stop()
+            http._notifier = None
+
+    @staticmethod
+    def stop_after_queued(notifier):
+        """
+        Make _run() return once the queued events are posted. The notifiers of these tests
+        have no threads, so stop() would not queue anything for _run() to stop on.
+        """
+        notifier._queue.put(http._STOP)
+
     @mock.patch('pulp.server.event.http._create_connection')
     def test_handle_event(self, mock_create):
         # Setup
@@ -113,6 +133,181 @@ class TestHTTPNotifierTests(base.PulpServerTests):
         # Verify
         self.assertEqual(0, mock_create.call_count)
 
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_handle_event_reuses_connection(self, mock_create):
+        # Setup
+        notifier_config = {'url': 'https://localhost/api/'}
+        mock_connection = mock_create.return_value
+        mock_connection.getresponse.return_value.status = httplib.OK
+        mock_connection.getresponse.return_value.will_close = False
+        notifier = http.HTTPNotifier(0, 10, 0, 30)
+        notifier.put(notifier_config, ('https:', 'localhost', 'api/'), '{}')
+        notifier.put(notifier_config, ('https:', 'localhost', 'api/'), '{}')
+        self.stop_after_queued(notifier)
+
+        # Test
+        notifier._run()
+
+        # Verify
+        self.assertEqual(1, mock_create.call_count)
+        self.assertEqual(2, mock_connection.request.call_count)
+        self.assertEqual(notifier.stats()['sent'], 2)
+        # the connection is closed when the worker exits
+        self.assertEqual(1, mock_connection.close.call_count)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_handle_event_retries_stale_connection(self, mock_create):
+        # Setup
+        notifier_config = {'url': 'https://localhost/api/'}
+        stale_connection = mock.Mock()
+        stale_connection.getresponse.side_effect = httplib.BadStatusLine('')
+        connection = mock.Mock()
+        connection.getresponse.return_value.status = httplib.OK
+        mock_create.return_value = connection
+        connections = {('https:', 'localhost'): stale_connection}
+
+        # Test
+        sent = http._send_post(connections, notifier_config, 'https:', 'localhost', 'api/',
+                               '{}', 30)
+
+        # Verify
+        self.assertTrue(sent)
+        self.assertEqual(1, stale_connection.close.call_count)
+        self.assertEqual(1, connection.request.call_count)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_handle_event_retries_reset_while_sending(self, mock_create):
+        # Setup
+        notifier_config = {'url': 'https://localhost/api/'}
+        stale_connection = mock.Mock()
+        stale_connection.request.side_effect = socket.error(errno.ECONNRESET, 'reset')
+        connection = mock.Mock()
+        connection.getresponse.return_value.status = httplib.OK
+        mock_create.return_value = connection
+        connections = {('https:', 'localhost'): stale_connection}
+
+        # Test
+        sent = http._send_post(connections, notifier_config, 'https:', 'localhost', 'api/',
+                               '{}', 30)
+
+        # Verify
+        self.assertTrue(sent)
+        self.assertEqual(1, connection.request.call_count)
+        self.assertEqual(connections, {('https:', 'localhost'): connection})
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_handle_event_does_not_retry_sent_post(self, mock_create):
+        # Setup
+        notifier_config = {'url': 'https://localhost/api/'}
+        stale_connection = mock.Mock()
+        stale_connection.getresponse.side_effect = socket.timeout('timed out')
+        connections = {('https:', 'localhost'): stale_connection}
+
+        # Test
+        self.assertRaises(socket.timeout, http._send_post, connections, notifier_config,
+                          'https:', 'localhost', 'api/', '{}', 30)
+
+        # Verify
+        self.assertEqual(1, stale_connection.close.call_count)
+        self.assertEqual(0, mock_create.call_count)
+        self.assertEqual(connections, {})
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_handle_event_batch(self, mock_create):
+        # Setup
+        batched_config = {'url': 'https://localhost/api/', 'batch_size': 2}
+        other_config = {'url': 'http://otherhost/api/'}
+        mock_connection = mock_create.return_value
+        mock_connection.getresponse.return_value.status = httplib.OK
+        notifier = http.HTTPNotifier(0, 10, 0, 30)
+        for i in range(3):
+            notifier.put(batched_config, ('https:', 'localhost', 'api/'), '{"i": %d}' % i)
+        notifier.put(other_config, ('http:', 'otherhost', 'api/'), '{"i": 3}')
+        self.stop_after_queued(notifier)
+
+        # Test
+        notifier._run()
+
+        # Verify
+        bodies = [c[1]['body'] for c in mock_connection.request.call_args_list]
+        self.assertEqual([json.loads(b) for b in bodies],
+                         [[{'i': 0}, {'i': 1}], [{'i': 2}], {'i': 3}])
+        stats = notifier.stats()
+        self.assertEqual(stats['sent'], 3)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['queued'], 0)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_handle_event_failure_counted(self, mock_create):
+        # Setup
+        notifier_config = {'url': 'https://localhost/api/'}
+        mock_create.return_value.request.side_effect = socket.error()
+        notifier = http.HTTPNotifier(0, 10, 0, 30)
+        notifier.put(notifier_config, ('https:', 'localhost', 'api/'), '{}')
+        self.stop_after_queued(notifier)
+
+        # Test
+        notifier._run()  # should not error
+
+        # Verify
+        stats = notifier.stats()
+        self.assertEqual(stats['sent'], 0)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_queue_full(self):
+        # Setup
+        notifier = http.HTTPNotifier(0, 1, 0, 30)
+
+        # Test
+        notifier.put({'url': 'http://localhost/'}, ('http:', 'localhost', ''), '{}')
+        notifier.put({'url': 'http://localhost/'}, ('http:', 'localhost', ''), '{}')
+
+        # Verify
+        stats = notifier.stats()
+        self.assertEqual(stats['queued'], 1)
+        self.assertEqual(stats['dropped'], 1)
+
+    @mock.patch('pulp.server.event.http._logger')
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_stats_logged(self, mock_create, mock_logger):
+        # Setup
+        notifier_config = {'url': 'https://localhost/api/'}
+        mock_create.return_value.getresponse.return_value.status = httplib.OK
+        notifier = http.HTTPNotifier(0, 10, 0, 30, stats_log_interval=60)
+        notifier._stats_logged -= 61
+        for i in range(2):
+            notifier.put(notifier_config, ('https:', 'localhost', 'api/'), '{}')
+        self.stop_after_queued(notifier)
+
+        # Test
+        notifier._run()
+
+        # Verify
+        # logged after the first post only, since the interval restarts once logged
+        self.assertEqual(1, mock_logger.info.call_count)
+        message = mock_logger.info.call_args[0][0]
+        self.assertTrue('1 sent, 0 failed, 0 dropped' in message)
+
+    @mock.patch('pulp.server.event.http._logger')
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_stats_not_logged_when_disabled(self, mock_create, mock_logger):
+        # Setup
+        notifier_config = {'url': 'https://localhost/api/'}
+        mock_create.return_value.getresponse.return_value.status = httplib.OK
+        notifier = http.HTTPNotifier(0, 10, 0, 30)
+        notifier._stats_logged -= 3600
+        notifier.put(notifier_config, ('https:', 'localhost', 'api/'), '{}')
+        self.stop_after_queued(notifier)
+
+        # Test
+        notifier._run()
+
+        # Verify
+        self.assertEqual(0, mock_logger.info.call_count)
+
+    def test_stats_without_notifier(self):
+        self.assertEqual(http.stats(), {})
+
     def test_create_configuration(self):
         # Test HTTPS
         conn = http._create_connection('https', 'foo')
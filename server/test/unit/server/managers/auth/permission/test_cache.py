@@ -0,0 +1,80 @@
+import unittest
+
+import mock
+
+from pulp.server.managers.auth.permission import cache
+
+
+class TestPermissionCache(unittest.TestCase):
+
+    def test_miss_then_hit(self):
+        permission_cache = cache.PermissionCache(10, 60)
+
+        self.assertEqual(permission_cache.get(('user', '/v2/')), (False, None))
+        permission_cache.set(('user', '/v2/'), (1, 2))
+        self.assertEqual(permission_cache.get(('user', '/v2/')), (True, (1, 2)))
+
+        self.assertEqual(permission_cache.hits, 1)
+        self.assertEqual(permission_cache.misses, 1)
+
+    @mock.patch('pulp.server.managers.auth.permission.cache.time')
+    def test_expired(self, mock_time):
+        permission_cache = cache.PermissionCache(10, 60)
+        mock_time.time.return_value = 1000
+        permission_cache.set(('user', '/v2/'), ())
+
+        mock_time.time.return_value = 1060
+        self.assertEqual(permission_cache.get(('user', '/v2/')), (False, None))
+        self.assertEqual(permission_cache.stats()['size'], 0)
+
+    def test_bounded_size(self):
+        permission_cache = cache.PermissionCache(2, 60)
+        permission_cache.set(('a', None), True)
+        permission_cache.set(('b', None), True)
+        permission_cache.set(('c', None), True)
+
+        self.assertEqual(permission_cache.get(('a', None)), (False, None))
+        self.assertEqual(permission_cache.get(('c', None)), (True, True))
+        self.assertEqual(permission_cache.stats()['size'], 2)
+
+    def test_disabled(self):
+        permission_cache = cache.PermissionCache(0, 60)
+        permission_cache.set(('a', None), True)
+
+        self.assertEqual(permission_cache.get(('a', None)), (False, None))
+
+    def test_invalidate_login(self):
+        permission_cache = cache.PermissionCache(10, 60)
+        permission_cache.set(('a', None), True)
+        permission_cache.set(('a', '/v2/'), ())
+        permission_cache.set(('b', None), False)
+
+        permission_cache.invalidate('a')
+
+        self.assertEqual(permission_cache.get(('a', None)), (False, None))
+        self.assertEqual(permission_cache.get(('a', '/v2/')), (False, None))
+        self.assertEqual(permission_cache.get(('b', None)), (True, False))
+
+    def test_invalidate_all(self):
+        permission_cache = cache.PermissionCache(10, 60)
+        permission_cache.set(('a', None), True)
+        permission_cache.set(('b', None), False)
+
+        permission_cache.invalidate()
+
+        self.assertEqual(permission_cache.stats()['size'], 0)
+
+
+class TestGetCache(unittest.TestCase):
+
+    @mock.patch('pulp.server.managers.auth.permission.cache._cache', None)
+    @mock.patch('pulp.server.managers.auth.permission.cache.pulp_config')
+    def test_created_from_config(self, mock_config):
+        mock_config.config.getint.side_effect = lambda section, option: {
+            'permission_cache_size': 5, 'permission_cache_ttl': 30}[option]
+
+        permission_cache = cache.get_cache()
+
+        self.assertEqual(permission_cache.max_size, 5)
+        self.assertEqual(permission_cache.ttl, 30)
+        self.assertTrue(cache.get_cache() is permission_cache)
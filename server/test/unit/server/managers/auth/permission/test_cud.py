@@ -5,6 +5,7 @@ from ..... import base
 from pulp.server.auth import authorization
 from pulp.server.db.model.auth import Role
 from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.auth.role.cud import SUPER_USER_ROLE
 import pulp.server.exceptions as exceptions
 
 
@@ -156,6 +157,23 @@ class PermissionManagerTests(base.PulpServerTests):
         self.permission_manager.grant('/', u['login'], [o])
         self.assertTrue(self.user_query_manager.is_authorized(r, u['login'], o))
 
+    def test_revoke_invalidates_cached_permission(self):
+        u = self._create_user()
+        r = self._create_resource()
+        o = authorization.READ
+        self.permission_manager.grant(r, u['login'], [o])
+        self.assertTrue(self.user_query_manager.is_authorized(r, u['login'], o))
+        self.permission_manager.revoke(r, u['login'], [o])
+        self.assertFalse(self.user_query_manager.is_authorized(r, u['login'], o))
+
+    def test_super_user_role_invalidates_cached_permission(self):
+        u = self._create_user()
+        r = self._create_resource()
+        o = authorization.DELETE
+        self.assertFalse(self.user_query_manager.is_authorized(r, u['login'], o))
+        self.role_manager.add_user_to_role(SUPER_USER_ROLE, u['login'])
+        self.assertTrue(self.user_query_manager.is_authorized(r, u['login'], o))
+
     def test_operation_name_to_value(self):
         pm = manager_factory.permission_manager()
         self.assertEqual(pm.operation_name_to_value('CREATE'), authorization.CREATE)
@@ -52,6 +52,11 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
 
         ApplicabilityRegenerationManager._get_existing_repo_content_types = mock.Mock(
             return_value=['rpm', 'erratum'])
+        patcher = mock.patch.object(
+            ApplicabilityRegenerationManager, '_get_existing_repo_content_types_map',
+            side_effect=lambda repo_ids: dict((r, ['rpm', 'erratum']) for r in repo_ids))
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def tearDown(self):
         base.PulpServerTests.tearDown(self)
@@ -288,6 +293,57 @@ class ApplicabilityRegenerationManagerTests(base.PulpServerTests):
         self.assertEqual(applicability_list[0]['profile'], self.PROFILE1)
         self.assertEqual(applicability_list[0]['applicability'], expected_applicability)
 
+    def test_regenerate_applicability_for_repos_report(self):
+        # Setup
+        self.populate_consumers_different_profiles()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Test
+        result = manager.regenerate_applicability_for_repos(self.REPO_CRITERIA)
+        # Verify
+        self.assertEqual(result.spawned_tasks, [])
+        self.assertEqual(result.return_value['pairs'], 4)
+        self.assertEqual(result.return_value['regenerated'], 4)
+
+    @mock.patch('pulp.server.managers.consumer.applicability.'
+                'regenerate_applicability_for_repo_profiles')
+    def test_regenerate_applicability_for_repos_chunks(self, mock_task):
+        # Setup
+        self.populate_consumers_different_profiles()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        # Test
+        result = manager.regenerate_applicability_for_repos(self.REPO_CRITERIA, chunk_size=3)
+        # Verify
+        dispatch = mock_task.apply_async_with_reservation
+        self.assertEqual(dispatch.call_count, 2)
+        self.assertEqual(result.spawned_tasks, [dispatch.return_value] * 2)
+        chunks = [c[0][2][0] for c in dispatch.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+        pairs = set(tuple(pair) for chunk in chunks for pair in chunk)
+        self.assertEqual(len(pairs), 4)
+        self.assertEqual(set(repo_id for repo_id, profile_hash in pairs), set(self.REPO_IDS))
+        # each chunk reserves a distinct resource so that they can run on different workers
+        resource_ids = [c[0][1] for c in dispatch.call_args_list]
+        self.assertEqual(len(set(resource_ids)), len(resource_ids))
+
+    def test_regenerate_applicability_for_repo_profiles_missing_profile(self):
+        # Setup
+        self.populate_consumers()
+        self.populate_bindings()
+        manager = factory.applicability_regeneration_manager()
+        manager.regenerate_applicability_for_consumers(self.CONSUMER_CRITERIA)
+        applicability = RepoProfileApplicability.get_collection().find_one()
+        # Test
+        report = manager.regenerate_applicability_for_repo_profiles(
+            [[applicability['repo_id'], applicability['profile_hash']],
+             [applicability['repo_id'], 'missing-hash']])
+        # Verify
+        self.assertEqual(report['pairs'], 2)
+        self.assertEqual(report['regenerated'], 1)
+
 
 class TestRepoProfileApplicabilityManager(base.PulpServerTests):
     """
@@ -1,6 +1,9 @@
 from uuid import uuid4
 
+from mock import patch
+
 from ....base import PulpServerTests
+from pulp.server.compat import ObjectId
 from pulp.server.db.model.content import ContentCatalog
 from pulp.server.managers import factory
 from pulp.server.managers.content.catalog import ContentCatalogManager
@@ -96,6 +99,49 @@ class TestCatalogManager(PulpServerTests):
         self.assertEqual(collection.find({'source_id': source_a}).count(), 0)
         self.assertEqual(collection.find({'source_id': source_b}).count(), 10)
 
+    def test_add_entries(self):
+        units = self.units(0, 10)
+        generation = ObjectId()
+        manager = ContentCatalogManager()
+        entries = [(TYPE_ID, unit_key, url) for unit_key, url in units]
+        added = manager.add_entries(SOURCE_ID, EXPIRATION, entries, generation)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(added, len(units))
+        self.assertEqual(len(units), collection.find().count())
+        for unit_key, url in units:
+            locator = ContentCatalog.get_locator(TYPE_ID, unit_key)
+            entry = collection.find_one({'locator': locator})
+            self.assertEqual(entry['source_id'], SOURCE_ID)
+            self.assertEqual(entry['unit_key'], unit_key)
+            self.assertEqual(entry['url'], url)
+            self.assertEqual(entry['generation'], generation)
+
+    def test_add_entries_empty(self):
+        manager = ContentCatalogManager()
+        added = manager.add_entries(SOURCE_ID, EXPIRATION, [])
+        self.assertEqual(added, 0)
+        self.assertEqual(ContentCatalog.get_collection().find().count(), 0)
+
+    def test_purge_generations(self):
+        source_a = 'A'
+        source_b = 'B'
+        manager = ContentCatalogManager()
+        for unit_key, url in self.units(0, 10):
+            manager.add_entry(source_a, EXPIRATION, TYPE_ID, unit_key, url)
+            manager.add_entry(source_b, EXPIRATION, TYPE_ID, unit_key, url)
+        generation = ObjectId()
+        entries = [(TYPE_ID, unit_key, url) for unit_key, url in self.units(0, 5)]
+        manager.add_entries(source_a, EXPIRATION, entries, generation)
+        # added by a refresh started after the generation
+        entries = [(TYPE_ID, unit_key, url) for unit_key, url in self.units(0, 3)]
+        manager.add_entries(source_a, EXPIRATION, entries, ObjectId())
+        purged = manager.purge_generations(source_a, generation)
+        collection = ContentCatalog.get_collection()
+        self.assertEqual(purged, 10)
+        self.assertEqual(collection.find({'source_id': source_a}).count(), 8)
+        self.assertEqual(collection.find({'generation': generation}).count(), 5)
+        self.assertEqual(collection.find({'source_id': source_b}).count(), 10)
+
     def test_has_entries(self):
         source_a = 'A'
         source_b = 'B'
@@ -171,6 +217,35 @@ class TestCatalogManager(PulpServerTests):
             self.assertEqual(entry['unit_key'], unit_key)
             self.assertEqual(entry['url'], url)
 
+    def test_find_all(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        for unit_key, url in units:
+            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
+        # a newer entry for the first unit from the same source, and one from another source
+        manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, units[0][0], 'http://newer')
+        manager.add_entry('other', EXPIRATION, TYPE_ID, units[0][0], 'http://other')
+        missing = ({'name': 'missing'}, None)
+        found = manager.find_all([(TYPE_ID, k) for k, u in [missing] + units])
+        self.assertEqual(len(found), len(units) + 1)
+        self.assertEqual(found[0], [])
+        urls = sorted(entry['url'] for entry in found[1])
+        self.assertEqual(urls, ['http://newer', 'http://other'])
+        for entries, (unit_key, url) in zip(found[2:], units[1:]):
+            self.assertEqual(len(entries), 1)
+            self.assertEqual(entries[0]['unit_key'], unit_key)
+            self.assertEqual(entries[0]['url'], url)
+
+    @patch('pulp.server.managers.content.catalog.FIND_BATCH_SIZE', 3)
+    def test_find_all_batches(self):
+        units = self.units(0, 10)
+        manager = ContentCatalogManager()
+        for unit_key, url in units:
+            manager.add_entry(SOURCE_ID, EXPIRATION, TYPE_ID, unit_key, url)
+        found = manager.find_all([(TYPE_ID, unit_key) for unit_key, url in units])
+        self.assertEqual([len(entries) for entries in found], [1] * len(units))
+        self.assertEqual([entries[0]['url'] for entries in found], [url for k, url in units])
+
     def test_expired(self):
         units = self.units(0, 10)
         manager = ContentCatalogManager()
@@ -53,6 +53,23 @@ class PulpContentCUDTests(PulpContentTests):
         self.assertEqual(len(units), 1)
         self.assertTrue('_last_updated' in units[0])
 
+    def test_add_content_units(self):
+        unit_ids = self.cud_manager.add_content_units(TYPE_1_DEF.id, TYPE_1_UNITS)
+        self.assertEqual(len(unit_ids), len(TYPE_1_UNITS))
+        units = self.query_manager.list_content_units(TYPE_1_DEF.id)
+        self.assertEqual(set(u['_id'] for u in units), set(unit_ids))
+        self.assertTrue(all('_last_updated' in u for u in units))
+
+    def test_add_content_units_existing(self):
+        existing_id = self.cud_manager.add_content_unit(TYPE_1_DEF.id, None, TYPE_1_UNITS[1])
+        unit_ids = self.cud_manager.add_content_units(TYPE_1_DEF.id, TYPE_1_UNITS)
+        self.assertEqual(unit_ids[1], None)
+        self.assertNotEqual(unit_ids[0], None)
+        self.assertNotEqual(unit_ids[2], None)
+        units = self.query_manager.list_content_units(TYPE_1_DEF.id)
+        self.assertEqual(set(u['_id'] for u in units),
+                         set([unit_ids[0], existing_id, unit_ids[2]]))
+
     def test_update_content_unit(self):
         unit_id = self.cud_manager.add_content_unit(TYPE_1_DEF.id, None, TYPE_1_UNITS[0])
         unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_id)
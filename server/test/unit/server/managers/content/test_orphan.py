@@ -197,6 +197,33 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         orphans = list(self.orphan_manager.generate_all_orphans())
         self.assertEqual(len(orphans), 1)
 
+    def test_generate_orphan_pages_by_type_batches(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        associate_content_unit_with_repo(units[1])
+        associate_content_unit_with_repo(units[3])
+        progress = []
+
+        def callback(content_type_id, checked, orphaned):
+            progress.append((content_type_id, checked, orphaned))
+
+        pages = list(self.orphan_manager.generate_orphan_pages_by_type(
+            PHONY_TYPE_1.id, batch_size=2, progress_callback=callback))
+
+        orphan_ids = set(unit['_id'] for page in pages for unit in page)
+        self.assertEqual(orphan_ids, set([units[0]['_id'], units[2]['_id'], units[4]['_id']]))
+        self.assertEqual([p[1] for p in progress], [2, 4, 5])
+        self.assertEqual(progress[-1], (PHONY_TYPE_1.id, 5, 3))
+
+    def test_orphans_summary(self):
+        unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        gen_content_unit(PHONY_TYPE_2.id, self.content_root)
+        associate_content_unit_with_repo(unit)
+
+        summary = self.orphan_manager.orphans_summary()
+
+        self.assertEqual(summary, {PHONY_TYPE_1.id: 1, PHONY_TYPE_2.id: 1})
+
     def test_delete_one_orphan_using_generators(self):
         gen_content_unit(PHONY_TYPE_1.id, self.content_root)
         orphans = list(self.orphan_manager.generate_all_orphans())
@@ -252,6 +279,17 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertFalse(os.path.exists(unit_1['_storage_path']))
         self.assertTrue(os.path.exists(unit_2['_storage_path']))
 
+    def test_delete_by_type_filtered_ids(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+
+        self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id, [unit_1['_id']])
+
+        orphans = list(self.orphan_manager.generate_all_orphans())
+        self.assertEqual([o['_id'] for o in orphans], [unit_2['_id']])
+        self.assertFalse(os.path.exists(unit_1['_storage_path']))
+        self.assertTrue(os.path.exists(unit_2['_storage_path']))
+
     def test_delete_by_id_using_generators(self):
         unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
 
@@ -1,6 +1,10 @@
+from cStringIO import StringIO
+import hashlib
 import os
 import shutil
 
+import mock
+
 from .... import base
 from pulp.devel import mock_plugins
 from pulp.plugins.conduits.upload import UploadConduit
@@ -9,6 +13,7 @@ from pulp.server.db.model.auth import User
 from pulp.server.db.model.repository import Repo, RepoImporter
 from pulp.server.exceptions import (MissingResource, PulpDataException, PulpExecutionException,
                                     InvalidValue)
+from pulp.server.managers.content import upload as upload_module
 from pulp.server.managers.repo.unit_association import OWNER_TYPE_USER
 import pulp.server.managers.factory as manager_factory
 
@@ -85,6 +90,48 @@ class ContentUploadManagerTests(base.PulpServerTests):
 
         self.assertEqual(expected_size, found_size)
 
+    def test_save_data_stream(self):
+        # Setup
+        data = 'abcdefghij' * 10
+        upload_id = self.upload_manager.initialize_upload()
+
+        # Test
+        with mock.patch.object(upload_module, 'UPLOAD_BUFFER_SIZE', 7):
+            self.upload_manager.save_data(upload_id, 0, StringIO(data[:50]))
+            self.upload_manager.save_data(upload_id, 50, StringIO(data[50:]))
+
+        # Verify
+        self.assertEqual(self.upload_manager.read_upload(upload_id), data)
+        checksums = self.upload_manager.get_upload_checksums(upload_id)
+        self.assertEqual(checksums, {'md5': hashlib.md5(data).hexdigest(),
+                                     'sha1': hashlib.sha1(data).hexdigest(),
+                                     'sha256': hashlib.sha256(data).hexdigest()})
+
+    def test_save_data_out_of_sequence(self):
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+
+        # Test
+        self.upload_manager.save_data(upload_id, 4, 'efg')
+
+        # Verify
+        self.assertEqual(self.upload_manager.get_upload_checksums(upload_id), {})
+
+    def test_get_upload_checksums_size_mismatch(self):
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc')
+        f = open(self.upload_manager._upload_file_path(upload_id), 'a')
+        f.write('def')
+        f.close()
+
+        # Test
+        checksums = self.upload_manager.get_upload_checksums(upload_id)
+
+        # Verify
+        self.assertEqual(checksums, {})
+
     def test_save_no_init(self):
 
         # Test
@@ -108,6 +155,8 @@ class ContentUploadManagerTests(base.PulpServerTests):
 
         # Verify
         self.assertTrue(not os.path.exists(uploaded_filename))
+        self.assertEqual(self.upload_manager.get_upload_checksums(upload_id), {})
+        self.assertEqual(self.upload_manager.list_upload_ids(), [])
 
     def test_delete_non_existent_upload(self):
 
@@ -129,6 +178,7 @@ class ContentUploadManagerTests(base.PulpServerTests):
         # Test - Non-empty
         id1 = self.upload_manager.initialize_upload()
         id2 = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(id1, 0, 'abc')
 
         ids = self.upload_manager.list_upload_ids()
         self.assertEqual(2, len(ids))
@@ -176,6 +226,7 @@ class ContentUploadManagerTests(base.PulpServerTests):
         mock_plugins.MOCK_IMPORTER.upload_unit.return_value = importer_return_report
 
         upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc')
         file_path = self.upload_manager._upload_file_path(upload_id)
 
         fake_user = User('import-user', '')
@@ -199,6 +250,8 @@ class ContentUploadManagerTests(base.PulpServerTests):
         self.assertEqual(call_args[5].repo_id, 'repo-u')
         self.assertEqual(conduit.association_owner_type, OWNER_TYPE_USER)
         self.assertEqual(conduit.association_owner_id, fake_user.login)
+        self.assertEqual(conduit.get_upload_checksums()['sha256'],
+                         hashlib.sha256('abc').hexdigest())
 
         # Clean up
         mock_plugins.MOCK_IMPORTER.upload_unit.return_value = None
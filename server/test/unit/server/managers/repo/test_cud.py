@@ -48,23 +48,29 @@ class RepoManagerTests(base.ResourceReservationTests):
         # platform migration 0004 has a test for this that uses live data
 
         repo_col = mock_get_repo_col.return_value
-        find = mock_get_assoc_col.return_value.find
-        cursor = find.return_value
-        cursor.distinct.return_value = ['rpm', 'srpm']
-        cursor.count.return_value = 6
+        aggregate = mock_get_assoc_col.return_value.aggregate
+        aggregate.return_value = {'result': [
+            {'_id': {'repo_id': 'repo1', 'unit_type_id': 'rpm'}, 'count': 6},
+            {'_id': {'repo_id': 'repo1', 'unit_type_id': 'srpm'}, 'count': 3},
+        ]}
 
-        self.manager.rebuild_content_unit_counts(['repo1'])
+        self.manager.rebuild_content_unit_counts(['repo1', 'repo2'])
 
-        # once to get the type_ids, then once more for each of the 2 types
-        self.assertEqual(find.call_count, 3)
-        find.assert_any_call({'repo_id': 'repo1'})
-        find.assert_any_call({'repo_id': 'repo1', 'unit_type_id': 'rpm'})
-        find.assert_any_call({'repo_id': 'repo1', 'unit_type_id': 'srpm'})
+        # a single aggregation for both repositories
+        self.assertEqual(aggregate.call_count, 1)
+        pipeline = aggregate.call_args[0][0]
+        self.assertEqual(pipeline[0], {'$match': {'repo_id': {'$in': ['repo1', 'repo2']}}})
 
-        self.assertEqual(repo_col.update.call_count, 1)
-        repo_col.update.assert_called_once_with(
+        self.assertEqual(repo_col.update.call_count, 2)
+        repo_col.update.assert_any_call(
             {'id': 'repo1'},
-            {'$set': {'content_unit_counts': {'rpm': 6, 'srpm': 6}}},
+            {'$set': {'content_unit_counts': {'rpm': 6, 'srpm': 3}}},
+            safe=True
+        )
+        # repositories without units get empty counts
+        repo_col.update.assert_any_call(
+            {'id': 'repo2'},
+            {'$set': {'content_unit_counts': {}}},
             safe=True
         )
 
@@ -75,15 +81,31 @@ class RepoManagerTests(base.ResourceReservationTests):
         repo_col.find.return_value = [{'id': 'repo1'}, {'id': 'repo2'}]
 
         assoc_col = mock_get_assoc_col.return_value
-        # don't return any type IDs
-        assoc_col.find.return_value.distinct.return_value = []
+        assoc_col.aggregate.return_value = {'result': []}
 
         self.manager.rebuild_content_unit_counts()
 
         # makes sure it found these 2 repos and tried to operate on them
-        assoc_col.find.assert_any_call({'repo_id': 'repo1'})
-        assoc_col.find.assert_any_call({'repo_id': 'repo2'})
-        self.assertEqual(assoc_col.find.call_count, 2)
+        pipeline = assoc_col.aggregate.call_args[0][0]
+        self.assertEqual(pipeline[0], {'$match': {'repo_id': {'$in': ['repo1', 'repo2']}}})
+        self.assertEqual(repo_col.update.call_count, 2)
+
+    @mock.patch('pulp.server.db.model.repository.Repo.get_collection')
+    @mock.patch('pulp.server.db.model.repository.RepoContentUnit.get_collection')
+    def test_rebuild_chunks_concurrently(self, mock_get_assoc_col, mock_get_repo_col):
+        repo_col = mock_get_repo_col.return_value
+        assoc_col = mock_get_assoc_col.return_value
+        assoc_col.aggregate.return_value = {'result': []}
+        repo_ids = ['repo%d' % i for i in range(5)]
+
+        self.manager.rebuild_content_unit_counts(repo_ids, chunk_size=2, concurrency=3)
+
+        # chunks of 2, 2 and 1 repositories
+        self.assertEqual(assoc_col.aggregate.call_count, 3)
+        matched = sorted(call[0][0][0]['$match']['repo_id']['$in']
+                         for call in assoc_col.aggregate.call_args_list)
+        self.assertEqual(matched, [['repo0', 'repo1'], ['repo2', 'repo3'], ['repo4']])
+        self.assertEqual(repo_col.update.call_count, 5)
 
     def test_create(self):
         """
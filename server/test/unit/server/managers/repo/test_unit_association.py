@@ -1,3 +1,5 @@
+import types
+
 import mock
 
 from .... import base
@@ -142,6 +144,60 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
         for unit in repo_units:
             self.assertTrue(unit['unit_id'] in ids)
 
+    @mock.patch('pulp.server.managers.repo.unit_association.ASSOCIATE_BATCH_SIZE', 2)
+    def test_associate_all_batches(self):
+        """
+        Tests that existing associations are skipped across multiple batches.
+        """
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'bar', OWNER_TYPE_IMPORTER,
+                                          'imp')
+
+        ids = ['foo', 'bar', 'baz', 'qux', 'foo']
+        ret = self.manager.associate_all_by_ids(self.repo_id, 'type-1', iter(ids),
+                                                OWNER_TYPE_USER, 'admin')
+
+        self.assertEqual(ret, 3)
+        repo_units = list(RepoContentUnit.get_collection().find({'repo_id': self.repo_id}))
+        self.assertEqual(sorted(u['unit_id'] for u in repo_units),
+                         ['bar', 'baz', 'foo', 'qux'])
+
+    def test_associate_all_concurrent_duplicates(self):
+        """
+        Tests that associations created concurrently by another workflow are not counted.
+        """
+        collection = RepoContentUnit.get_collection()
+        real_insert = collection.insert
+
+        def insert(associations, **kwargs):
+            # another workflow associates 'bar' between the existence check and the insert
+            self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'bar',
+                                              OWNER_TYPE_USER, 'admin')
+            return real_insert(associations, **kwargs)
+
+        mock_collection = mock.MagicMock(wraps=collection)
+        mock_collection.find.side_effect = collection.find
+        mock_collection.insert.side_effect = insert
+        with mock.patch.object(RepoContentUnit, 'get_collection', return_value=mock_collection):
+            ret = self.manager.associate_all_by_ids(self.repo_id, 'type-1', ['foo', 'bar'],
+                                                    OWNER_TYPE_USER, 'admin')
+
+        self.assertEqual(ret, 1)
+        repo_units = list(collection.find({'repo_id': self.repo_id}))
+        self.assertEqual(sorted(u['unit_id'] for u in repo_units), ['bar', 'foo'])
+
+    def test_associate_all_invalid_owner_type(self):
+        self.assertRaises(exceptions.InvalidValue, self.manager.associate_all_by_ids,
+                          self.repo_id, 'type-1', ['unit-1'], 'bad-owner', 'irrelevant')
+
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_no_repo_metadata_update(self, mock_call):
+        ret = self.manager.associate_all_by_ids(self.repo_id, 'type-1', ['foo'],
+                                                OWNER_TYPE_USER, 'admin',
+                                                update_repo_metadata=False)
+
+        self.assertEqual(ret, 1)
+        self.assertFalse(mock_call.called)
+
     def test_unassociate_by_id(self):
         """
         Tests removing an association that exists by its unit ID.
@@ -363,6 +419,102 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
         self.assertEqual(0, mock_plugins.MOCK_IMPORTER.import_units.call_count)
         self.assertEqual(ret.get('units_successful'), [])
 
+    def _setup_copy_repos(self):
+        source_repo_id = 'source-repo'
+        dest_repo_id = 'dest-repo'
+
+        for repo_id in (source_repo_id, dest_repo_id):
+            self.repo_manager.create_repo(repo_id)
+            self.importer_manager.set_importer(repo_id, 'mock-importer', {})
+
+        for unit_id in ('unit-1', 'unit-2', 'unit-3'):
+            self.content_manager.add_content_unit('mock-type', unit_id, {'key-1': unit_id})
+            self.manager.associate_unit_by_id(source_repo_id, 'mock-type', unit_id,
+                                              OWNER_TYPE_USER, 'admin')
+        # a second association of the same unit must not copy it twice
+        self.manager.associate_unit_by_id(source_repo_id, 'mock-type', 'unit-1',
+                                          OWNER_TYPE_IMPORTER, 'mock-importer')
+
+        fake_user = User('associate-user', '')
+        manager_factory.principal_manager().set_principal(principal=fake_user)
+        self.addCleanup(manager_factory.principal_manager().set_principal, principal=None)
+        return source_repo_id, dest_repo_id
+
+    @mock.patch('pulp.plugins.loader.api.list_importer_types',
+                return_value={'types': ['mock-type'], 'streaming_import_units': True})
+    def test_associate_from_repo_streaming(self, mock_list_types):
+        # Setup
+        source_repo_id, dest_repo_id = self._setup_copy_repos()
+        mock_plugins.MOCK_IMPORTER.import_units.return_value = []
+
+        # Test
+        criteria = UnitAssociationCriteria(type_ids=['mock-type'],
+                                           unit_filters={'key-1': {'$in': ['unit-2', 'unit-3']}})
+        self.manager.associate_from_repo(source_repo_id, dest_repo_id, criteria=criteria)
+
+        # Verify
+        kwargs = mock_plugins.MOCK_IMPORTER.import_units.call_args[1]
+        self.assertTrue(isinstance(kwargs['units'], types.GeneratorType))
+        units = list(kwargs['units'])
+        self.assertEqual(sorted(u.id for u in units), ['unit-2', 'unit-3'])
+        self.assertTrue(isinstance(units[0], Unit))
+
+    @mock.patch('pulp.plugins.loader.api.list_importer_types',
+                return_value={'types': ['mock-type'], 'streaming_import_units': True})
+    def test_associate_from_repo_streaming_no_matching_units(self, mock_list_types):
+        # Setup
+        source_repo_id, dest_repo_id = self._setup_copy_repos()
+
+        # Test
+        criteria = UnitAssociationCriteria(type_ids=['mock-type'],
+                                           unit_filters={'key-1': 'no way this matches squat'})
+        ret = self.manager.associate_from_repo(source_repo_id, dest_repo_id, criteria=criteria)
+
+        # Verify
+        self.assertEqual(0, mock_plugins.MOCK_IMPORTER.import_units.call_count)
+        self.assertEqual(ret.get('units_successful'), [])
+
+    @mock.patch('pulp.plugins.loader.api.list_importer_types',
+                return_value={'types': ['mock-type'], 'bulk_copy': True})
+    def test_associate_from_repo_bulk_copy(self, mock_list_types):
+        # Setup
+        source_repo_id, dest_repo_id = self._setup_copy_repos()
+
+        # Test
+        ret = self.manager.associate_from_repo(source_repo_id, dest_repo_id)
+
+        # Verify
+        self.assertEqual(0, mock_plugins.MOCK_IMPORTER.import_units.call_count)
+        unit_keys = sorted(u['unit_key']['key-1'] for u in ret['units_successful'])
+        self.assertEqual(unit_keys, ['unit-1', 'unit-2', 'unit-3'])
+        self.assertEqual(ret['units_successful'][0]['type_id'], 'mock-type')
+
+        associations = list(RepoContentUnit.get_collection().find({'repo_id': dest_repo_id}))
+        self.assertEqual(3, len(associations))
+        for association in associations:
+            self.assertEqual(association['owner_type'], OWNER_TYPE_USER)
+            self.assertEqual(association['owner_id'], 'associate-user')
+
+        dest_repo = Repo.get_collection().find_one({'id': dest_repo_id})
+        self.assertEqual(dest_repo['content_unit_counts'], {'mock-type': 3})
+        self.assertTrue(dest_repo['last_unit_added'] is not None)
+
+    @mock.patch('pulp.plugins.loader.api.list_importer_types',
+                return_value={'types': ['mock-type'], 'bulk_copy': True})
+    def test_associate_from_repo_bulk_copy_with_override(self, mock_list_types):
+        # Setup
+        source_repo_id, dest_repo_id = self._setup_copy_repos()
+        mock_plugins.MOCK_IMPORTER.import_units.return_value = []
+
+        # Test
+        self.manager.associate_from_repo(source_repo_id, dest_repo_id,
+                                         import_config_override={'abc': '123'})
+
+        # Verify
+        self.assertEqual(1, mock_plugins.MOCK_IMPORTER.import_units.call_count)
+        self.assertEqual(0, RepoContentUnit.get_collection().find(
+            {'repo_id': dest_repo_id}).count())
+
     def test_associate_from_repo_missing_source(self):
         # Setup
         dest_repo_id = 'dest-repo'
@@ -182,6 +182,19 @@ class TestGetEnabled(unittest.TestCase):
         mock_get_collection.assert_called_once_with()
 
 
+class TestGetEnabledIds(unittest.TestCase):
+    @mock.patch('pulp.server.db.model.dispatch.ScheduledCall.get_collection')
+    def test_ids(self, mock_get_collection):
+        object_id = ObjectId()
+        mock_get_collection.return_value.find.return_value = [{'_id': object_id}]
+
+        ret = utils.get_enabled_ids()
+
+        mock_get_collection.return_value.find.assert_called_once_with({'enabled': True},
+                                                                      fields=['_id'])
+        self.assertEqual(ret, [str(object_id)])
+
+
 class TestDelete(unittest.TestCase):
     schedule_id = str(ObjectId())
 
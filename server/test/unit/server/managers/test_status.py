@@ -30,6 +30,18 @@ class StatusManagerTests(PulpServerTests):
 
         self.assertEquals(status_manager.get_broker_conn_status(), {'connected': True})
 
+    @patch('pulp.server.managers.status.permission_cache')
+    def test_get_permission_cache_stats(self, mock_permission_cache):
+        stats = mock_permission_cache.get_cache.return_value.stats
+
+        self.assertTrue(status_manager.get_permission_cache_stats() is stats.return_value)
+
+    @patch('pulp.server.managers.status.http_notifier')
+    def test_get_http_notifier_stats(self, mock_http_notifier):
+        stats = mock_http_notifier.stats
+
+        self.assertTrue(status_manager.get_http_notifier_stats() is stats.return_value)
+
     @patch('pulp.server.db.connection.get_database')
     def test_get_mongo_conn_status(self, mock_get_database):
         self.assertEquals(status_manager.get_mongo_conn_status(), {'connected': True})
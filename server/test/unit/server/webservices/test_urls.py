@@ -464,6 +464,22 @@ class TestDjangoTasksUrls(unittest.TestCase):
         url_name = 'task_resource'
         assert_url_match(url, url_name, task_id='test-task')
 
+    def test_match_task_wait(self):
+        """
+        Test the matching for task_wait.
+        """
+        url = '/v2/tasks/wait/'
+        url_name = 'task_wait'
+        assert_url_match(url, url_name)
+
+    def test_match_task_resource_wait(self):
+        """
+        Test the matching for task_resource_wait.
+        """
+        url = '/v2/tasks/test-task/wait/'
+        url_name = 'task_resource_wait'
+        assert_url_match(url, url_name, task_id='test-task')
+
 
 class TestDjangoRolesUrls(unittest.TestCase):
     """
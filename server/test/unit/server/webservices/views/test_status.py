@@ -19,6 +19,8 @@ class TestStatusView(unittest.TestCase):
         mock_status.get_version.return_value = {"platform_version": '2.6.1'}
         mock_status.get_mongo_conn_status.return_value = {'connected': True}
         mock_status.get_broker_conn_status.return_value = {'connected': True}
+        mock_status.get_permission_cache_stats.return_value = {'hits': 1, 'misses': 2}
+        mock_status.get_http_notifier_stats.return_value = {'sent': 3, 'failed': 4}
         mock_worker = mock.MagicMock()
         mock_worker.to_mongo.return_value.to_dict.return_value = {
             "last_heartbeat": "2015-03-19T13:55:36Z",
@@ -33,6 +35,8 @@ class TestStatusView(unittest.TestCase):
                          'messaging_connection': {'connected': True},
                          'database_connection': {'connected': True},
                          'api_version': '2',
+                         'permission_cache': {'hits': 1, 'misses': 2},
+                         'http_notifier': {'sent': 3, 'failed': 4},
                          'versions': {"platform_version": '2.6.1'}}
         mock_resp.assert_called_once_with(expected_cont)
         self.assertTrue(response is mock_resp.return_value)
@@ -46,6 +50,8 @@ class TestStatusView(unittest.TestCase):
         mock_status.get_version.return_value = {"platform_version": '2.6.1'}
         mock_status.get_mongo_conn_status.return_value = {'connected': False}
         mock_status.get_broker_conn_status.return_value = {'connected': True}
+        mock_status.get_permission_cache_stats.return_value = {'hits': 1, 'misses': 2}
+        mock_status.get_http_notifier_stats.return_value = {'sent': 3, 'failed': 4}
 
         request = mock.MagicMock()
         status = StatusView()
@@ -54,6 +60,8 @@ class TestStatusView(unittest.TestCase):
                          'messaging_connection': {'connected': True},
                          'database_connection': {'connected': False},
                          'api_version': '2',
+                         'permission_cache': {'hits': 1, 'misses': 2},
+                         'http_notifier': {'sent': 3, 'failed': 4},
                          'versions': {"platform_version": '2.6.1'}}
         mock_resp.assert_called_once_with(expected_cont)
         self.assertTrue(response is mock_resp.return_value)
@@ -67,6 +75,8 @@ class TestStatusView(unittest.TestCase):
         mock_status.get_version.return_value = {"platform_version": '2.6.1'}
         mock_status.get_mongo_conn_status.return_value = {'connected': True}
         mock_status.get_broker_conn_status.return_value = {'connected': False}
+        mock_status.get_permission_cache_stats.return_value = {'hits': 1, 'misses': 2}
+        mock_status.get_http_notifier_stats.return_value = {'sent': 3, 'failed': 4}
         mock_worker = mock.MagicMock()
         mock_worker.to_mongo.return_value.to_dict.return_value = {
             "last_heartbeat": "2015-03-19T13:55:36Z",
@@ -81,6 +91,8 @@ class TestStatusView(unittest.TestCase):
                          'messaging_connection': {'connected': False},
                          'database_connection': {'connected': True},
                          'api_version': '2',
+                         'permission_cache': {'hits': 1, 'misses': 2},
+                         'http_notifier': {'sent': 3, 'failed': 4},
                          'versions': {"platform_version": '2.6.1'}}
         mock_resp.assert_called_once_with(expected_cont)
         self.assertTrue(response is mock_resp.return_value)
@@ -8,10 +8,12 @@ from mongoengine.queryset import DoesNotExist
 
 from .base import assert_auth_DELETE, assert_auth_READ
 from pulp.server.db.model import dispatch
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.webservices.views import util
 from pulp.server.webservices.views.tasks import (TaskCollectionView, TaskResourceView,
-                                                 TaskSearchView, task_serializer)
+                                                 TaskResourceWaitView, TaskSearchView,
+                                                 TaskWaitView, state_hash, task_serializer,
+                                                 wait_for_tasks, MAX_WAIT_TIMEOUT, WAIT_TIMEOUT)
 
 
 @mock.patch('pulp.server.webservices.views.tasks.serialization')
@@ -170,3 +172,168 @@ class TestTaskResource(unittest.TestCase):
         mock_task.cancel.assert_called_once_with('mock_task_id')
         mock_resp.assert_called_once_with(None)
         self.assertTrue(response is mock_resp.return_value)
+
+
+class TestWaitForTasks(unittest.TestCase):
+    """
+    Tests for state_hash and wait_for_tasks.
+    """
+
+    def test_state_hash(self):
+        """
+        The hash changes with the state and with the progress report.
+        """
+        task = {'state': 'running', 'progress_report': {'a': 1, 'b': 2}}
+        same = {'state': 'running', 'progress_report': {'b': 2, 'a': 1}}
+        self.assertEqual(state_hash(task), state_hash(same))
+        self.assertNotEqual(state_hash(task), state_hash(dict(task, state='finished')))
+        self.assertNotEqual(state_hash(task), state_hash(dict(task, progress_report={'a': 2})))
+
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.dispatch.TaskStatus')
+    def test_changed(self, mock_task_status, mock_time):
+        """
+        The wait ends as soon as the hash of one of the tasks differs.
+        """
+        mock_time.time.return_value = 0
+        task_1 = {'task_id': '1', 'state': 'running', 'progress_report': {}}
+        task_2 = {'task_id': '2', 'state': 'running', 'progress_report': {}}
+        changed_2 = {'task_id': '2', 'state': 'finished', 'progress_report': {}}
+        mock_task_status.objects.side_effect = [[task_1, task_2], [task_1, changed_2]]
+        state_hashes = {'1': state_hash(task_1), '2': state_hash(task_2)}
+
+        waited = wait_for_tasks(state_hashes, 10)
+
+        self.assertEqual(waited, [task_1, changed_2])
+        self.assertEqual(mock_task_status.objects.call_count, 2)
+        mock_task_status.objects.assert_called_with(task_id__in=['1', '2'])
+        mock_time.sleep.assert_called_once_with(0.5)
+
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.dispatch.TaskStatus')
+    def test_not_seen(self, mock_task_status, mock_time):
+        """
+        A task without a hash is returned immediately.
+        """
+        mock_time.time.return_value = 0
+        task = {'task_id': '1', 'state': 'waiting', 'progress_report': {}}
+        mock_task_status.objects.return_value = [task]
+
+        waited = wait_for_tasks({'1': None}, 10)
+
+        self.assertEqual(waited, [task])
+        self.assertFalse(mock_time.sleep.called)
+
+    @mock.patch('pulp.server.webservices.views.tasks.time')
+    @mock.patch('pulp.server.webservices.views.tasks.dispatch.TaskStatus')
+    def test_timeout(self, mock_task_status, mock_time):
+        """
+        The unchanged tasks are returned once the timeout passes.
+        """
+        mock_time.time.side_effect = [0, 0.5, 0.9, 1.2]
+        task = {'task_id': '1', 'state': 'running', 'progress_report': {}}
+        mock_task_status.objects.return_value = [task]
+
+        waited = wait_for_tasks({'1': state_hash(task)}, 1)
+
+        self.assertEqual(waited, [task])
+        self.assertEqual(mock_time.sleep.call_count, 2)
+        self.assertEqual(mock_time.sleep.call_args_list[0][0][0], 0.5)
+        self.assertAlmostEqual(mock_time.sleep.call_args_list[1][0][0], 0.1)
+
+    @mock.patch('pulp.server.webservices.views.tasks.dispatch.TaskStatus')
+    def test_missing(self, mock_task_status):
+        """
+        A MissingResource is raised for tasks that are not found.
+        """
+        mock_task_status.objects.return_value = [{'task_id': '1'}]
+
+        try:
+            wait_for_tasks({'1': None, '2': None}, 10)
+        except MissingResource, e:
+            self.assertEqual(e.resources, {'task_ids': ['2']})
+        else:
+            raise AssertionError('MissingResource should be raised with a missing task.')
+
+
+class TestTaskWait(unittest.TestCase):
+    """
+    Tests for TaskWaitView and TaskResourceWaitView.
+    """
+
+    @mock.patch('pulp.server.webservices.controllers.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.state_hash', return_value='h')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer', side_effect=dict)
+    @mock.patch('pulp.server.webservices.views.tasks.wait_for_tasks')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_post_wait(self, mock_resp, mock_wait, *unused):
+        """
+        The batch wait passes the hashes and timeout and returns every task with its hash.
+        """
+        mock_request = mock.MagicMock()
+        mock_request.body = '{"tasks": {"1": "a", "2": null}, "timeout": 5}'
+        mock_wait.return_value = [{'task_id': '1'}, {'task_id': '2'}]
+
+        response = TaskWaitView().post(mock_request)
+
+        mock_wait.assert_called_once_with({'1': 'a', '2': None}, 5.0)
+        mock_resp.assert_called_once_with([{'task_id': '1', 'state_hash': 'h'},
+                                           {'task_id': '2', 'state_hash': 'h'}])
+        self.assertTrue(response is mock_resp.return_value)
+
+    @mock.patch('pulp.server.webservices.controllers.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.wait_for_tasks')
+    def test_post_wait_invalid(self, mock_wait):
+        """
+        The batch wait requires tasks and a valid timeout.
+        """
+        mock_request = mock.MagicMock()
+        for body in ('{}', '{"tasks": ["1"]}', '{"tasks": {"1": null}, "timeout": "x"}',
+                     '{"tasks": {"1": null}, "timeout": -1}'):
+            mock_request.body = body
+            self.assertRaises(InvalidValue, TaskWaitView().post, mock_request)
+        self.assertFalse(mock_wait.called)
+
+    @mock.patch('pulp.server.webservices.controllers.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.Worker')
+    @mock.patch('pulp.server.webservices.views.tasks.state_hash', return_value='h')
+    @mock.patch('pulp.server.webservices.views.tasks.task_serializer', side_effect=dict)
+    @mock.patch('pulp.server.webservices.views.tasks.wait_for_tasks')
+    @mock.patch('pulp.server.webservices.views.tasks.generate_json_response_with_pulp_encoder')
+    def test_get_wait(self, mock_resp, mock_wait, mock_serializer, mock_hash, mock_worker):
+        """
+        The single wait passes the hash and timeout from the query and returns the task.
+        """
+        mock_request = mock.MagicMock()
+        mock_request.GET = {'state_hash': 'a', 'timeout': '100'}
+        mock_wait.return_value = [{'task_id': '1', 'worker_name': 'mock'}]
+        mock_worker.return_value.queue_name = 'mock_q_name'
+
+        response = TaskResourceWaitView().get(mock_request, '1')
+
+        mock_wait.assert_called_once_with({'1': 'a'}, MAX_WAIT_TIMEOUT)
+        mock_resp.assert_called_once_with({'task_id': '1', 'worker_name': 'mock',
+                                           'queue': 'mock_q_name', 'state_hash': 'h'})
+        self.assertTrue(response is mock_resp.return_value)
+
+    @mock.patch('pulp.server.webservices.controllers.decorators._verify_auth',
+                new=assert_auth_READ())
+    @mock.patch('pulp.server.webservices.views.tasks.wait_for_tasks',
+                side_effect=MissingResource(task_ids=['1']))
+    def test_get_wait_missing(self, mock_wait):
+        """
+        The single wait raises a MissingResource for the task when it is not found.
+        """
+        mock_request = mock.MagicMock()
+        mock_request.GET = {}
+
+        try:
+            TaskResourceWaitView().get(mock_request, '1')
+        except MissingResource, response:
+            self.assertEqual(response.error_data, {'resources': {'resource_id': '1'}})
+        else:
+            raise AssertionError('MissingResource should be raised with a missing task.')
+        mock_wait.assert_called_once_with({'1': None}, WAIT_TIMEOUT)